@@ -1,8 +1,11 @@
+import os
 import json
 import logging
 import asyncio
 import re
+import time
 from datetime import datetime
+from collections import deque
 from dotenv import load_dotenv
 
 from livekit import agents
@@ -11,10 +14,62 @@ from livekit.plugins import google
 from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION, SENTENCES_TEACHING_PROMPT, ENGLISH_CONVERSATION_PROMPT
 from tools import get_weather, search_web, send_email
 from supabase_client import supabase_manager
+from daily_stats import DailyStatsAggregator
+from db_metrics import LatencyHistogram
+from history_archive import iter_sessions
+from sentence_extraction import sentence_extractor
+from keyword_automaton import keyword_automaton, CORRECT, WRONG, COMPLETION, TOPIC, CONTINUE_INTENT, NEW_TOPIC_INTENT, STUDY_INTENT
+from event_pipeline import SessionEventPipeline, KEEP, DROP_OLDEST, MERGE
+from vocabulary import VocabularyTracker
+from memory_context import create_memory_renderer
+from memory_loader import memory_plan, fetch_rows, PERSONAL_CONTEXT, GAMIFICATION, USER_PROGRESS, SENTENCES_PROGRESS, PODCAST_PROGRESS
+from context_compaction import ChatContextCompactor, MEMORY_ID_PREFIX
+from personal_info import diff_personal_context, merge_personal_context, PersonalContextDebouncer
+from analyzers import analyzer_pool, analyze_user_text, analyze_agent_text
+from session_state import SessionData, SessionStats, SentencesState, PodcastState
+from session_snapshot import session_snapshots
+from session_teardown import SessionTeardown, PREPARE, CRITICAL, BEST_EFFORT
+from write_priority import DeferredWrites, supabase_health
+from topics import TOPIC_NAMES, resolve_topic, topic_progress
+from text_normalization import normalize_text, strip_markdown
 # from sentences import get_sentences_prompt  # تم نقل prompt إلى prompts.py
 
 load_dotenv()
 
+# مجلد تصدير مقاييس Supabase لهذا الـ worker (Prometheus textfile) - اختياري
+DB_METRICS_EXPORT_DIR = os.getenv("DB_METRICS_EXPORT_DIR", "")
+
+# حجم طابور أحداث الجلسة والمهلة التي يُعتبر بعدها حدث نسخ المستخدم قديماً
+SESSION_EVENT_QUEUE_SIZE = int(os.getenv("SESSION_EVENT_QUEUE_SIZE", "64"))
+SESSION_EVENT_STALE_SECONDS = float(os.getenv("SESSION_EVENT_STALE_SECONDS", "30"))
+
+# الحد الأقصى لمفردات الجلسة الواحدة
+VOCABULARY_SESSION_CAP = int(os.getenv("VOCABULARY_SESSION_CAP", "300"))
+
+# ضغط سياق المحادثة: ميزانية الـ tokens (0 = تعطيل)، عدد الأدوار الأخيرة المحفوظة، وحجم الملخص
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "8000"))
+CHAT_CONTEXT_KEEP_TURNS = int(os.getenv("CHAT_CONTEXT_KEEP_TURNS", "12"))
+CHAT_CONTEXT_SUMMARY_TOKENS = int(os.getenv("CHAT_CONTEXT_SUMMARY_TOKENS", "600"))
+
+# تجميع تحديثات السياق الشخصي في كتابة واحدة كل N ثانية
+PERSONAL_CONTEXT_DEBOUNCE_SECONDS = float(os.getenv("PERSONAL_CONTEXT_DEBOUNCE_SECONDS", "5"))
+
+# تذكير الموديل بالإجابة بالإنجليزية بعد N أدوار غير إنجليزية متتالية (0 = تعطيل)
+ENGLISH_ONLY_REMINDER_AFTER = int(os.getenv("ENGLISH_ONLY_REMINDER_AFTER", "2"))
+# الأوضاع التي تشترط إجابة المتعلم بالإنجليزية
+ENGLISH_ONLY_MODES = ("sentences_learning", "english_conversation")
+
+# بدء سريع: الجلسة والترحيب لا ينتظران تحميل الذاكرة (0 = انتظار الذاكرة كاملة قبل البدء)
+SESSION_FAST_START = os.getenv("SESSION_FAST_START", "1") == "1"
+# مهلة انتظار الذاكرة بعد بدء الجلسة قبل اختيار الترحيب العام بدل الترحيب الشخصي
+FAST_START_MEMORY_GRACE_SECONDS = float(os.getenv("FAST_START_MEMORY_GRACE_SECONDS", "0.3"))
+
+# فترة التحقق من تعافي Supabase لإرسال الكتابات المؤجلة (النقاط، الإحصائيات، السياق الشخصي، الحفظ التلقائي)
+SUPABASE_SHED_RETRY_SECONDS = float(os.getenv("SUPABASE_SHED_RETRY_SECONDS", "5"))
+
+# المهلة القصوى لإنهاء الجلسة (تفريغ الأحداث + الكتابات الحرجة + الإحصائيات)
+SESSION_TEARDOWN_DEADLINE_SECONDS = float(os.getenv("SESSION_TEARDOWN_DEADLINE_SECONDS", "10"))
+
 # تقليل مستوى اللوج لتجنب رسائل transcription غير المرغوبة
 logging.getLogger("livekit").setLevel(logging.WARNING)
 
@@ -67,107 +122,97 @@ class Assistant(Agent):
         self.user_id = user_id
         self.user_name = user_name
         self.user_progress = None
+        self.podcast_progress = None  # تقدم البودكاست (وضع المحادثة الإنجليزية فقط)
         self.personal_context = None  # السياق الشخصي للمستخدم
-        self._last_context_save = None  # للـ rate limiting
+        # ⚡ في البدء السريع الأحداث والحفظ تبدأ قبل وصول الذاكرة - الكتابات التي تعتمد عليها تُؤجل حتى هذا
+        self.memory_loaded = asyncio.Event()
+        self.memory_abandoned = False  # الجلسة انتهت قبل وصول الذاكرة
+        # الكتابات المؤجلة حتى وصول الذاكرة (بالترتيب) - تُعاد عبر طابور الأحداث بدل الانتظار داخل معالج
+        self.memory_backlog = deque()
+        self.replaying_backlog = False
+        self.events = None  # طابور أحداث الجلسة (يُربط في entrypoint)
         
         # 🎯 الأنظمة الجديدة
         self.level_assessment = None  # تقييم المستوى
         self.achievements = None  # الإنجازات
-        self.session_start_time = datetime.now()  # وقت بدء الجلسة
-        self.words_learned_session = []  # كلمات هذه الجلسة
-        self.session_correct_answers = 0
-        self.session_total_attempts = 0
-        
-        self.session_data = {
-            "session_id": str(datetime.now().timestamp()),
-            "start_time": datetime.now().isoformat(),
-            "words_discussed": [],
-            "topics_covered": [],
-            "current_topic": "",
-            "last_position": ""
-        }
-        self._message_count = 0
+        # 📊 عدادات الجلسة (slots - بدون سمات تُنشأ عند الحاجة)
+        self.stats = SessionStats()
+        # ⏳ الكتابات غير الحرجة تُؤجل أثناء تدهور Supabase وتُرسل عند تعافيه
+        self.writes = DeferredWrites(supabase_health, retry_interval=SUPABASE_SHED_RETRY_SECONDS)
+        # 🏆 نقاط لم تُرسل بعد (تتراكم أثناء التأجيل وتُرسل كمنحة واحدة)
+        self.pending_points = 0
+        self.pending_point_awards = 0
+        self.pending_point_reason = ""
+        # 📊 فروقات daily_stats تُجمع في الذاكرة وتُرسل دورياً وعند نهاية الجلسة
+        self.daily_stats = DailyStatsAggregator(user_id, supabase_manager.increment_daily_stats) if user_id else None
+        # 👤 تغييرات السياق الشخصي الفعلية فقط، تُجمع وتُكتب مرة كل بضع ثوانٍ
+        self.personal_writer = PersonalContextDebouncer(
+            user_id, supabase_manager.update_personal_context, delay=PERSONAL_CONTEXT_DEBOUNCE_SECONDS,
+            submit=self.writes.submit,
+        ) if user_id else None
+        
+        # مفردات الجلسة - words_discussed هي نفس قائمة المتتبع
+        self.vocabulary = VocabularyTracker(max_words=VOCABULARY_SESSION_CAP)
+        self.session_data = SessionData(words_discussed=self.vocabulary.words)
+        # قوالب سياق الذاكرة - كل قسم يُعاد رسمه فقط عند تغير حقوله
+        self.memory_renderer = create_memory_renderer()
+        # ضغط السياق في الجلسات الطويلة (نافذة أدوار حديثة + ملخص)
+        self.context_compactor = ChatContextCompactor(
+            token_budget=CHAT_CONTEXT_TOKEN_BUDGET,
+            keep_recent_turns=CHAT_CONTEXT_KEEP_TURNS,
+            summary_tokens=CHAT_CONTEXT_SUMMARY_TOKENS,
+        )
         
-        # 📚 متغيرات وضع تعليم الجمل - تهيئة افتراضية لتجنب AttributeError
-        self.sentences_session_id = f"sentences_{int(datetime.now().timestamp())}"
-        self.sentences_progress = None
-        self.current_sentences = []
-        self.sentences_completed = 0
-        self.current_level = 1
-        self.current_sentence_index = 0
-        self.learned_sentences_history = []
+        # 📚 حالة وضع تعليم الجمل
+        self.sentences = SentencesState()
+        # 🎙️ ملاحظات محادثة البودكاست (حاويات محدودة)
+        self.podcast = PodcastState()
         
         # سيتم ربط معالجات الأحداث لاحقاً مع الجلسة
     
     async def load_sentences_progress(self):
-        """تحميل تقدم الجمل للمستخدم في وضع الجمل ودمجه في الذاكرة"""
-        if not self.user_id or self.mode != "sentences_learning":
-            return
+        """تحميل تقدم الجمل للمستخدم في وضع الجمل (السياق يُحقن من load_mode_memory)"""
+        # جلب آخر جلسة نشطة أو إنشاء جديدة
+        progress = await supabase_manager.get_sentences_progress(self.user_id)
+        
+        if not progress:
+            # إنشاء جلسة جديدة
+            result = await supabase_manager.create_sentences_session(
+                self.user_id, 
+                self.sentences.session_id
+            )
+            # ✅ حالة فارغة للجلسة الجديدة بنفس المعرف
+            self.sentences = SentencesState(session_id=self.sentences.session_id, progress=result.get("data"))
             
-        try:
-            # جلب آخر جلسة نشطة أو إنشاء جديدة
-            self.sentences_progress = await supabase_manager.get_sentences_progress(self.user_id)
+            print(f"[agent] تم إنشاء جلسة جمل جديدة: {self.sentences.session_id}")
+        else:
+            # استخدام الجلسة الموجودة: الجمل، المستوى، التاريخ، والمؤشر للجملة التالية غير المكتملة
+            # (إذا أكمل 2 جمل، المؤشر يجب أن يكون 2 للجملة رقم 3) + بناء فهرس التكرار مرة واحدة
+            self.sentences.load(progress)
             
-            if not self.sentences_progress:
-                # إنشاء جلسة جديدة
-                result = await supabase_manager.create_sentences_session(
-                    self.user_id, 
-                    self.sentences_session_id
+            # إصلاح العدد الإجمالي إذا كان غير صحيح
+            current_total = self.sentences.progress.get("total_sentences", 0)
+            actual_total = len(self.sentences.current)
+            if current_total != actual_total and actual_total > 0:
+                await supabase_manager.update_sentences_progress(
+                    self.user_id,
+                    self.sentences.session_id,
+                    total_sentences=actual_total
                 )
-                self.sentences_progress = result.get("data")
-                
-                # ✅ تهيئة المتغيرات للجلسة الجديدة
-                self.current_sentences = []
-                self.sentences_completed = 0
-                self.current_level = 1
-                self.current_sentence_index = 0
-                self.learned_sentences_history = []
-                
-                print(f"[agent] تم إنشاء جلسة جمل جديدة: {self.sentences_session_id}")
-            else:
-                # استخدام الجلسة اقوجودة
-                self.sentences_session_id = self.sentences_progress["session_id"]
-                self.current_sentences = self.sentences_progress.get("generated_sentences", [])
-                self.sentences_completed = self.sentences_progress.get("completed_sentences", 0)
-                # تحميل المستوى الحالي وتاريخ الجمل
-                self.current_level = self.sentences_progress.get("current_level", 1)
-                self.learned_sentences_history = self.sentences_progress.get("learned_sentences_history", [])
-                # تحديث current_sentence_index للاستكمال من الجملة الصحيحة (يشير للجملة التالية غير المكتملة)
-                # إذا أكمل 2 جمل، المؤشر يجب أن يكون 2 (للجملة رقم 3)
-                self.current_sentence_index = self.sentences_progress.get("current_sentence_index", self.sentences_completed)
-                
-                # إصلاح العدد الإجمالي إذا كان غير صحيح
-                current_total = self.sentences_progress.get("total_sentences", 0)
-                actual_total = len(self.current_sentences)
-                if current_total != actual_total and actual_total > 0:
-                    await supabase_manager.update_sentences_progress(
-                        self.user_id,
-                        self.sentences_session_id,
-                        total_sentences=actual_total
-                    )
-                    self.sentences_progress["total_sentences"] = actual_total
-                    print(f"[agent] تم إصلاح العدد الإجمالي من {current_total} إلى {actual_total}")
-                
-                print(f"[agent] تم تحميل جلسة جمل موجودة: {self.sentences_session_id}")
-                print(f"[agent] الجمل المُكتملة: {self.sentences_completed}, الجملة التالية: {self.current_sentence_index}")
-                print(f"[agent] المستوى الحالي: {self.current_level}, عدد الجمل المتعلمة تاريخياً: {len(self.learned_sentences_history)}")
+                self.sentences.progress["total_sentences"] = actual_total
+                print(f"[agent] تم إصلاح العدد الإجمالي من {current_total} إلى {actual_total}")
             
-            # دمج ذاكرة الجمل في سياق المحادثة
-            if self.sentences_progress and self.chat_ctx:
-                sentences_memory_context = self._build_sentences_memory_context()
-                if sentences_memory_context:
-                    # إنشاء نسخة جديدة من السياق وتحديثها
-                    new_ctx = self.chat_ctx.copy()
-                    new_ctx.add_message(role="system", content=sentences_memory_context)
-                    await self.update_chat_ctx(new_ctx)
-                    print(f"[agent] تم دمج ذاكرة الجمل في السياق بنجاح")
-                
-        except Exception as e:
-            print(f"[agent] خطأ في تحميل تقدم الجمل: {e}")
+            print(f"[agent] تم تحميل جلسة جمل موجودة: {self.sentences.session_id}")
+            print(f"[agent] الجمل المُكتملة: {self.sentences.completed}, الجملة التالية: {self.sentences.index}")
+            print(f"[agent] المستوى الحالي: {self.sentences.level}, عدد الجمل المتعلمة تاريخياً: {len(self.sentences.history)}")
 
     async def save_sentence_progress(self, sentence_text: str, sentence_index: int, completed: bool = False):
         """حفظ تقدم جملة محددة"""
-        if not self.user_id or self.mode != "sentences_learning" or not self.sentences_session_id:
+        if not self.user_id or self.mode != "sentences_learning":
+            return
+        if not self._memory_ready(lambda: self.save_sentence_progress(sentence_text, sentence_index, completed)):
+            return
+        if not self.sentences.session_id:
             return
             
         try:
@@ -180,7 +225,7 @@ class Assistant(Agent):
             
             await supabase_manager.save_sentences_data(
                 self.user_id, 
-                self.sentences_session_id, 
+                self.sentences.session_id, 
                 sentence_data, 
                 sentence_index
             )
@@ -189,13 +234,16 @@ class Assistant(Agent):
         except Exception as e:
             print(f"[agent] خطأ في حفظ تقدم الجملة: {e}")
 
-    async def process_sentences_response(self, agent_text: str):
+    async def process_sentences_response(self, agent_text: str, keyword_hits: dict = None, found_sentences: list = None):
         """معالجة رد المساعد في وضع الجمل وحفظ البيانات"""
         if not self.user_id or self.mode != "sentences_learning":
             return
+        # load_sentences_progress يستبدل self.sentences - أدوار البدء السريع تُعالج بعده حتى لا يضيع تقدمها
+        if not self._memory_ready(lambda: self.process_sentences_response(agent_text, keyword_hits, found_sentences)):
+            return
         
         # ✅ التحقق من وجود sentences_session_id قبل الحفظ
-        if not hasattr(self, 'sentences_session_id') or not self.sentences_session_id:
+        if not self.sentences.session_id:
             print(f"[agent] ⚠️ sentences_session_id غير موجود، لن يتم حفظ الجمل")
             return
             
@@ -204,70 +252,55 @@ class Assistant(Agent):
             print(f"[agent] 📝 AI Response (first 300 chars): {agent_text[:300]}")
             
             # البحث عن الجمل الإنجليزية المُولدة في الرد
-            # أنماط محسّنة ومتعددة لاستخراج الجمل
-            sentence_patterns = [
-                r'\*\*([A-Z][^*]+\.)\*\*',  # **I am happy.**
-                r'[\d]+\.\s*\*\*([A-Z][^*]+\.)\*\*',  # 1. **I am happy.**
-                r'"([A-Z][^"]+\.)"',  # "I am happy."
-                r':\s+([A-Z][^.!?]+[.!?])',  # : I am happy.
-                r'الجملة:\s*([A-Z][^.!?]+[.!?])',  # الجملة: I am happy.
-                r'sentence:\s*([A-Z][^.!?]+[.!?])',  # sentence: I am happy.
-                r'say:\s*([A-Z][^.!?]+[.!?])',  # say: I am happy.
-                r'قل:\s*([A-Z][^.!?]+[.!?])',  # قل: I am happy.
-                r'\b([A-Z][a-z]+(?:\s+[a-z]+){1,8}[.!?])\b',  # جملة بسيطة بدون علامات
-                r'^([A-Z][^.!?]+[.!?])$',  # I am happy. (سطر كامل)
-            ]
-            
-            found_sentences = []
-            for pattern in sentence_patterns:
-                matches = re.findall(pattern, agent_text, re.MULTILINE)
-                if matches:
-                    found_sentences.extend(matches)
-                    print(f"[agent] 🔍 Pattern matched: {pattern[:30]}... → {len(matches)} جملة")
+            # محرك أنماط مُجمّع بأولوية ثابتة - كل جزء من النص يُلتقط مرة واحدة فقط
+            if found_sentences is None:
+                found_sentences = sentence_extractor.extract(agent_text)
+            if found_sentences:
+                print(f"[agent] 🔍 تم استخراج {len(found_sentences)} جملة")
             
             # حفظ الجمل المُولدة إذا وُجدت
             if found_sentences:
-                # تحديث قائمة الجمل الحالية
-                if not hasattr(self, 'current_sentences') or not self.current_sentences:
-                    self.current_sentences = []
-                
-                # مقارنة دقيقة للجمل - تنظيف الجمل للمقارنة الصحيحة
-                normalized_current = [s.lower().replace('.', '').replace(',', '').replace('!', '').replace('?', '').strip() for s in self.current_sentences]
-                
                 new_sentences = []
                 for sentence in found_sentences:
-                    clean_sentence = sentence.strip()
                     # تنظيف الجملة من رموز markdown وغيرها
-                    clean_sentence = clean_sentence.replace('*', '').replace('_', '').strip()
-                    normalized_new = clean_sentence.lower().replace('.', '').replace(',', '').replace('!', '').replace('?', '').strip()
+                    clean_sentence = strip_markdown(sentence).strip()
                     
-                    # تحقق من عدم وجود الجملة مسبقاً وأنها جملة صحيحة
-                    if (normalized_new not in normalized_current and 
-                        clean_sentence and 
-                        len(clean_sentence) > 5 and  # على الأقل 5 أحرف
-                        not clean_sentence.startswith('(')):  # تجنب النص بين أقواس
-                        new_sentences.append(clean_sentence)
-                        normalized_current.append(normalized_new)
-                        print(f"[agent] ➕ جملة جديدة: {clean_sentence}")
+                    # تحقق من أنها جملة صحيحة
+                    if (not clean_sentence or
+                        len(clean_sentence) <= 5 or  # على الأقل 5 أحرف
+                        clean_sentence.startswith('(')):  # تجنب النص بين أقواس
+                        continue
+                    
+                    # التكرار التام فقط يُتجاهل - الصياغة القريبة قد تكون جملة جديدة يدرّسها المعلم
+                    # (حذفها يفصل sentences.index عما يُدرَّس فعلاً)، لذا تُسجل فقط
+                    duplicate = self.sentences.deduper.find_duplicate(clean_sentence)
+                    if duplicate:
+                        kind, matched, similarity = duplicate
+                        if kind == "exact":
+                            continue
+                        print(f"[agent] ♻️ صياغة مشابهة ({similarity:.2f}) لجملة سابقة: {clean_sentence} ≈ {matched}")
+                    
+                    new_sentences.append(clean_sentence)
+                    self.sentences.deduper.add(clean_sentence)
+                    print(f"[agent] ➕ جملة جديدة: {clean_sentence}")
                 
                 if new_sentences:
-                    self.current_sentences.extend(new_sentences)
+                    self.sentences.current.extend(new_sentences)
                     # إضافة الجمل الجديدة لتاريخ التعلم
-                    if not hasattr(self, 'learned_sentences_history'):
-                        self.learned_sentences_history = []
-                    self.learned_sentences_history.extend(new_sentences)
+                    self.sentences.history.extend(new_sentences)
+                    self.sentences.history_set.update(new_sentences)
                     
                     # حفظ الجمل الجديدة في قاعدة البيانات مع المستوى الحالي
                     await supabase_manager.update_sentences_progress(
                         self.user_id,
-                        self.sentences_session_id,
-                        generated_sentences=self.current_sentences,
-                        total_sentences=len(self.current_sentences),
-                        current_level=self.current_level,
-                        learned_sentences_history=self.learned_sentences_history
+                        self.sentences.session_id,
+                        generated_sentences=self.sentences.current,
+                        total_sentences=len(self.sentences.current),
+                        current_level=self.sentences.level,
+                        learned_sentences_history=self.sentences.history
                     )
-                    print(f"[agent] 💾 تم حفظ {len(new_sentences)} جملة جديدة (المستوى {self.current_level}). إجمالي: {len(self.current_sentences)} جملة")
-                    print(f"[agent] 💾 حفظ في قاعدة البيانات - learned_sentences_history: {len(self.learned_sentences_history)} جملة")
+                    print(f"[agent] 💾 تم حفظ {len(new_sentences)} جملة جديدة (المستوى {self.sentences.level}). إجمالي: {len(self.sentences.current)} جملة")
+                    print(f"[agent] 💾 حفظ في قاعدة البيانات - learned_sentences_history: {len(self.sentences.history)} جملة")
                     print(f"[agent] ✨ الجمل الجديدة: {new_sentences}")
                 else:
                     print(f"[agent] ⚠️ تم تجاهل {len(found_sentences)} جملة (مكررة أو غير صالحة)")
@@ -276,180 +309,89 @@ class Assistant(Agent):
                 print(f"[agent] 📄 النص الكامل: {agent_text}")
                 print(f"[agent] 💡 تلميح: تأكد من أن الـ AI يستخدم تنسيق مثل: **I am happy.** أو \"I am happy.\"")
             
-            # البحث عن إشارات إكمال جملة
-            completion_indicators = [
-                "ممتاز", "أحسنت", "جيد جداً", "excellent", "great", "perfect"
-            ]
+            # البحث عن إشارات إكمال جملة (مسح واحد بالآلة إن لم يُمرر مسبقاً)
+            if keyword_hits is None:
+                keyword_hits = keyword_automaton.scan(agent_text)
             
-            if any(indicator in agent_text.lower() for indicator in completion_indicators):
+            if COMPLETION in keyword_hits:
                 # زيادة عدد الجمل المُكتملة
-                self.sentences_completed = getattr(self, 'sentences_completed', 0) + 1
+                self.sentences.completed += 1
                 # تحديث current_sentence_index للجملة التالية
-                self.current_sentence_index = self.sentences_completed
+                self.sentences.index = self.sentences.completed
                 
-                print(f"[agent] ✅ جملة مكتملة! العدد المكتمل: {self.sentences_completed}, المؤشر التالي: {self.current_sentence_index}")
+                print(f"[agent] ✅ جملة مكتملة! العدد المكتمل: {self.sentences.completed}, المؤشر التالي: {self.sentences.index}")
                 
                 # 🆕 حفظ الجملة الحالية في التاريخ (إذا لم تُحفظ بعد)
-                if hasattr(self, 'current_sentences') and self.current_sentences:
-                    current_sentence_index_for_save = min(self.current_sentence_index - 1, len(self.current_sentences) - 1)
+                if self.sentences.current:
+                    current_sentence_index_for_save = min(self.sentences.index - 1, len(self.sentences.current) - 1)
                     if current_sentence_index_for_save >= 0:
-                        current_sentence = self.current_sentences[current_sentence_index_for_save]
-                        
-                        # التأكد من وجود learned_sentences_history
-                        if not hasattr(self, 'learned_sentences_history'):
-                            self.learned_sentences_history = []
+                        current_sentence = self.sentences.current[current_sentence_index_for_save]
                         
                         # إضافة الجملة إلى التاريخ إذا لم تكن موجودة
-                        if current_sentence and current_sentence not in self.learned_sentences_history:
-                            self.learned_sentences_history.append(current_sentence)
+                        if self.sentences.add_to_history(current_sentence):
                             print(f"[agent] 📝 أضيفت الجملة المكتملة للتاريخ: {current_sentence}")
                 
                 # حفظ التقدم الجديد مع العدد الإجمالي الصحيح
-                current_total = len(getattr(self, 'current_sentences', []))
+                current_total = len(self.sentences.current)
                 
                 # إذا أكمل المستخدم كل جمل المستوى الحالي، انتقل للمستوى التالي
                 sentences_per_level = 20  # عدد الجمل في كل مستوى (حسب prompts.py)
-                if (self.sentences_completed % sentences_per_level == 0 and 
-                    self.sentences_completed > 0 and 
-                    self.current_level < 5):
-                    self.current_level += 1
-                    print(f"[agent] 🎉 مبروك! الانتقال للمستوى {self.current_level} - أكملت {self.sentences_completed} جملة!")
+                if (self.sentences.completed % sentences_per_level == 0 and 
+                    self.sentences.completed > 0 and 
+                    self.sentences.level < 5):
+                    self.sentences.level += 1
+                    print(f"[agent] 🎉 مبروك! الانتقال للمستوى {self.sentences.level} - أكملت {self.sentences.completed} جملة!")
                 
                 # حفظ التقدم في قاعدة البيانات
-                learned_history = getattr(self, 'learned_sentences_history', [])
-                print(f"[agent] 💾 حفظ التقدم - completed: {self.sentences_completed}, history: {len(learned_history)} جمل")
+                learned_history = self.sentences.history
+                print(f"[agent] 💾 حفظ التقدم - completed: {self.sentences.completed}, history: {len(learned_history)} جمل")
                 
                 await supabase_manager.update_sentences_progress(
                     self.user_id,
-                    self.sentences_session_id,
-                    completed_sentences=self.sentences_completed,
-                    current_sentence_index=self.current_sentence_index,
-                    generated_sentences=self.current_sentences,
+                    self.sentences.session_id,
+                    completed_sentences=self.sentences.completed,
+                    current_sentence_index=self.sentences.index,
+                    generated_sentences=self.sentences.current,
                     total_sentences=current_total,
-                    current_level=self.current_level,
+                    current_level=self.sentences.level,
                     learned_sentences_history=learned_history
                 )
-                print(f"[agent] ✅ تم تحديث التقدم: {self.sentences_completed}/{current_total} جملة مُكتملة (المستوى {self.current_level})")
+                print(f"[agent] ✅ تم تحديث التقدم: {self.sentences.completed}/{current_total} جملة مُكتملة (المستوى {self.sentences.level})")
                 print(f"[agent] 📊 التاريخ: {len(learned_history)} جملة في learned_sentences_history")
                 
         except Exception as e:
             print(f"[agent] خطأ في معالجة رد الجمل: {e}")
 
     async def load_podcast_progress(self):
-        """تحميل تقدم البودكاست للمستخدم ودمجه في الذاكرة"""
-        if not self.user_id or self.mode != "english_conversation":
-            return
-            
-        try:
-            # جلب تقدم البودكاست أو إنشاؤه
-            # تحميل صامت للبيانات
-            self.podcast_progress = await supabase_manager.get_or_create_podcast_progress(self.user_id)
-            
-            if self.podcast_progress:
-                
-                # دمج ذاكرة البودكاست في سياق المحادثة
-                if self.chat_ctx:
-                    podcast_memory_context = self._build_podcast_memory_context()
-                    if podcast_memory_context:
-                        new_ctx = self.chat_ctx.copy()
-                        new_ctx.add_message(role="system", content=podcast_memory_context)
-                
-        except Exception as e:
-            pass  # تجاهل الأخطاء بصمت
+        """تحميل تقدم البودكاست للمستخدم (السياق يُحقن من load_mode_memory)"""
+        self.podcast_progress = await supabase_manager.get_or_create_podcast_progress(self.user_id)
     
     def _build_podcast_memory_context(self) -> str:
         """بناء سياق الذاكرة لوضع البودكاست"""
-        if not self.podcast_progress:
-            return ""
-        
-        last_topic = self.podcast_progress.get('last_topic', '')
-        last_position = self.podcast_progress.get('last_position', '')
-        last_context = self.podcast_progress.get('last_context', '')
-        conversation_summary = self.podcast_progress.get('conversation_summary', '')
-        topics_discussed = self.podcast_progress.get('topics_discussed', [])
-        total_conversations = self.podcast_progress.get('total_conversations', 0)
-        fluency_level = self.podcast_progress.get('fluency_level', 'beginner')
-        common_mistakes = self.podcast_progress.get('common_mistakes', [])
-        improvements = self.podcast_progress.get('improvements', [])
-        
-        context = f"""
-=== Podcast Conversation Memory for: {self.user_name} ===
-📊 Statistics:
-- Total conversations: {total_conversations}
-- Fluency level: {fluency_level}
-- Topics discussed: {', '.join(topics_discussed[-5:]) if topics_discussed else 'None yet'}
-
-📍 Last Session:
-- Topic: {last_topic or 'First conversation'}
-- Position: {last_position or 'Starting fresh'}
-- Context: {last_context or 'No previous context'}
-- Summary: {conversation_summary or 'This is our first conversation'}
-
-🎯 Common Mistakes to Address:
-{chr(10).join([f"- {mistake}" for mistake in common_mistakes[-5:]]) if common_mistakes else "- No mistakes recorded yet"}
-
-✨ Noticed Improvements:
-{chr(10).join([f"- {improvement}" for improvement in improvements[-5:]]) if improvements else "- First session"}
-
-🔥 CRITICAL INSTRUCTIONS FOR RETURNING USER:
-1. If there was a previous topic ({last_topic}), acknowledge it naturally:
-   "Hey! Last time we were talking about {last_topic}. {last_position}"
-   "Would you like to continue that conversation or talk about something new?"
-
-2. Reference their progress naturally:
-   - Mention improvements you've noticed
-   - Gently correct recurring mistakes
-   - Build on previous conversations
-
-3. Adapt to their fluency level ({fluency_level}):
-   - Beginner: Simple vocabulary, more support
-   - Intermediate: Mix complexity, gentle corrections
-   - Advanced: Natural flow, minimal interruptions
-
-4. Make the conversation feel continuous and personal!
-"""
-        
-        return context
+        return self.memory_renderer.render(self, "podcast")
     
     async def load_personal_context(self):
         """تحميل السياق الشخصي للمستخدم"""
-        if not self.user_id:
-            return
-        
-        try:
-            # جلب السياق الشخصي
-            self.personal_context = await supabase_manager.get_or_create_personal_context(self.user_id)
-            
-            if self.personal_context:
-                # تسجيل السياق الشخصي
-                personal_memory = self._build_personal_context_memory()
-                if personal_memory:
-                    logging.info(f"[agent] ✅ تم تحميل السياق الشخصي (اكتمال: {self.personal_context.get('context_completeness', 0)}%)")
-        except Exception as e:
-            logging.error(f"[agent] خطأ في تحميل السياق الشخصي: {e}")
+        self.personal_context = await supabase_manager.get_or_create_personal_context(self.user_id)
+        if self.personal_context:
+            logging.info(f"[agent] ✅ تم تحميل السياق الشخصي (اكتمال: {self.personal_context.get('context_completeness', 0)}%)")
     
     async def load_gamification_data(self):
         """تحميل بيانات التحفيز والإنجازات"""
-        if not self.user_id:
-            return
-        
-        try:
-            # جلب التقييم والإنجازات
-            self.level_assessment = await supabase_manager.get_or_create_level_assessment(self.user_id)
-            self.achievements = await supabase_manager.get_or_create_achievements(self.user_id)
-            
-            # تحديث الـ streak
-            await supabase_manager.update_streak(self.user_id)
-            
-            # تسجيل معلومات التحفيز
-            if self.achievements:
-                logging.info(f"[agent] ✅ تم تحميل بيانات التحفيز:")
-                logging.info(f"  - Level: {self.achievements.get('current_level', 1)}")
-                logging.info(f"  - Points: {self.achievements.get('total_points', 0)}")
-                logging.info(f"  - Streak: {self.achievements.get('current_streak', 0)} days")
-                logging.info(f"  - Words: {self.achievements.get('total_words_learned', 0)}")
-        except Exception as e:
-            logging.error(f"[agent] خطأ في تحميل بيانات التحفيز: {e}")
+        # التقييم وتحديث الـ streak بالتوازي - تحديث الـ streak يعيد صف الإنجازات المحدّث
+        self.level_assessment, streak = await asyncio.gather(
+            supabase_manager.get_or_create_level_assessment(self.user_id),
+            supabase_manager.update_streak(self.user_id),
+        )
+        self.achievements = (streak or {}).get("data") or await supabase_manager.get_or_create_achievements(self.user_id)
+        
+        # تسجيل معلومات التحفيز
+        if self.achievements:
+            logging.info(f"[agent] ✅ تم تحميل بيانات التحفيز:")
+            logging.info(f"  - Level: {self.achievements.get('current_level', 1)}")
+            logging.info(f"  - Points: {self.achievements.get('total_points', 0)}")
+            logging.info(f"  - Streak: {self.achievements.get('current_streak', 0)} days")
+            logging.info(f"  - Words: {self.achievements.get('total_words_learned', 0)}")
     
     async def track_new_word(self, word: str, translation: str = "", example: str = "", topic: str = ""):
         """تتبع كلمة جديدة لنظام المراجعة"""
@@ -462,7 +404,7 @@ class Assistant(Agent):
             
             # إذا كانت كلمة جديدة (ليست موجودة مسبقاً)
             if result.get("success") and not result.get("exists"):
-                self.words_learned_session.append(word)
+                self.stats.words_learned += 1
                 
                 # تحديث عداد الكلمات في user_achievements
                 if self.achievements:
@@ -482,37 +424,48 @@ class Assistant(Agent):
         if not self.user_id:
             return
         
+        if self.daily_stats:
+            self.daily_stats.add(points_earned=points)
+        self.pending_points += points
+        self.pending_point_awards += 1
+        self.pending_point_reason = reason
         try:
-            result = await supabase_manager.award_points(self.user_id, points, reason)
-            
-            if result.get("level_up"):
-                # المستخدم ارتقى!
-                new_level = result.get("new_level")
-                celebration = f"🎉 LEVEL UP! You reached Level {new_level}! 🎉"
-                logging.info(f"[agent] 🎆 LEVEL UP: {self.user_id} -> Level {new_level}")
-                # يمكن إرسال رسالة للمستخدم هنا
+            await self.writes.submit("points", self._send_pending_points)
         except Exception as e:
             logging.error(f"[agent] خطأ في منح النقاط: {e}")
     
+    async def _send_pending_points(self):
+        """إرسال النقاط المتراكمة كمنحة واحدة (تعود للتراكم عند الفشل)"""
+        points, awards = self.pending_points, self.pending_point_awards
+        if not points:
+            return
+        self.pending_points = self.pending_point_awards = 0
+        reason = self.pending_point_reason if awards == 1 else f"{awards} awards"
+        try:
+            result = await supabase_manager.award_points(self.user_id, points, reason)
+        except BaseException:
+            self.pending_points += points
+            self.pending_point_awards += awards
+            raise
+        
+        if result.get("level_up"):
+            # المستخدم ارتقى!
+            new_level = result.get("new_level")
+            celebration = f"🎉 LEVEL UP! You reached Level {new_level}! 🎉"
+            logging.info(f"[agent] 🎆 LEVEL UP: {self.user_id} -> Level {new_level}")
+            # يمكن إرسال رسالة للمستخدم هنا
+    
     async def track_answer(self, correct: bool):
         """تتبع إجابة لتحديث الإحصائيات"""
-        self.session_total_attempts += 1
+        self.stats.total_attempts += 1
         if correct:
-            self.session_correct_answers += 1
+            self.stats.correct_answers += 1
             # منح نقاط
             await self.award_points(5, "correct answer")
         
-        # 📊 تحديث daily_stats فورياً بدلاً من الانتظار لنهاية الجلسة
-        if self.user_id:
-            try:
-                accuracy = (self.session_correct_answers / self.session_total_attempts * 100) if self.session_total_attempts > 0 else 0
-                await supabase_manager.update_daily_stats(self.user_id, {
-                    "correct_answers": self.session_correct_answers,
-                    "total_attempts": self.session_total_attempts,
-                    "daily_accuracy": accuracy
-                })
-            except Exception as e:
-                pass  # تجاهل الأخطاء بصمت
+        # 📊 تسجيل الفرق فقط - يُرسل لـ daily_stats مع الحفظ الدوري ونهاية الجلسة
+        if self.daily_stats:
+            self.daily_stats.add(correct_answers=1 if correct else 0, total_attempts=1)
     
     async def end_session_summary(self):
         """ملخص نهاية الجلسة"""
@@ -521,160 +474,26 @@ class Assistant(Agent):
         
         try:
             # حساب مدة الجلسة
-            duration = (datetime.now() - self.session_start_time).seconds // 60
+            duration = int(self.stats.seconds_since_start()) // 60
             
             # حساب الدقة
-            accuracy = 0
-            if self.session_total_attempts > 0:
-                accuracy = (self.session_correct_answers / self.session_total_attempts) * 100
+            accuracy = self.stats.accuracy
             
-            # تحديث الإحصائيات اليومية
-            await supabase_manager.update_daily_stats(self.user_id, {
-                "minutes_studied": duration,
-                "words_learned": len(self.words_learned_session),
-                "correct_answers": self.session_correct_answers,
-                "total_attempts": self.session_total_attempts
-            })
+            # تحديث الإحصائيات اليومية (الإجابات أُضيفت مسبقاً عبر track_answer)
+            if self.daily_stats:
+                self.daily_stats.add(
+                    minutes_studied=duration,
+                    words_learned=self.stats.words_learned
+                )
+                await self.daily_stats.flush()
             
-            logging.info(f"[agent] 📊 جلسة منتهية: {duration}د, {len(self.words_learned_session)} كلمة, {accuracy:.1f}% دقة")
+            logging.info(f"[agent] 📊 جلسة منتهية: {duration}د, {self.stats.words_learned} كلمة, {accuracy:.1f}% دقة, لغة الإجابات: {self.stats.language_turns}")
         except Exception as e:
             logging.error(f"[agent] خطأ في ملخص الجلسة: {e}")
     
     def _build_personal_context_memory(self) -> str:
         """بناء سياق الذاكرة الشخصية للمستخدم"""
-        if not self.personal_context:
-            return ""
-        
-        context = f"""
-=== 🌟 PERSONAL CONTEXT FOR: {self.user_name} ===
-
-USE THIS INFORMATION TO CREATE PERSONALIZED, REAL-LIFE EXAMPLES!
-
-👤 **Basic Info:**
-- Name: {self.personal_context.get('first_name', 'Unknown')}
-- Age: {self.personal_context.get('age', 'Unknown')}
-- Occupation: {self.personal_context.get('occupation', 'Unknown')}
-- City: {self.personal_context.get('city', 'Unknown')}
-
-👨‍👩‍👧‍👦 **Family & Friends:**
-- Family members: {', '.join([f"{k}: {v}" for k, v in self.personal_context.get('family_members', {}).items()]) or 'Not yet collected'}
-- Friends: {', '.join(self.personal_context.get('friends', [])) or 'Not yet collected'}
-- Pets: {', '.join([f"{p.get('name')} ({p.get('type')})" for p in self.personal_context.get('pets', [])]) or 'None'}
-
-❤️ **Interests & Preferences:**
-- Hobbies: {', '.join(self.personal_context.get('hobbies', [])) or 'Not yet collected'}
-- Favorite foods: {', '.join(self.personal_context.get('favorite_foods', [])) or 'Not yet collected'}
-- Favorite colors: {', '.join(self.personal_context.get('favorite_colors', [])) or 'Not yet collected'}
-
-🏠 **Environment:**
-- Objects around: {', '.join(self.personal_context.get('objects_around', [])) or 'Not yet collected'}
-- Home items: {', '.join(self.personal_context.get('home_items', [])) or 'Not yet collected'}
-- Room: {self.personal_context.get('room_description', 'Not described yet')}
-
-🎯 **Goals & Dreams:**
-- Learning goals: {', '.join(self.personal_context.get('learning_goals', [])) or 'Not yet discussed'}
-- Dream job: {self.personal_context.get('dream_job', 'Not shared yet')}
-- Want to visit: {', '.join(self.personal_context.get('places_want_to_visit', [])) or 'Not shared yet'}
-
-📊 **Context Completeness: {self.personal_context.get('context_completeness', 0)}%**
-
-⚠️ **CRITICAL INSTRUCTIONS:**
-
-1. **IF INFO IS MISSING**: Ask naturally during the lesson!
-   - Example: "Before we continue, what's your name?" (if name is missing)
-   - Example: "Tell me, what objects do you see around you?" (when teaching nouns)
-
-2. **USE THEIR ACTUAL INFO IN EXAMPLES**:
-   - ❌ DON'T SAY: "John has a book"
-   - ✅ DO SAY: "{self.personal_context.get('first_name', 'You')} has a {self.personal_context.get('objects_around', ['phone'])[0] if self.personal_context.get('objects_around') else 'phone'}"
-
-3. **MAKE IT PERSONAL AND ENGAGING**:
-   - Use their family names, friend names, hobbies, favorite things
-   - Reference their daily life, environment, goals
-   - Make them the HERO of every example!
-
-4. **UPDATE AS YOU GO**:
-   - When they mention new info, use it immediately
-   - Keep the context fresh and current
-
-**Remember**: This is THEIR English learning journey, not a generic textbook!
-"""
-        return context
-    
-    def _extract_personal_info_from_text(self, text: str) -> dict:
-        """استخراج معلومات شخصية من نص المستخدم"""
-        if not text:
-            return {}
-        
-        text_lower = text.lower()
-        updates = {}
-        
-        # استخراج الاسم
-        name_patterns = [
-            r"(?:my name is|i'm|i am|call me|\u0627\u0633\u0645\u064a|\u0623\u0646\u0627)\s+([\u0627-\u064a\u0621-\u064a\w]+)",
-            r"^([\u0627-\u064a\u0621-\u064a\w]+)$"  # إذا كانت إجابة بكلمة واحدة فقط
-        ]
-        for pattern in name_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.UNICODE)
-            if match and len(match.group(1)) > 1 and len(match.group(1)) < 20:
-                potential_name = match.group(1).strip()
-                # تجنب الكلمات الشائعة غير الأسماء
-                excluded = ['yes', 'no', 'okay', 'sure', 'hello', 'hi', 'thanks', 'thank', 'نعم', 'لا', 'شوكرا', 'مرحبا']
-                if potential_name.lower() not in excluded:
-                    updates['first_name'] = potential_name.title()
-                    break
-        
-        # استخراج العمر
-        age_match = re.search(r'(?:\u0639\u0645\u0631\u064a|age|i am|i\'m|\u0623\u0646\u0627)\s*(\d{1,2})(?:\s*(?:year|\u0633\u0646\u0629|\u0639\u0627\u0645))?', text, re.IGNORECASE | re.UNICODE)
-        if age_match:
-            age = int(age_match.group(1))
-            if 5 <= age <= 100:  # عمر منطقي
-                updates['age'] = age
-        
-        # استخراج المدينة
-        city_patterns = [
-            r'(?:from|in|live in|\u0645\u0646|\u0641\u064a|\u0623\u0633\u0643\u0646 \u0641\u064a)\s+([\u0627-\u064a\u0621-\u064a\w\s]+?)(?:\.|,|$)',
-            r'(?:city|\u0645\u062f\u064a\u0646\u0629|\u0645\u062f\u064a\u0646\u062a\u064a)\s+(?:is|:)?\s*([\u0627-\u064a\u0621-\u064a\w\s]+?)(?:\.|,|$)'
-        ]
-        for pattern in city_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.UNICODE)
-            if match:
-                city = match.group(1).strip()
-                if len(city) > 2 and len(city) < 30:
-                    updates['city'] = city.title()
-                    break
-        
-        # استخراج المهنة
-        occupation_patterns = [
-            r'(?:i\'m a|i am a|i work as|\u0623ن\u0627|\u0639مل\u064a)\s+(student|teacher|engineer|doctor|developer|designer|\u0637\u0627\u0644\u0628|\u0645ه\u0646\u062f\u0633|\u0637\u0628\u064a\u0628|\u0645\u0639\u0644\u0645|\u0645\u0628\u0631\u0645\u062c)',
-            r'(?:job|work|occupation|\u0645\u0647\u0646\u0629|\u0639\u0645\u0644)\s*(?:is|:)?\s*([\u0627-\u064a\u0621-\u064a\w]+)'
-        ]
-        for pattern in occupation_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.UNICODE)
-            if match:
-                updates['occupation'] = match.group(1).strip()
-                break
-        
-        # استخراج الهوايات
-        hobby_keywords = ['football', 'soccer', 'reading', 'cooking', 'gaming', 'music', 'swimming', 'running',
-                         'قراءة', 'كرة', 'طبخ', 'ألعاب', 'موسيقى', 'سباحة', 'جري']
-        found_hobbies = []
-        for hobby in hobby_keywords:
-            if hobby in text_lower:
-                found_hobbies.append(hobby)
-        
-        # استخراج قوائم بشكل عام
-        list_match = re.findall(r'([\u0627-\u064a\u0621-\u064a\w]+)\s*(?:,|\u0648)\s*([\u0627-\u064a\u0621-\u064a\w]+)', text, re.UNICODE)
-        if list_match and not updates.get('first_name'):  # إذا لم يتم العثور علأ اسم
-            items = [item for pair in list_match for item in pair]
-            # قد تكون أسماء أشياء محيطة
-            if any(word in text_lower for word in ['see', 'have', 'around', 'حول', 'عندي', 'أرى']):
-                found_hobbies.extend(items[:3])  # أول 3 عناصر
-        
-        if found_hobbies:
-            updates['hobbies'] = found_hobbies[:5]  # أقصى 5
-        
-        return updates
+        return self.memory_renderer.render(self, "personal")
     
     async def update_personal_context_from_conversation(self, detected_info: dict):
         """تحديث السياق الشخصي من المحادثة"""
@@ -682,73 +501,103 @@ USE THIS INFORMATION TO CREATE PERSONALIZED, REAL-LIFE EXAMPLES!
             return
         
         try:
-            # تحديث المعلومات في قاعدة البيانات
-            await supabase_manager.update_personal_context(self.user_id, detected_info)
-            # تحديث الذاكرة المحلية
-            if self.personal_context:
-                self.personal_context.update(detected_info)
-                print(f"[agent] ✅ تم تحديث السياق الشخصي: {list(detected_info.keys())}")
+            # تجاهل ما هو محفوظ مسبقاً (نفس الاسم، نفس الهوايات...)
+            changes = diff_personal_context(self.personal_context, detected_info)
+            if not changes:
+                return
+            # تحديث الذاكرة المحلية فوراً بنفس قواعد دمج الخادم
+            if self.personal_context is not None:
+                merge_personal_context(self.personal_context, changes)
+                self.memory_renderer.invalidate("personal_context")
+            # الكتابة في قاعدة البيانات مؤجلة ومجمّعة
+            self.personal_writer.add(changes)
+            print(f"[agent] ✅ تم تحديث السياق الشخصي: {list(changes.keys())}")
         except Exception as e:
             print(f"[agent] خطأ في تحديث السياق: {e}")
     
-    async def _auto_extract_and_save_context(self, user_message: str):
-        """استخراج وحفظ تلقائي للمعلومات من رسالة المستخدم"""
-        if not user_message or not self.user_id:
-            return
-        
-        try:
-            # استخراج المعلومات
-            extracted = self._extract_personal_info_from_text(user_message)
-            
-            if extracted:
-                # حفظ فوراً
-                await self.update_personal_context_from_conversation(extracted)
-        except Exception as e:
-            # خطأ صامت - لا نريد إيقاف المحادثة
-            pass
+    async def load_user_progress(self):
+        """تحميل تقدم المستخدم في الوضع العادي"""
+        self.user_progress = await supabase_manager.get_or_create_user_progress(self.user_id)
+        if self.user_progress:
+            print(f"[LOAD] ✅ تم تحميل التقدم: {self.user_progress.get('words_learned', 0)} كلمة")
+        else:
+            print(f"[LOAD] ⚠️ لم يتم تحميل أي تقدم - سيتم إنشاء سجل جديد")
     
-    async def load_user_memory(self):
-        """تحميل ذاكرة المستخدم من قاعدة البيانات"""
+    async def load_mode_memory(self):
+        """تحميل ذاكرة المستخدم حسب خطة الوضع: الصفوف بالتوازي ثم حقن السياق في update_chat_ctx واحد"""
         if not self.user_id:
+            self.memory_loaded.set()
             return
         
-        # تحميل السياق الشخصي أولاً (لجميع الأوضاع)
-        await self.load_personal_context()
-        
-        # تحميل بيانات التحفيز (لجميع الأوضاع)
-        await self.load_gamification_data()
-            
-        # إذا كان في وضع تعليم الجمل، حمل تقدم الجمل فقط
-        if self.mode == "sentences_learning":
-            await self.load_sentences_progress()
-            return  # لا نحتاج لتحميل user_progress في هذا الوضع
-        
-        # إذا كان في وضع البودكاست، حمل تقدم البودكاست
-        if self.mode == "english_conversation":
-            await self.load_podcast_progress()
-            return
-        
-        try:
-            # تحميل صامت للبيانات بدون طباعة لتسريع البداية
-            print(f"[LOAD] 📂 جارٍ تحميل تقدم المستخدم: {self.user_id}")
-            self.user_progress = await supabase_manager.get_or_create_user_progress(self.user_id)
-            
-            if self.user_progress:
-                print(f"[LOAD] ✅ تم تحميل التقدم: {self.user_progress.get('words_learned', 0)} كلمة")
-                
-                # تحديث سياق المحادثة بالذاكرة
-                memory_context = self._build_memory_context()
-                new_ctx = self.chat_ctx.copy()
-                new_ctx.add_message(role="system", content=memory_context)
-                await self.update_chat_ctx(new_ctx)
-            else:
-                print(f"[LOAD] ⚠️ لم يتم تحميل أي تقدم - سيتم إنشاء سجل جديد")
-                
-        except Exception as e:
-            # تسجيل الخطأ لمعرفة سبب فشل تحميل user_progress
-            print(f"[LOAD] ❌ خطأ في تحميل user_progress: {str(e)}")
-            import traceback
-            print(f"[LOAD] 🐞 Traceback: {traceback.format_exc()}")
+        plan = memory_plan(self.mode)
+        started = time.perf_counter()
+        timings = await fetch_rows(plan, {
+            PERSONAL_CONTEXT: self.load_personal_context,
+            GAMIFICATION: self.load_gamification_data,
+            USER_PROGRESS: self.load_user_progress,
+            SENTENCES_PROGRESS: self.load_sentences_progress,
+            PODCAST_PROGRESS: self.load_podcast_progress,
+        })
+        # الصفوف وصلت (أو فشلت وسُجلت) - الحفظ يمكن أن يبدأ، حتى قبل حقن السياق
+        self.memory_loaded.set()
+        self._schedule_backlog()
+        
+        # المستندات التي لم يُحمّل صفها تُرسم فارغة وتُتجاهل
+        sections = [text for text in (self.memory_renderer.render(self, doc) for doc in plan.documents) if text]
+        if sections:
+            new_ctx = self.chat_ctx.copy()
+            # معرف كتلة الذاكرة: ضغط السياق يثبت أحدث كتلة فقط ويحذف الأقدم
+            new_ctx.add_message(role="system", content="\n\n".join(sections), id=f"{MEMORY_ID_PREFIX}{int(time.time() * 1000)}")
+            await self.update_chat_ctx(new_ctx)
+        
+        rows = ", ".join(f"{row}={seconds * 1000:.0f}ms" for row, seconds in timings.items())
+        print(f"[LOAD] 🧠 ذاكرة {plan.mode}: {len(timings)}/{len(plan.rows)} صفوف في {(time.perf_counter() - started) * 1000:.0f}ms ({rows})")
+        for doc in plan.documents:
+            print(f"[LOAD] 🧠 {self.memory_renderer.report(doc)}")
+    
+    def _memory_ready(self, retry) -> bool:
+        """هل يمكن تنفيذ كتابة تعتمد على الذاكرة الآن (نسبة التقدم المحفوظة، حالة الجمل)؟
+        لا تنتظر: المعالجات تعمل في مستهلك طابور الأحداث الوحيد، والانتظار فيها يوقف كل الأحداث خلفها.
+        قبل وصول الذاكرة (أو مع كتابات سابقة لم تُعد بعد) تُضاف retry إلى memory_backlog بالترتيب
+        وتُعاد بعد التحميل؛ وإذا انتهت الجلسة قبل الذاكرة تُتخطى بدل أن تكتب فوق تقدم أعلى"""
+        if self.memory_abandoned:
+            print("[agent] ⏳ الجلسة انتهت قبل تحميل الذاكرة - تخطي حفظ التقدم")
+            return False
+        if self.memory_loaded.is_set() and (self.replaying_backlog or not self.memory_backlog):
+            return True
+        self.memory_backlog.append(retry)
+        return False
+    
+    def attach_events(self, events):
+        """ربط طابور أحداث الجلسة - تُعاد الكتابات المؤجلة عبره بالترتيب مع باقي الأحداث"""
+        self.events = events
+        self._schedule_backlog()
+    
+    def _schedule_backlog(self):
+        if self.memory_backlog and self.memory_loaded.is_set() and self.events is not None:
+            self.events.submit("memory_backlog", self._replay_backlog, None)
+    
+    async def _replay_backlog(self, _event=None):
+        """إعادة الكتابات المؤجلة بعد وصول الذاكرة (حدث في الطابور - لا يتزامن مع المعالجات الأخرى)"""
+        if self.memory_backlog:
+            print(f"[agent] 🧠 إعادة {len(self.memory_backlog)} كتابة مؤجلة حتى تحميل الذاكرة")
+        while self.memory_backlog and not self.memory_abandoned:
+            retry = self.memory_backlog.popleft()
+            self.replaying_backlog = True
+            try:
+                await retry()
+            except Exception as e:
+                print(f"[agent] خطأ في كتابة مؤجلة حتى تحميل الذاكرة: {e}")
+            finally:
+                self.replaying_backlog = False
+    
+    def abandon_memory(self):
+        """أُلغي تحميل الذاكرة قبل وصول الصفوف - الكتابات المؤجلة تُتخطى"""
+        self.memory_abandoned = True
+        self.memory_loaded.set()
+        if self.memory_backlog:
+            print(f"[agent] ⏳ الجلسة انتهت قبل تحميل الذاكرة - تخطي {len(self.memory_backlog)} كتابة مؤجلة")
+            self.memory_backlog.clear()
     
     def _build_memory_context(self) -> str:
         """بناء سياق الذاكرة للمحادثة - يدعم الوضع العادي ووضع تعليم الجمل"""
@@ -757,122 +606,19 @@ USE THIS INFORMATION TO CREATE PERSONALIZED, REAL-LIFE EXAMPLES!
         if self.mode == "sentences_learning":
             return self._build_sentences_memory_context()
         
-        # الوضع العادي
-        if not self.user_progress:
-            return ""
-        
-        # بناء قائمة الكلمات المتعلمة
-        vocabulary = self.user_progress.get('vocabulary', {})
-        learned_words = list(vocabulary.keys())[:10]  # أول 10 كلمات
-        
-        # تحديد حالة الموضوع الحالي
-        current_topic = self.user_progress.get('current_topic', '')
-        progress_percentage = self.user_progress.get('progress_percentage', 0)
-        is_topic_incomplete = current_topic and progress_percentage < 100
-        
-        context = f"""
-=== ذاكرة المستخدم: {self.user_name} ===
-📊 إحصائيات التعلم:
-- عدد الكلمات المتعلمة: {self.user_progress.get('words_learned', 0)}
-- نسبة التقدم: {progress_percentage}%
-- آخر جلسة: {self.user_progress.get('last_session_at', 'لا توجد جلسات سابقة')}
-
-📚 الموضوع الحالي: {current_topic or 'لم يبدأ بعد'}
-📍 آخر نقطة توقف: {self.user_progress.get('last_position', 'البداية')}
-✅ المواضيع المكتملة: {', '.join(self.user_progress.get('topics_completed', [])) or 'لا توجد'}
-
-🔤 بعض الكلمات المتعلمة: {', '.join(learned_words) if learned_words else 'لا توجد كلمات بعد'}
-
-🎯 تعليمات مهمة للمساعد:
-{"⚠️ هناك موضوع غير مكتمل!" if is_topic_incomplete else "✅ لا يوجد موضوع معلق"}
-
-CRITICAL INSTRUCTIONS FOR RETURNING USER:
-1. إذا كان هناك موضوع حالي غير مكتمل ({current_topic}), يجب أن تسأل المستخدم:
-   "أهلاً بك مرة أخرى! أرى أنك كنت تدرس موضوع {current_topic} وتوقفت عند {self.user_progress.get('last_position', 'البداية')}"
-   "هل تريد أن نكمل من حيث توقفنا، أم تفضل البدء بموضوع جديد؟"
-
-2. انتظر إجابة المستخدم قبل المتابعة - لا تفترض أي شيء!
-
-3. إذا اختار "نكمل":
-   - استكمل من آخر نقطة توقف
-   - راجع الكلمات السابقة بسرعة
-   - تابع الشرح من النقطة المحفوظة
-
-4. إذا اختار "موضوع جديد":
-   - اقترح الموضوع التالي المناسب
-   - امسح بيانات الجلسة القديمة
-   - ابدأ بتقييم سريع إذا لزم الأمر
-
-5. للمستخدمين الجدد: ابدأ بالتقييم المعتاد (5 أسئلة) ثم موضوع الأسماء
-
-6. احفظ التقدم باستمرار أثناء الجلسة
-"""
-        
-        # إضافة تاريخ المحادثات الأخيرة مع تفاصيل أكثر
-        conversation_history = self.user_progress.get('conversation_history', {})
-        if conversation_history:
-            recent_sessions = list(conversation_history.items())[-2:]  # آخر جلستين
-            context += "\n📝 آخر المحادثات:\n"
-            for session_id, session_data in recent_sessions:
-                topic = session_data.get('topic', 'غير محدد')
-                words_count = len(session_data.get('words_discussed', []))
-                last_pos = session_data.get('last_position', '')
-                context += f"- {topic}: {words_count} كلمة، توقف عند: {last_pos}\n"
-        
-        context += "\n⚠️ مهم: استخدم هذه المعلومات لتقديم تجربة تعليمية متواصلة ومخصصة!\n"
-        
-        return context
+        # الوضع العادي - الأقسام تُعاد فقط عند تغير حقولها
+        return self.memory_renderer.render(self, "progress")
     
     def _build_sentences_memory_context(self) -> str:
         """بناء سياق الذاكرة لوضع تعليم الجمل"""
-        if not self.sentences_progress:
-            return ""
-        
-        # بناء قائمة الجمل المتعلمة
-        learned_sentences_history = self.sentences_progress.get('learned_sentences_history', [])
-        current_sentences = self.sentences_progress.get('generated_sentences', [])
-        completed_sentences = self.sentences_progress.get('completed_sentences', 0)
-        current_level = self.sentences_progress.get('current_level', 1)
-        current_sentence_index = self.sentences_progress.get('current_sentence_index', 0)
-        total_sentences = len(current_sentences)
-        
-        # آخر 10 جمل متعلمة
-        recent_learned = learned_sentences_history[-10:] if learned_sentences_history else []
-        
-        # الجمل الحالية في الجلسة
-        remaining_sentences = current_sentences[current_sentence_index:current_sentence_index + 5] if current_sentences else []
-        
-        context = f"""
-=== ذاكرة تعليم الجمل للمستخدم: {self.user_name} ===
-📊 إحصائيات الجلسة:
-- المستوى الحالي: {current_level}
-- الجمل المكتملة: {completed_sentences}
-- إجمالي الجمل في الجلسة: {total_sentences}
-- الجملة التالية: {current_sentence_index + 1}
-
-📝 آخر 10 جمل تعلمها المستخدم:
-{chr(10).join([f"- {sentence}" for sentence in recent_learned]) if recent_learned else "- لا توجد جمل متعلمة بعد"}
-
-🎯 الجمل التالية في الجلسة:
-{chr(10).join([f"- {sentence}" for sentence in remaining_sentences]) if remaining_sentences else "- لا توجد جمل جديدة"}
-
-🔥 تعليمات مهمة للمساعد في وضع الجمل:
-1. أنت في وضع تعليم الجمل البسيطة - ركز على الجمل فقط
-2. المستخدم تعلم بالفعل {len(learned_sentences_history)} جملة في المجموع
-3. يجب عليك تذكر الجمل التي تعلمها وتجنب تكرارها
-4. ابدأ من المستوى {current_level} واستمر في التدرج
-5. استخدم الجمل المتعلمة كمرجع لبناء جمل جديدة
-6. انتبه للتقدم التدريجي من البسيط للمعقد
-
-⚠️ CRITICAL: تذكر الجمل المحددة أعلاه - لا تكررها!
-"""
-        
-        return context
+        return self.memory_renderer.render(self, "sentences")
     
     async def save_session_progress(self, topic: str = "", words_discussed: list = None, progress_made: int = 0, last_position: str = "", session_summary: str = ""):
         """حفظ تقدم الجلسة الحالية - منفصل للوضع العادي ووضع الجمل ووضع البودكاست"""
         if not self.user_id:
             return
+        if not self._memory_ready(lambda: self.save_session_progress(topic, words_discussed, progress_made, last_position, session_summary)):
+            return
             
         # في وضع الجمل، لا نحفظ في user_progress - نظام منفصل
         if self.mode == "sentences_learning":
@@ -887,43 +633,53 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
         try:
             # تحديث بيانات الجلسة الحالية
             if topic:
-                self.session_data["current_topic"] = topic
+                self.session_data.current_topic = topic
             if words_discussed:
-                self.session_data["words_discussed"] = words_discussed
+                self.vocabulary.add_many(words_discussed)
             if last_position:
-                self.session_data["last_position"] = last_position
+                self.session_data.last_position = last_position
             
+            # نرسل الكلمات الجديدة منذ آخر حفظ فقط - الخادم يدمجها مع كلمات الجلسة
+            new_words = self.vocabulary.unsaved()
             conversation_data = {
-                "session_id": self.session_data["session_id"],
-                "topic": topic or self.session_data.get("current_topic", ""),
-                "words_discussed": words_discussed or self.session_data.get("words_discussed", []),
+                "session_id": self.session_data.session_id,
+                "topic": topic or self.session_data.current_topic,
+                "words_discussed": new_words,
                 "progress_made": progress_made,
-                "last_position": last_position or self.session_data.get("last_position", ""),
+                "last_position": last_position or self.session_data.last_position,
                 "session_summary": session_summary,
-                "session_data": self.session_data
+                "session_data": self._session_data_snapshot()
             }
             
             # حفظ بيانات المحادثة (باستثناء وضع البودكاست المعزول)
             if self.mode != "english_conversation":
                 await supabase_manager.save_conversation_data(self.user_id, conversation_data)
+                self.vocabulary.mark_saved(len(new_words))
             
             # تحديث نسبة التقدم والموضع فقط (للوضع العادي فقط)
-            current_words_count = len(set(self.session_data.get("words_discussed", [])))
-            current_topic = self.session_data.get("current_topic", "")
-            last_position = self.session_data.get("last_position", "")
+            current_words_count = len(self.vocabulary)
+            progress_percentage, topics_completed = self._topic_progress()
+            current_topic = self.session_data.current_topic
+            last_position = self.session_data.last_position
             
             # فحص وجود بيانات للحفظ
-            if current_words_count > 0 or current_topic or last_position:
+            if self.user_progress is None:
+                # فشل تحميل التقدم المحفوظ - لا مرجع لمقارنة النسبة أو الموضوع فلا نكتب فوقهما
+                print(f"[SAVE] ⚠️ التقدم المحفوظ غير محمّل - تخطي تحديث user_progress")
+            elif current_words_count > 0 or current_topic or last_position:
                 print(f"[SAVE] 💾 جارٍ حفظ التقدم: user_id={self.user_id}")
                 
                 result = await supabase_manager.update_user_progress(
                     user_id=self.user_id,
                     current_topic=current_topic or "General",
                     last_position=last_position or "In progress",
-                    progress_percentage=min(100, current_words_count * 2)
+                    progress_percentage=progress_percentage,
+                    topics_completed=topics_completed
                 )
                 
                 if result:
+                    if topics_completed and self.user_progress is not None:
+                        self.user_progress["topics_completed"] = topics_completed
                     print(f"[SAVE] ✅ تم حفظ التقدم: موضوع={current_topic or 'N/A'}, موضع={last_position or 'N/A'}, كلمات={current_words_count}")
                 else:
                     print(f"[SAVE] ⚠️ فشل حفظ التقدم - لم يرجع result")
@@ -939,20 +695,23 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
         """حفظ تقدم محادثة البودكاست في قاعدة البيانات المنفصلة"""
         if not self.user_id or self.mode != "english_conversation":
             return
+        if not self._memory_ready(lambda: self.save_podcast_progress(topic, words_discussed, last_position, session_summary)):
+            return
         
         try:
             # حساب مدة المحادثة
-            duration_minutes = 0
-            if hasattr(self, 'conversation_start_time'):
-                duration_minutes = int((datetime.now() - self.conversation_start_time).total_seconds() / 60)
+            duration_minutes = self.podcast.duration_minutes()
             
             # استخراج الموضوع من المحادثة إذا لم يُحدد
             if not topic:
-                topic = self.session_data.get("current_topic", "")
+                topic = self.session_data.current_topic
+            
+            if words_discussed:
+                self.vocabulary.add_many(words_discussed)
             
             # إذا لم يكن هناك موضوع، حاول استخراجه من الكلمات
-            if not topic and hasattr(self, 'session_data'):
-                words = self.session_data.get("words_discussed", [])
+            if not topic:
+                words = self.vocabulary
                 # البحث عن مواضيع شائعة في الكلمات
                 topic_keywords = {
                     'technology': ['technology', 'computer', 'phone', 'internet', 'software', 'hardware'],
@@ -965,14 +724,15 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
                 for topic_name, keywords in topic_keywords.items():
                     if any(word in words for word in keywords):
                         topic = topic_name.capitalize()
-                        self.session_data["current_topic"] = topic
+                        self.session_data.current_topic = topic
                         break
             
-            # جمع المفردات المستخدمة
-            vocabulary = words_discussed or self.conversation_vocabulary or []
+            # المفردات الجديدة منذ آخر حفظ فقط (حتى لا تتضاعف العدادات في vocabulary_used)
+            vocabulary = self.vocabulary.unsaved()
             
-            # تحديد مستوى الطلاقة بناءً على الأداء
-            fluency_level = self.podcast_progress.get('fluency_level', 'beginner') if self.podcast_progress else 'beginner'
+            # تحديد مستوى الطلاقة بناءً على الأداء - المستوى المحفوظ حتى تكفي أدلة الجلسة
+            fluency = self.podcast.fluency.to_dict()
+            fluency_level = fluency["level"] or (self.podcast_progress.get('fluency_level', 'beginner') if self.podcast_progress else 'beginner')
             
             # تحديد السياق والموقف بالإنجليزية
             if topic:
@@ -991,9 +751,10 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
                 "summary": session_summary or f"Discussed {topic or 'various topics'} for {duration_minutes} minutes",
                 "duration_minutes": duration_minutes,
                 "vocabulary": vocabulary,
-                "mistakes": self.conversation_mistakes if hasattr(self, 'conversation_mistakes') else [],
-                "improvements": self.conversation_improvements if hasattr(self, 'conversation_improvements') else [],
-                "fluency_level": fluency_level
+                "mistakes": list(self.podcast.mistakes),
+                "improvements": list(self.podcast.improvements),
+                "fluency_level": fluency_level,
+                "fluency": fluency
             }
             
             # حفظ في قاعدة البيانات
@@ -1001,7 +762,8 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
             
             # رسالة تشخيصية
             if result.get("success"):
-                print(f"[agent] ✅ تم حفظ البودكاست: الموضوع={topic}, الموقف={last_position}")
+                self.vocabulary.mark_saved(len(vocabulary))
+                print(f"[agent] ✅ تم حفظ البودكاست: الموضوع={topic}, الموقف={last_position}, الطلاقة={fluency_level} {fluency}")
             else:
                 print(f"[agent] ⚠️ فشل الحفظ: {result.get('error', 'Unknown')}")
             
@@ -1010,28 +772,104 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
             import traceback
             traceback.print_exc()
     
+    def _track_topic_ids(self, topics: list, position: str = ""):
+        """ربط الموضوع ونقطة التوقف (نص حر) بمعرفات topics.py - أول موضوع مرشح معروف"""
+        for phrase in topics:
+            ref = resolve_topic(phrase) if phrase else None
+            if ref is not None:
+                self.session_data.track_topic(ref)
+                break
+        if position:
+            self.session_data.track_topic(resolve_topic(position))
+    
+    def _topic_progress(self):
+        """نسبة التقدم من الأقسام المغطاة في الموضوع المعروف، والمواضيع المكتملة (أو None بدون تغيير)"""
+        topic_id = self.session_data.topic_id
+        percentage = topic_progress(topic_id, self.session_data.sections_covered) if topic_id else None
+        if percentage is None:
+            # موضوع غير معروف في topics.py - لا نكتب نسبة بوحدة أخرى (عدد الكلمات) في نفس العمود
+            return None, None
+        
+        stored = self.user_progress or {}
+        # لا ننقص تقدماً محفوظاً لنفس الموضوع من جلسة سابقة
+        stored_ref = resolve_topic(stored.get("current_topic") or "")
+        if stored_ref is not None and stored_ref.topic_id == topic_id:
+            percentage = max(percentage, stored.get("progress_percentage") or 0)
+        
+        topics_completed = None
+        completed = list(stored.get("topics_completed") or [])
+        if percentage >= 100 and TOPIC_NAMES.get(topic_id) not in completed:
+            topics_completed = completed + [TOPIC_NAMES[topic_id]]
+        return percentage, topics_completed
+    
+    def _session_data_snapshot(self) -> dict:
+        """session_data للحفظ بدون قائمة الكلمات الكاملة (تُرسل الكلمات الجديدة فقط)"""
+        snapshot = self.session_data.to_dict(include_words=False)
+        snapshot["words_count"] = len(self.vocabulary)
+        return snapshot
+    
     def update_session_data(self, topic: str = None, words: list = None, position: str = None):
         """تحديث بيانات الجلسة الحالية"""
         if topic:
-            self.session_data["current_topic"] = topic
+            self.session_data.current_topic = topic
         if words:
-            self.session_data["words_discussed"].extend(words)
+            self.vocabulary.add_many(words)
         if position:
-            self.session_data["last_position"] = position
+            self.session_data.last_position = position
+    
+    def to_snapshot(self) -> dict:
+        """حالة الجلسة للاستئناف السريع (session_snapshot): الصفوف المحملة، سياق المحادثة، وحالة الأوضاع"""
+        words = self.vocabulary.words
+        return {
+            "chat_ctx": self.chat_ctx.to_dict(exclude_function_call=True),
+            "user_progress": self.user_progress,
+            "personal_context": self.personal_context,
+            "podcast_progress": self.podcast_progress,
+            "level_assessment": self.level_assessment,
+            "achievements": self.achievements,
+            "session_data": self.session_data.to_dict(include_words=False),
+            "words": list(words),
+            "words_saved": len(words) - len(self.vocabulary.unsaved()),
+            "words_known": self.vocabulary.known(),
+            "stats": self.stats.snapshot(),
+            "sentences": self.sentences.snapshot(),
+            "podcast": self.podcast.snapshot(),
+        }
+    
+    def restore_snapshot(self, state: dict):
+        """استعادة لقطة الجلسة بدلاً من تحميل الذاكرة من قاعدة البيانات (سياق المحادثة يُمرر للمُنشئ)"""
+        self.user_progress = state.get("user_progress")
+        self.personal_context = state.get("personal_context")
+        self.podcast_progress = state.get("podcast_progress")
+        self.level_assessment = state.get("level_assessment")
+        self.achievements = state.get("achievements")
+        # الكلمات المحفوظة لا تُعتبر جديدة - غير المحفوظة تُرسل مع الحفظ التالي
+        words = state.get("words", [])
+        saved = state.get("words_saved", len(words))
+        self.vocabulary.restore(words, saved)
+        self.vocabulary.load(state.get("words_known", []))
+        self.session_data.restore(state.get("session_data", {}))
+        self.stats = SessionStats.from_snapshot(state.get("stats", {}))
+        if state.get("sentences"):
+            self.sentences = SentencesState.from_snapshot(state["sentences"])
+        if state.get("podcast"):
+            self.podcast = PodcastState.from_snapshot(state["podcast"])
+        self.memory_loaded.set()
+        self._schedule_backlog()
     
     async def auto_save_progress(self):
-        """حفظ التقدم تلقائياً كل فترة - منفصل للأوضاع الثلاثة"""
+        """حفظ التقدم تلقائياً كل فترة - كتابة قابلة للتأجيل أثناء تدهور Supabase"""
+        await self.writes.submit("auto_save", self._auto_save_now)
+    
+    async def _auto_save_now(self):
+        """الحفظ التلقائي الفعلي - منفصل للأوضاع الثلاثة"""
         # تأجيل الحفظ في أول 30 ثانية لتحسين الأداء في البداية
-        if not hasattr(self, '_session_start_time'):
-            self._session_start_time = datetime.now()
-        
-        elapsed = (datetime.now() - self._session_start_time).total_seconds()
-        if elapsed < 30:
+        if self.stats.seconds_since_start() < 30:
             return  # لا تحفظ في أول 30 ثانية
         
         # debouncing: تجنب الحفظ المتكرر (كل 10 ثوانٍ على الأقل)
-        if hasattr(self, '_last_auto_save'):
-            time_since_last_save = (datetime.now() - self._last_auto_save).total_seconds()
+        if self.stats.last_auto_save is not None:
+            time_since_last_save = (datetime.now() - self.stats.last_auto_save).total_seconds()
             if time_since_last_save < 10:
                 return
         
@@ -1041,25 +879,23 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
         
         # في وضع البودكاست، نحفظ في podcast_progress
         if self.mode == "english_conversation":
-            if self.session_data.get("current_topic") or self.session_data.get("words_discussed"):
+            if self.session_data.current_topic or self.session_data.words_discussed:
                 await self.save_podcast_progress(
-                    topic=self.session_data.get("current_topic", "General conversation"),
-                    words_discussed=self.session_data.get("words_discussed", []),
-                    last_position=self.session_data.get("last_position", "In conversation"),
+                    topic=self.session_data.current_topic,
+                    last_position=self.session_data.last_position,
                     session_summary="Auto-save during conversation"
                 )
-                self._last_auto_save = datetime.now()
+                self.stats.last_auto_save = datetime.now()
             return
             
         # الوضع العادي فقط
-        if self.session_data.get("current_topic") or self.session_data.get("words_discussed"):
+        if self.session_data.current_topic or self.session_data.words_discussed:
             await self.save_session_progress(
-                topic=self.session_data.get("current_topic", ""),
-                words_discussed=self.session_data.get("words_discussed", []),
-                last_position=self.session_data.get("last_position", ""),
+                topic=self.session_data.current_topic,
+                last_position=self.session_data.last_position,
                 session_summary="حفظ تلقائي"
             )
-            self._last_auto_save = datetime.now()
+            self.stats.last_auto_save = datetime.now()
     
     async def _on_user_input_transcribed(self, event):
         """معالج نسخ كلام المستخدم"""
@@ -1069,10 +905,18 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
                 return
                 
             user_text = event.transcript
-            # تم إزالة رسالة التشخيص
+            # تحليل النص (الكلمات المفتاحية + المعلومات الشخصية) - مباشرة أو في process pool
+            analysis = await analyzer_pool.run("user_text", analyze_user_text, user_text)
+            keyword_hits = analysis["keywords"]
+            # 🌐 لغة الإجابة (مصنف محلي) - تُعدّ في إحصائيات الجلسة
+            await self._enforce_english(analysis["language"])
+            if self.mode == "english_conversation":
+                # 📈 مقاييس الطلاقة تُحدّث تدريجياً مع كل إجابة
+                self.podcast.fluency.observe(user_text, analysis["language"])
             
-            # 💾 استخراج وحفظ المعلومات الشخصية من كلام المستخدم
-            await self._auto_extract_and_save_context(user_text)
+            # 💾 حفظ المعلومات الشخصية المستخرجة من كلام المستخدم
+            if analysis["personal_info"] and self.user_id:
+                await self.update_personal_context_from_conversation(analysis["personal_info"])
             
             # في وضع الجمل، نعالج محاولات المستخدم
             if self.mode == "sentences_learning":
@@ -1080,27 +924,23 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
             
             # في وضع البودكاست، نستخرج الموضوع من كلام المستخدم أيضاً
             if self.mode == "english_conversation":
-                common_topics = ['technology', 'phones', 'computers', 'travel', 'food', 'sports', 
-                               'movies', 'music', 'work', 'study', 'hobbies', 'family', 'weather']
-                
-                for topic in common_topics:
-                    if topic in user_text.lower():
-                        if not self.session_data.get("current_topic"):
-                            self.session_data["current_topic"] = topic.capitalize()
-                            print(f"[DEBUG] موضوع من المستخدم: {topic.capitalize()}")
-                            # حفظ فوري للموضوع
-                            await self.save_podcast_progress(
-                                topic=topic.capitalize(),
-                                last_position=f"User mentioned {topic}"
-                            )
-                        break
+                topics = keyword_hits.get(TOPIC)
+                if topics and not self.session_data.current_topic:
+                    topic = topics[0]
+                    self.session_data.current_topic = topic.capitalize()
+                    print(f"[DEBUG] موضوع من المستخدم: {topic.capitalize()}")
+                    # حفظ فوري للموضوع
+                    await self.save_podcast_progress(
+                        topic=topic.capitalize(),
+                        last_position=f"User mentioned {topic}"
+                    )
             
             # البحث عن مؤشرات اختيار المستخدم
-            if any(keyword in user_text.lower() for keyword in ['متابعة', 'استئناف', 'من حيث توقفت']):
+            if CONTINUE_INTENT in keyword_hits:
                 # المستخدم يريد متابعة الموضوع السابق
                 await self.continue_previous_topic()
                 # المستخدم اختار متابعة الموضوع السابق
-            elif any(keyword in user_text.lower() for keyword in ['موضوع جديد', 'بدء جديد', 'شيء جديد', 'موضوع آخر']):
+            elif NEW_TOPIC_INTENT in keyword_hits:
                 # المستخدم يريد بدء موضوع جديد
                 # استخراج اسم الموضوع الجديد من النص
                 new_topic_match = re.search(r'(?:موضوع|\btعلم|\bدرس)\s*(?:جديد|\bعن)?\s*[:؟]?\s*(.+)', user_text)
@@ -1113,13 +953,31 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
                     # إذا لم نتمكن من استخراج الموضوع، نبدأ بجلسة جديدة
                     await self.start_new_topic("موضوع جديد")
                     # المستخدم اختار بدء موضوع جديد
-            elif any(keyword in user_text.lower() for keyword in ['موضوع', 'درس', 'تعلم', 'كلمة']):
+            elif STUDY_INTENT in keyword_hits:
                 # حفظ عادي للتقدم
                 await self.auto_save_progress()
                 
         except Exception as e:
             pass  # تجاهل الأخطاء بصمت
     
+    async def _enforce_english(self, verdict):
+        """تسجيل لغة الإجابة، وتذكير الموديل بالإنجليزية عند تكرار الإجابات غير الإنجليزية"""
+        self.stats.count_language(verdict)
+        if (self.mode not in ENGLISH_ONLY_MODES or not ENGLISH_ONLY_REMINDER_AFTER
+                or self.stats.non_english_streak != ENGLISH_ONLY_REMINDER_AFTER):
+            return
+        print(f"[agent] 🌐 {self.stats.non_english_streak} إجابات غير إنجليزية متتالية ({verdict.language}) - تذكير بالإنجليزية")
+        new_ctx = self.chat_ctx.copy()
+        new_ctx.add_message(
+            role="system",
+            content=(
+                f"Language check: the learner's last {self.stats.non_english_streak} answers were not in English "
+                f"({verdict.arabic_words} Arabic / {verdict.english_words} English words in the latest one). "
+                "Do not accept them - kindly ask the learner to say it again in English."
+            ),
+        )
+        await self.update_chat_ctx(new_ctx)
+    
     async def _on_conversation_item_added(self, event):
         """معالج إضافة عنصر جديد للمحادثة"""
         try:
@@ -1132,105 +990,67 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
                 agent_text = item.text_content or ""
                 # تم إزالة رسالة التشخيص
                 
+                # تحليل الرد مرة واحدة (كلمات مفتاحية، جمل، مفردات، موضوع، نقطة توقف)
+                analysis = await analyzer_pool.run("agent_text", analyze_agent_text, agent_text, self.mode)
+                keyword_hits = analysis["keywords"]
+                
                 # في وضع الجمل، نحتاج لحفظ الجمل المُولدة والتقدم
                 if self.mode == "sentences_learning":
-                    await self.process_sentences_response(agent_text)
+                    await self.process_sentences_response(agent_text, keyword_hits, analysis["sentences"])
                 
                 # 🎯 تتبع الإجابات الصحيحة/الخاطئة بناءً على رد المساعد
-                correct_indicators = ['excellent', 'great', 'perfect', 'correct', 'right', 'well done',
-                                     'ممتاز', 'رائع', 'صحيح', 'أحسنت', 'جيد جداً']
-                wrong_indicators = ['incorrect', 'wrong', 'not quite', 'try again', 'mistake',
-                                   'خطأ', 'غير صحيح', 'حاول مرة أخرى']
-                
-                agent_lower = agent_text.lower()
-                if any(indicator in agent_lower for indicator in correct_indicators):
-                    await self.track_answer(correct=True)
-                elif any(indicator in agent_lower for indicator in wrong_indicators):
+                # الخطأ يغلب: "Not quite right, try again" فيها "right" لكنها تصحيح
+                if WRONG in keyword_hits:
                     await self.track_answer(correct=False)
+                elif CORRECT in keyword_hits:
+                    await self.track_answer(correct=True)
                 
                 # في وضع البودكاست، نستخرج الموضوع من المحادثة
                 if self.mode == "english_conversation":
                     # استخراج الموضوع الأساسي من الكلمات المذكورة
-                    common_topics = ['technology', 'phones', 'computers', 'travel', 'food', 'sports', 
-                                   'movies', 'music', 'work', 'study', 'hobbies', 'family', 'weather']
-                    
-                    for topic in common_topics:
-                        if topic in agent_text.lower():
-                            if not self.session_data.get("current_topic"):
-                                self.session_data["current_topic"] = topic.capitalize()
-                                print(f"[DEBUG] استخرجت الموضوع: {topic.capitalize()}")
-                            break
+                    topics = keyword_hits.get(TOPIC)
+                    if topics and not self.session_data.current_topic:
+                        self.session_data.current_topic = topics[0].capitalize()
+                        print(f"[DEBUG] استخرجت الموضوع: {topics[0].capitalize()}")
                 
-                # البحث عن كلمات إنجليزية جديدة في الرد
-                english_words = re.findall(r'\b[A-Za-z]{3,}\b', agent_text)
-                if english_words:
-                    # إضافة الكلمات الجديدة للقائمة
-                    current_words = self.session_data.get("words_discussed", [])
-                    new_words = [word.lower() for word in english_words if word.lower() not in current_words]
-                    if new_words:
-                        current_words.extend(new_words)
-                        self.session_data["words_discussed"] = current_words
+                # إضافة الكلمات الإنجليزية الجديدة في الرد (بدون الكلمات الشائعة وبحد أقصى للجلسة)
+                self.vocabulary.add_many(analysis["vocabulary"])
                 
-                # البحث عن مؤشرات الموضوع بالإنجليزية والعربية - محسّنة
-                topic_patterns = [
-                    # English patterns - مواضيع مباشرة
-                    r"\b(Nouns|Verbs|Adjectives|Adverbs|Pronouns|Prepositions|Conjunctions|Articles|Tenses|Grammar)\b",
-                    r"(?:topic|subject)\s+(?:is|are|will be)\s+([A-Z][A-Za-z\s]+)",
-                    r"(?:studying|learning|teaching|discussing)\s+([A-Z][A-Za-z\s]+)",
-                    r"(?:Let's|let's)\s+(?:learn|study|talk about|discuss)\s+([A-Z][A-Za-z\s]+)",
-                    r"(?:Today's topic|Our topic|The topic)\s+(?:is|will be)?:?\s*([A-Z][A-Za-z\s]+)",
-                    r"(?:chapter|lesson|section)\s+(?:on|about)\s+([A-Z][A-Za-z\s]+)",
-                    # Arabic patterns
-                    r'الموضوع\s+(?:الحالي|اليوم)[:؟]?\s*(.+)',
-                    r'سنتعلم\s+(?:عن|موضوع)\s*(.+)',
-                    r'دعنا\s+نتحدث\s+عن\s*(.+)',
-                    r'موضوع\s+الأسماء'  # "موضوع الأسماء" -> Nouns
-                ]
+                # أول موضوع مرشح مختلف عن الموضوع الحالي
+                for new_topic in analysis["topics"]:
+                    if new_topic != self.session_data.current_topic:
+                        self.session_data.current_topic = new_topic
+                        break
                 
-                for pattern in topic_patterns:
-                    matches = re.findall(pattern, agent_text, re.IGNORECASE)
-                    if matches:
-                        new_topic = matches[0].strip().rstrip('.,!?؟،')
-                        if new_topic and len(new_topic) > 3 and new_topic != self.session_data.get("current_topic"):
-                            self.session_data["current_topic"] = new_topic
-                            # تم إزالة رسالة التشخيص
-                            break
-            
-            # البحث عن نقطة التوقف بالإنجليزية والعربية - محسّنة
-            if agent_text:
-                position_patterns = [
-                    # English patterns - مواضع محددة
-                    r"\b(types of nouns|common nouns|proper nouns|abstract nouns|collective nouns|countable nouns|uncountable nouns)\b",
-                    r"\b(present tense|past tense|future tense|verb forms|irregular verbs)\b",
-                    r"\b(definition|examples|usage|rules|exceptions)\b",
-                    r"(?:We were|You were)\s+(?:discussing|talking about|learning)\s+([A-Za-z][A-Za-z\s]+)",
-                    r"(?:Last time|Previously|Earlier).*?(?:about|discussing|studying)\s+([A-Za-z][A-Za-z\s]+)",
-                    r"(?:stopped at|paused at|left off at|ended with)\s+([A-Za-z][A-Za-z\s]+)",
-                    r"(?:covered|finished|completed)\s+([A-Za-z][A-Za-z\s]+)",
-                    # Arabic patterns  
-                    r'نقطة\s+التوقف[:؟]?\s*(.+)',
-                    r'وصلنا\s+إلى\s*(.+)',
-                    r'انتهينا\s+من\s*(.+)',
-                    r'تعلمنا\s+عن\s*(.+)'
-                ]
+                # نقطة التوقف
+                if analysis["position"]:
+                    self.session_data.last_position = analysis["position"]
                 
-                for pattern in position_patterns:
-                    matches = re.findall(pattern, agent_text, re.IGNORECASE)
-                    if matches:
-                        new_position = matches[0].strip().rstrip('.,!?؟،')
-                        if new_position and len(new_position) > 3:
-                            self.session_data["last_position"] = new_position
-                            # تم إزالة رسالة التشخيص
-                            break
+                # ربط العبارات المكتشفة بمعرفات المواضيع والأقسام لحساب التقدم
+                self._track_topic_ids(analysis["topics"], analysis["position"])
                     
             # حفظ التقدم كل 3 رسائل تقريباً
-            self._message_count += 1
-            if self._message_count % 3 == 0:
+            self.stats.messages += 1
+            if self.stats.messages % 3 == 0:
                 await self.auto_save_progress()
+            
+            # ضغط السياق بعد كل رد من المساعد إذا تجاوز الميزانية
+            if agent_text:
+                await self.compact_chat_ctx()
                 
         except Exception as e:
             pass  # تجاهل الأخطاء بصمت
     
+    async def compact_chat_ctx(self):
+        """استبدال الأدوار القديمة في السياق بملخص مضغوط عند تجاوز ميزانية الـ tokens"""
+        try:
+            new_ctx = await self.context_compactor.compact(self.chat_ctx)
+            if new_ctx is not None:
+                await self.update_chat_ctx(new_ctx)
+                print(f"[agent] 🗜️ تم ضغط السياق إلى ~{self.context_compactor.last_tokens} token")
+        except Exception as e:
+            print(f"[agent] خطأ في ضغط السياق: {e}")
+    
     async def force_save_progress(self, topic: str = None, words: list = None, position: str = None):
         """حفظ فوري للتقدم - منفصل للوضعين"""
         try:
@@ -1240,19 +1060,18 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
                 return
                 
             if topic:
-                self.session_data["current_topic"] = topic
+                self.session_data.current_topic = topic
             if words:
-                self.session_data["words_discussed"] = words
+                self.vocabulary.add_many(words)
             if position:
-                self.session_data["last_position"] = position
+                self.session_data.last_position = position
             
             # حفظ فوري صامت
             
             await self.save_session_progress(
-                topic=self.session_data.get("current_topic", ""),
-                words_discussed=self.session_data.get("words_discussed", []),
-                last_position=self.session_data.get("last_position", ""),
-                session_summary=f"حفظ فوري - {len(self.session_data.get('words_discussed', []))} كلمة"
+                topic=self.session_data.current_topic,
+                last_position=self.session_data.last_position,
+                session_summary=f"حفظ فوري - {len(self.vocabulary)} كلمة"
             )
             
         except Exception as e:
@@ -1266,29 +1085,29 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
         try:
             # تطبيق بيانات الموضوع السابق
             if self.user_progress.get('current_topic'):
-                self.session_data["current_topic"] = self.user_progress.get('current_topic')
+                self.session_data.current_topic = self.user_progress.get('current_topic')
             if self.user_progress.get('last_position'):
-                self.session_data["last_position"] = self.user_progress.get('last_position')
+                self.session_data.last_position = self.user_progress.get('last_position')
+            self._track_topic_ids([self.session_data.current_topic], self.session_data.last_position)
             if self.user_progress.get('vocabulary'):
                 # استرجاع الكلمات المتعلمة سابقاً
-                learned_words = list(self.user_progress.get('vocabulary', {}).keys())
-                self.session_data["words_discussed"] = learned_words
+                # الكلمات محفوظة مسبقاً - لا تُرسل مرة أخرى
+                self.vocabulary.load(self.user_progress.get('vocabulary', {}).keys())
             
-            print(f"[agent] تم استئناف الموضوع السابق: {self.session_data.get('current_topic')} من {self.session_data.get('last_position')}")
+            print(f"[agent] تم استئناف الموضوع السابق: {self.session_data.current_topic} من {self.session_data.last_position}")
             
             # زيادة عداد الرسائل والحفظ التلقائي كل 3 رسائل
-            self._message_count += 1
-            if self._message_count % 3 == 0:
+            self.stats.messages += 1
+            if self.stats.messages % 3 == 0:
                 await self.auto_save_progress()
-                print(f"[agent] حفظ تلقائي بعد {self._message_count} رسائل")
+                print(f"[agent] حفظ تلقائي بعد {self.stats.messages} رسائل")
                 
             # الحفظ الفوري إذا تم اكتشاف موضوع أو كلمات جديدة
-            if (self.session_data.get("current_topic") and 
-                self.session_data.get("words_discussed")):
+            if (self.session_data.current_topic and 
+                self.session_data.words_discussed):
                 await self.force_save_progress(
-                    topic=self.session_data.get("current_topic"),
-                    words=self.session_data.get("words_discussed"),
-                    position=self.session_data.get("last_position", "")
+                    topic=self.session_data.current_topic,
+                    position=self.session_data.last_position
                 )
             
         except Exception as e:
@@ -1298,26 +1117,24 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
         """بدء موضوع جديد ومسح بيانات الجلسة القديمة"""
         try:
             # حفظ التقدم الحالي قبل المسح (إذا كان هناك تقدم)
-            if self.session_data.get("current_topic") or self.session_data.get("words_discussed"):
+            if self.session_data.current_topic or self.session_data.words_discussed:
                 await self.save_session_progress(
-                    topic=self.session_data.get("current_topic", ""),
-                    words_discussed=self.session_data.get("words_discussed", []),
-                    last_position=self.session_data.get("last_position", ""),
-                    session_summary=f"انتهاء الموضوع السابق - {len(self.session_data.get('words_discussed', []))} كلمة"
+                    topic=self.session_data.current_topic,
+                    last_position=self.session_data.last_position,
+                    session_summary=f"انتهاء الموضوع السابق - {len(self.vocabulary)} كلمة"
                 )
             
             # مسح بيانات الجلسة وبدء جديد
-            self.session_data = {
-                "session_id": str(datetime.now().timestamp()),
-                "start_time": datetime.now().isoformat(),
-                "words_discussed": [],
-                "topics_covered": [],
-                "current_topic": new_topic,
-                "last_position": "بداية الموضوع"
-            }
+            self.vocabulary = VocabularyTracker(max_words=VOCABULARY_SESSION_CAP)
+            self.session_data = SessionData(
+                words_discussed=self.vocabulary.words,
+                current_topic=new_topic,
+                last_position="بداية الموضوع",
+            )
+            self._track_topic_ids([new_topic])
             
             # إعادة تعيين عداد الرسائل
-            self._message_count = 0
+            self.stats.messages = 0
             
             print(f"[agent] تم بدء موضوع جديد: {new_topic}")
             
@@ -1325,8 +1142,28 @@ CRITICAL INSTRUCTIONS FOR RETURNING USER:
             print(f"[agent] خطأ في بدء الموضوع الجديد: {e}")
 
 
+# الزمن من بدء entrypoint حتى أول صوت للمساعد، لكل مسار بدء (fast / full / resume) في هذا الـ worker
+time_to_first_audio = {"fast": LatencyHistogram(), "full": LatencyHistogram(), "resume": LatencyHistogram()}
+
+
+def export_db_metrics():
+    """تصدير مقاييس Supabase لهذه العملية (ملف Prometheus + سطر ملخص في اللوج)"""
+    try:
+        snapshot = supabase_manager.metrics.snapshot()
+        total = sum(op["count"] for op in snapshot["operations"])
+        print(f"[metrics] عمليات Supabase: {total}, بطيئة: {len(snapshot['slow_operations'])}")
+        ttfa = {path: f"p50={h.quantile(0.5) * 1000:.0f}ms n={h.total}" for path, h in time_to_first_audio.items() if h.total}
+        if ttfa:
+            print(f"[metrics] الزمن حتى أول صوت: {ttfa}")
+        if DB_METRICS_EXPORT_DIR:
+            supabase_manager.metrics.write_textfile(DB_METRICS_EXPORT_DIR)
+    except Exception as e:
+        print(f"[metrics] خطأ في تصدير المقاييس: {e}")
+
+
 async def entrypoint(ctx: agents.JobContext):
     print("[agent] entrypoint: starting")
+    entrypoint_started = time.perf_counter()
     
     # استخراج معلومات المستخدم من job metadata
     user_name = "المستخدم"  # قيمة افتراضية
@@ -1381,6 +1218,9 @@ async def entrypoint(ctx: agents.JobContext):
 
     session = AgentSession()
     
+    # ⚡ استئناف سريع: لقطة حديثة لنفس المستخدم والوضع تغني عن تحميل الذاكرة والترحيب الكامل
+    snapshot = session_snapshots.take(user_id, mode) if user_id else None
+    
     # إنشاء سياق محادثة أولي مع معلومات المستخدم
     initial_ctx = ChatContext()
     initial_ctx.add_message(
@@ -1410,6 +1250,13 @@ async def entrypoint(ctx: agents.JobContext):
 - كن مفيداً ومهذباً واستخدم الأدوات المتاحة عند الحاجة
 - احتفظ بسجل الكلمات الجديدة والمواضيع المكتملة"""
     )
+    if snapshot:
+        try:
+            # سياق المحادثة المحفوظ يتضمن رسالة النظام أعلاه وسياق الذاكرة والأدوار السابقة
+            initial_ctx = ChatContext.from_dict(snapshot["chat_ctx"])
+        except Exception as e:
+            print(f"[agent] ⚠️ تعذر استعادة سياق المحادثة من اللقطة: {e}")
+            snapshot = None
 
     # إنشاء مساعد مع نظام الذاكرة
     assistant = Assistant(
@@ -1420,14 +1267,61 @@ async def entrypoint(ctx: agents.JobContext):
         voice_name=voice_name  # 🎤 تمرير الصوت المختار
     )
     
+    # يتتبع المهام الخلفية للجلسة ويديرها عند الإنهاء (الخطوات تُضاف لاحقاً)
+    teardown = SessionTeardown(name=f"session:{user_id or 'anonymous'}", deadline=SESSION_TEARDOWN_DEADLINE_SECONDS)
+    
     # تحميل ذاكرة المستخدم حسب الوضع
-    if mode == "sentences_learning":
-        await assistant.load_sentences_progress()
-    elif mode == "english_conversation":
-        print("[agent] وضع البودكاست - تحميل ذاكرة البودكاست")
-        await assistant.load_podcast_progress()
+    memory_task = None
+    if snapshot:
+        startup_path = "resume"
+        assistant.restore_snapshot(snapshot)
+        print("[agent] ⚡ استئناف الجلسة من اللقطة المحلية - بدون قراءات من قاعدة البيانات")
+    elif SESSION_FAST_START and user_id:
+        # ⚡ بدء سريع: الذاكرة تُحمّل بالتوازي مع بدء الجلسة وتُحقن في السياق عند وصولها
+        # (طلبات Supabase في التحميل تعمل في threads - لا تحجز الـ event loop عن session.start والترحيب)
+        startup_path = "fast"
+        loop_stall = 0.0
+        
+        async def watch_loop():
+            # أقصى تأخر لاستئناف نبضة 10ms = أطول حجز للـ event loop أثناء تحميل الذاكرة
+            nonlocal loop_stall
+            while True:
+                before = time.perf_counter()
+                await asyncio.sleep(0.01)
+                loop_stall = max(loop_stall, time.perf_counter() - before - 0.01)
+        
+        async def load_memory_in_background():
+            watcher = asyncio.create_task(watch_loop())
+            try:
+                await assistant.load_mode_memory()
+            finally:
+                watcher.cancel()
+            print(f"[agent] 🧠 الذاكرة جاهزة بعد {(time.perf_counter() - entrypoint_started) * 1000:.0f}ms "
+                  f"(أقصى توقف للـ event loop أثناء التحميل {loop_stall * 1000:.0f}ms)")
+        
+        def on_memory_done(task):
+            if not assistant.memory_loaded.is_set():
+                # أُلغي التحميل (إنهاء الجلسة) قبل وصول الصفوف - الكتابات المؤجلة تُتخطى
+                assistant.abandon_memory()
+        
+        memory_task = teardown.spawn(load_memory_in_background(), name="load_memory")
+        if memory_task is not None:
+            memory_task.add_done_callback(on_memory_done)
     else:
-        await assistant.load_user_memory()
+        startup_path = "full"
+        await assistant.load_mode_memory()
+    
+    # ⏱️ الزمن حتى أول صوت للمساعد
+    first_audio_recorded = False
+    
+    @session.on("agent_state_changed")
+    def on_agent_state_changed(event):
+        nonlocal first_audio_recorded
+        if event.new_state == "speaking" and not first_audio_recorded:
+            first_audio_recorded = True
+            elapsed = time.perf_counter() - entrypoint_started
+            time_to_first_audio[startup_path].observe(elapsed)
+            print(f"[agent] ⏱️ الزمن حتى أول صوت ({startup_path}): {elapsed * 1000:.0f}ms")
 
     print("[agent] starting session for room")
     await session.start(
@@ -1441,9 +1335,30 @@ async def entrypoint(ctx: agents.JobContext):
         ),
     )
     print("[agent] session started")
+    
+    # الترحيب الشخصي فقط إذا وصلت الذاكرة أثناء بدء الجلسة (أو خلال مهلة قصيرة بعده)
+    if memory_task is not None and not memory_task.done():
+        try:
+            await asyncio.wait_for(asyncio.shield(memory_task), FAST_START_MEMORY_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            print("[agent] ⚡ الذاكرة ما زالت تُحمّل - ترحيب عام الآن")
+        except Exception:
+            pass  # أخطاء التحميل تُسجل داخل دوال التحميل
+    memory_pending = memory_task is not None and not memory_task.done()
 
     # تحديد الرسالة الترحيبية بناءً على الوضع
-    if mode == "english_conversation":
+    if snapshot:
+        # جلسة مستأنفة - متابعة من آخر نقطة بدلاً من الترحيب الكامل
+        welcome_message = None
+    elif memory_pending:
+        # ترحيب عام لا يفترض مستخدماً جديداً أو عائداً - سياق الذاكرة يصل عبر update_chat_ctx
+        if mode == "english_conversation":
+            welcome_message = f"Hello {full_name or user_name}! I'm Friday, your English conversation partner. How are you feeling today?"
+        elif mode == "sentences_learning":
+            welcome_message = f"مرحباً {full_name or user_name}! أنا Friday، مدرسك لتعليم الجمل الإنجليزية البسيطة. هل أنت جاهز؟"
+        else:
+            welcome_message = f"مرحباً {full_name or user_name}، اسمي Friday، مساعدك الشخصي لتعليم اللغة الإنجليزية. كيف حالك اليوم؟"
+    elif mode == "english_conversation":
         # رسالة البودكاست تعتمد على التقدم المحمل
         if assistant.podcast_progress and assistant.podcast_progress.get('total_conversations', 0) > 0:
             # مستخدم عائد - استخدام البيانات المحملة
@@ -1463,18 +1378,18 @@ async def entrypoint(ctx: agents.JobContext):
         welcome_message = f"مرحباً {full_name or user_name}! أنا Friday، مدرسك لتعليم الجمل الإنجليزية البسيطة.\n\n"
         
         # إضافة معلومات المستوى الحالي للسياق
-        current_level = getattr(assistant, 'current_level', 1)
-        learned_history = getattr(assistant, 'learned_sentences_history', [])
+        current_level = assistant.sentences.level
+        learned_history = assistant.sentences.history
         
         # التحقق من وجود تقدم سابق في الجمل
         has_sentences_progress = (
-            assistant.sentences_progress and 
-            assistant.sentences_progress.get('completed_sentences', 0) > 0
+            assistant.sentences.progress and 
+            assistant.sentences.progress.get('completed_sentences', 0) > 0
         )
         
         if has_sentences_progress:
-            completed = assistant.sentences_progress.get('completed_sentences', 0)
-            generated_sentences = assistant.sentences_progress.get('generated_sentences', [])
+            completed = assistant.sentences.progress.get('completed_sentences', 0)
+            generated_sentences = assistant.sentences.progress.get('generated_sentences', [])
             actual_total = len(generated_sentences)
             
             # التحقق من وجود جمل غير مكتملة
@@ -1483,14 +1398,14 @@ async def entrypoint(ctx: agents.JobContext):
             if has_incomplete_sentences:
                 # لا تزال هناك جمل لم تكتمل
                 # استخدام current_sentence_index بدلاً من completed
-                current_index = assistant.sentences_progress.get('current_sentence_index', completed)
+                current_index = assistant.sentences.progress.get('current_sentence_index', completed)
                 
                 # تنظيف الجمل وإزالة أي عناصر فارغة أو مكررة
                 clean_sentences = []
                 seen_normalized = set()
                 for sentence in generated_sentences:
                     if sentence and sentence.strip():
-                        normalized = sentence.lower().replace('.', '').replace(',', '').strip()
+                        normalized = normalize_text(sentence)
                         if normalized not in seen_normalized:
                             clean_sentences.append(sentence.strip())
                             seen_normalized.add(normalized)
@@ -1500,11 +1415,11 @@ async def entrypoint(ctx: agents.JobContext):
                     generated_sentences = clean_sentences
                     await supabase_manager.update_sentences_progress(
                         assistant.user_id,
-                        assistant.sentences_session_id,
+                        assistant.sentences.session_id,
                         generated_sentences=generated_sentences,
                         total_sentences=len(generated_sentences)
                     )
-                    print(f"[agent] تم تنظيف قائمة الجمل من {len(assistant.sentences_progress.get('generated_sentences', []))} إلى {len(generated_sentences)}")
+                    print(f"[agent] تم تنظيف قائمة الجمل من {len(assistant.sentences.progress.get('generated_sentences', []))} إلى {len(generated_sentences)}")
                 
                 # عدم عرض الجمل القديمة - بدء بجمل جديدة مباشرة
                 welcome_message += f"Welcome back! لقد تعلمت {completed} جملة في الجلسات السابقة. You're at level {current_level}!"
@@ -1542,10 +1457,19 @@ async def entrypoint(ctx: agents.JobContext):
         else:
             welcome_message += " مرحباً بك! سنبدأ رحلة تعلم الإنجليزية مع موضوع الأسماء (Nouns)."
 
-    # إرسال الرسالة الترحيبية مباشرة عبر generate_reply
-    print(f"[agent] إرسال الرسالة الترحيبية: {welcome_message}")
-    await session.generate_reply(
-        instructions=f"""قل هذه الرسالة بالضبط للمستخدم:
+    if welcome_message is None:
+        last_point = assistant.session_data.last_position or assistant.session_data.current_topic
+        print(f"[agent] متابعة الجلسة المستأنفة من: {last_point or 'آخر رد'}")
+        await session.generate_reply(
+            instructions=f"""انقطع اتصال المستخدم للحظات وعاد الآن - سياق المحادثة السابق محفوظ كما هو.
+        رحب به بجملة قصيرة واحدة فقط (مثل "Welcome back!") ثم تابع من حيث توقفتما بالضبط{f' ({last_point})' if last_point else ''}.
+        لا تعرّف بنفسك من جديد ولا تبدأ الدرس من البداية، ثم توقف وانتظر رد المستخدم.""",
+        )
+    else:
+        # إرسال الرسالة الترحيبية مباشرة عبر generate_reply
+        print(f"[agent] إرسال الرسالة الترحيبية: {welcome_message}")
+        await session.generate_reply(
+            instructions=f"""قل هذه الرسالة بالضبط للمستخدم:
         "{welcome_message}"
         
         🔥🔥🔥 مهم جداً - توقف هنا تماماً! 🔥🔥🔥
@@ -1558,36 +1482,82 @@ async def entrypoint(ctx: agents.JobContext):
         5. اصمت تماماً وانتظر
         
         عندما يرد المستخدم، استمع بعناية لاختياره ثم تابع حسب اختياره فقط.""",
-    )
+        )
     
     # ⚠️ مهم: لا نستدعي generate_reply مرة أخرى هنا!
     # السبب: AgentSession سيتعامل تلقائياً مع ردود المستخدم عبر معالجات الأحداث
     # إذا استدعينا generate_reply هنا، سيرسل AI رسالة ثانية فوراً قبل أن يرد المستخدم
     
-    # إضافة معالج لحفظ التقدم عند انتهاء الجلسة
+    # طابور أحداث الجلسة: مستهلك واحد بالترتيب بدلاً من task لكل حدث
+    # ردود المساعد لا تُحذف (تتبع الإجابات والجمل)، نسخ المستخدم القديم يُحذف عند الضغط،
+    # والحفظ التلقائي يُدمج (طلب واحد منتظر فقط)
+    events = SessionEventPipeline(
+        name=f"session:{user_id or 'anonymous'}",
+        maxsize=SESSION_EVENT_QUEUE_SIZE,
+        policies={
+            "conversation_item_added": KEEP,
+            "user_input_transcribed": DROP_OLDEST,
+            "auto_save": MERGE,
+            # الكتابات المؤجلة حتى تحميل الذاكرة: حدث إعادة واحد يفرغها بالترتيب
+            "memory_backlog": KEEP,
+        },
+        stale_after=SESSION_EVENT_STALE_SECONDS,
+    )
+    events.start()
+    assistant.attach_events(events)
+    
+    # إنهاء الجلسة بمهلة قصوى: إلغاء المهام الخلفية، ثم تفريغ الأحداث، ثم الكتابات الحرجة، ثم الإحصائيات
+    async def drain_events():
+        # إنهاء معالجة الأحداث المنتظرة قبل الحفظ النهائي
+        drained = await events.close(timeout=5)
+        print(f"[agent] طابور الأحداث: {events.stats()}" + ("" if drained else " (انتهت المهلة)"))
+    
+    async def save_final_progress():
+        # الحفظ النهائي يغني عن حفظ تلقائي مؤجل (وإلا قد يكتب فوق الملخص النهائي)
+        assistant.writes.discard("auto_save")
+        # حفظ ملخص نهائي للجلسة (في البودكاست يُوجَّه إلى podcast_progress)
+        final_summary = f"انتهت الجلسة - الموضوع: {assistant.session_data.current_topic}, الكلمات المتعلمة: {len(assistant.vocabulary)}"
+        await assistant.save_session_progress(session_summary=final_summary)
+    
+    def save_snapshot():
+        # 📸 لقطة الحالة بعد الحفظ النهائي - تُستعاد إذا عاد المستخدم خلال نافذة الاستئناف
+        # بدون ذاكرة محملة تكون اللقطة فارغة وتُستعاد كأنها الذاكرة - التحميل الكامل أفضل
+        if not assistant.memory_loaded.is_set() or assistant.memory_abandoned:
+            return
+        if session_snapshots.save(user_id, mode, assistant.to_snapshot()):
+            print(f"[agent] 📸 تم حفظ لقطة الجلسة للاستئناف خلال {session_snapshots.window_seconds:.0f} ثانية")
+    
+    def report_metrics():
+        export_db_metrics()
+        print(f"[agent] زمن المعالج للمحللات: {analyzer_pool.stats()}")
+        print(f"[agent] الكتابات المؤجلة: {assistant.writes.stats()}")
+    
+    teardown.add_step("events", drain_events, PREPARE)
+    # كتابة تغييرات السياق الشخصي المنتظرة
+    if assistant.personal_writer:
+        teardown.add_step("personal_context", assistant.personal_writer.flush, CRITICAL)
+    teardown.add_step("session_progress", save_final_progress, CRITICAL)
+    # حفظ إحصائيات الجلسة (daily_stats) ومحاولة أخيرة للكتابات المؤجلة أثناء تدهور Supabase
+    teardown.add_step("daily_stats", assistant.end_session_summary, BEST_EFFORT)
+    teardown.add_step("deferred_writes", assistant.writes.close, BEST_EFFORT)
+    if user_id and session_snapshots.enabled:
+        teardown.add_finalizer("snapshot", save_snapshot)
+    # إذا انتهت المهلة قبل deferred_writes لا يبقى انتظار التعافي بعد الجلسة
+    teardown.add_finalizer("deferred_writes_watcher", assistant.writes.stop)
+    teardown.add_finalizer("metrics", report_metrics)
+    
+    def report_teardown(task):
+        if task.cancelled() or task.exception():
+            print(f"[agent] خطأ في حفظ التقدم النهائي: {'ألغي' if task.cancelled() else task.exception()}")
+            return
+        report = task.result()
+        status = "✅" if not (report.failed or report.dropped or report.deferred) else "⚠️"
+        print(f"[agent] {status} إنهاء الجلسة: {report.to_dict()}")
+    
     def on_session_end():
-        """حفظ التقدم عند انتهاء الجلسة (معالج متزامن)"""
-        import asyncio
-        
-        async def save_progress():
-            try:
-                print("[agent] الجلسة تنتهي، حفظ التقدم النهائي...")
-                
-                # حفظ إحصائيات الجلسة (daily_stats)
-                await assistant.end_session_summary()
-                
-                # حفظ التقدم العادي
-                await assistant.auto_save_progress()
-                
-                # حفظ ملخص نهائي للجلسة
-                final_summary = f"انتهت الجلسة - الموضوع: {assistant.session_data.get('current_topic', 'غير محدد')}, الكلمات المتعلمة: {len(assistant.session_data.get('words_discussed', []))}"
-                await assistant.save_session_progress(session_summary=final_summary)
-                print("[agent] ✅ تم حفظ جميع البيانات بنجاح")
-            except Exception as e:
-                print(f"[agent] خطأ في حفظ التقدم النهائي: {e}")
-        
-        # تشغيل الحفظ كمهمة غير متزامنة
-        asyncio.create_task(save_progress())
+        """بدء الإنهاء عند انقطاع الجلسة (معالج متزامن - المهمة محفوظة في teardown)"""
+        print("[agent] الجلسة تنتهي، حفظ التقدم النهائي...")
+        teardown.start().add_done_callback(report_teardown)
     
     # ربط معالج انتهاء الجلسة ومعالجات الأحداث
     session.on("disconnected", on_session_end)
@@ -1600,14 +1570,24 @@ async def entrypoint(ctx: agents.JobContext):
         # ربط معالج نسخ كلام المستخدم
         @session.on("user_input_transcribed")
         def on_user_input_transcribed(event: UserInputTranscribedEvent):
-            import asyncio
-            asyncio.create_task(assistant._on_user_input_transcribed(event))
+            # النسخ المؤقت لا يحتاج معالجة - لا نشغل الطابور به
+            if event.is_final:
+                events.submit("user_input_transcribed", assistant._on_user_input_transcribed, event)
+        
+        # زمن كلام المستخدم لسرعة الكلام في البودكاست - عدّاد فقط، بدون طابور الأحداث
+        if mode == "english_conversation":
+            @session.on("user_state_changed")
+            def on_user_state_changed(event):
+                timestamp = getattr(event, "created_at", None) or time.time()
+                if event.new_state == "speaking":
+                    assistant.podcast.fluency.speech_started(timestamp)
+                elif event.old_state == "speaking":
+                    assistant.podcast.fluency.speech_ended(timestamp)
         
         # ربط معالج إضافة عناصر المحادثة
         @session.on("conversation_item_added")
         def on_conversation_item_added(event: ConversationItemAddedEvent):
-            import asyncio
-            asyncio.create_task(assistant._on_conversation_item_added(event))
+            events.submit("conversation_item_added", assistant._on_conversation_item_added, event)
         
         assistant._events_bound = True
         print("[agent] تم ربط معالجات الأحداث الحديثة بنجاح مع الجلسة")
@@ -1626,15 +1606,18 @@ async def entrypoint(ctx: agents.JobContext):
         while True:
             try:
                 await asyncio.sleep(60)  # كل 60 ثانية
-                if assistant.session_data.get("current_topic") or assistant.session_data.get("words_discussed"):
-                    # إنشاء task منفصل لعدم مقاطعة المحادثة
-                    asyncio.create_task(assistant.auto_save_progress())
+                if assistant.daily_stats and assistant.daily_stats.has_pending:
+                    teardown.spawn(assistant.writes.submit("daily_stats", assistant.daily_stats.flush), name="daily_stats_flush")
+                export_db_metrics()
+                if assistant.session_data.current_topic or assistant.session_data.words_discussed:
+                    # عبر طابور الأحداث حتى لا يتسابق الحفظ مع معالجات الرسائل
+                    events.submit("auto_save", lambda _: assistant.auto_save_progress(), None)
             except Exception as e:
                 # تجاهل الأخطاء بصمت
                 break
     
-    # تشغيل الحفظ الدوري في الخلفية
-    asyncio.create_task(periodic_save())
+    # تشغيل الحفظ الدوري في الخلفية - يُلغى عند إنهاء الجلسة
+    teardown.spawn(periodic_save(), name="periodic_save")
     
     # تم إزالة البيانات التجريبية - النظام سيتتبع التقدم الفعلي فقط
 
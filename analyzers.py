@@ -0,0 +1,146 @@
+"""
+محللات النصوص في معالجات الجلسة (استخراج، مواضيع، مفردات، معلومات شخصية، لغة النسخ)
+كل محلل دالة نقية على مستوى الوحدة: مدخلات نصية ومخرجات dict قابلة للتسلسل (pickle/JSON)،
+حتى يمكن تشغيلها في نفس الحلقة أو في process pool بدون تغيير المستدعي.
+AnalyzerPool يسجل زمن المعالج (CPU) لكل محلل.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from db_metrics import LatencyHistogram
+from keyword_automaton import keyword_automaton
+from language_id import classify_language
+from personal_info import extract_personal_info
+from sentence_extraction import sentence_extractor
+from topic_detection import topic_detector
+from vocabulary import candidate_words
+
+logger = logging.getLogger(__name__)
+
+INLINE = "inline"
+PROCESS = "process"
+
+def analyze_user_text(text: str) -> Dict[str, Any]:
+    """تحليل نسخ المستخدم النهائي: الكلمات المفتاحية + المعلومات الشخصية + اللغة"""
+    return {
+        "keywords": keyword_automaton.scan(text),
+        "personal_info": extract_personal_info(text),
+        "language": classify_language(text),
+    }
+
+
+def analyze_agent_text(text: str, mode: str = "normal") -> Dict[str, Any]:
+    """تحليل رد المساعد: الكلمات المفتاحية، الجمل، المفردات، الموضوع ونقطة التوقف"""
+    topics = topic_detector.scan(text)  # مسح واحد للمواضيع ونقطة التوقف
+    return {
+        "keywords": keyword_automaton.scan(text),
+        "sentences": sentence_extractor.extract(text) if mode == "sentences_learning" else [],
+        "vocabulary": candidate_words(text),
+        "topics": topics.topics,
+        "position": topics.position,
+    }
+
+
+def _timed_call(fn: Callable, args: Tuple) -> Tuple[Any, float]:
+    """تشغيل المحلل وقياس زمن المعالج في نفس العملية التي نفذته"""
+    start = time.thread_time()
+    result = fn(*args)
+    return result, time.thread_time() - start
+
+
+class AnalyzerStats:
+    __slots__ = ("calls", "errors", "cpu", "wall")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cpu = LatencyHistogram()
+        self.wall = LatencyHistogram()
+
+
+class AnalyzerPool:
+    """تشغيل المحللات في نفس الحلقة (inline) أو في process pool مشترك لكل الجلسات في الـ worker"""
+
+    def __init__(self, mode: str = INLINE, max_workers: int = 2):
+        if mode not in (INLINE, PROCESS):
+            raise ValueError(f"وضع تنفيذ غير معروف: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, AnalyzerStats] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    async def run(self, name: str, fn: Callable, *args) -> Any:
+        """تشغيل محلل (دالة على مستوى الوحدة) وإعادة نتيجته"""
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = AnalyzerStats()
+
+        start = time.perf_counter()
+        try:
+            future = None
+            if self.mode == PROCESS:
+                try:
+                    # الإرسال ينشئ العمليات - قد يفشل (مثلاً داخل عملية daemon)
+                    future = asyncio.get_running_loop().run_in_executor(self._get_executor(), _timed_call, fn, args)
+                except (AssertionError, OSError, RuntimeError) as e:
+                    self._fall_back_inline(e)
+            if future is not None:
+                try:
+                    result, cpu = await future
+                except BrokenProcessPool as e:
+                    self._fall_back_inline(e)
+                    result, cpu = _timed_call(fn, args)
+            else:
+                result, cpu = _timed_call(fn, args)
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.calls += 1
+        stats.cpu.observe(cpu)
+        stats.wall.observe(time.perf_counter() - start)
+        return result
+
+    def _fall_back_inline(self, error: Exception) -> None:
+        logger.error(f"process pool المحللات غير متاح ({error}) - التحويل للتنفيذ المباشر")
+        self.mode = INLINE
+        self.shutdown()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "mode": self.mode,
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "cpu_total_ms": round(stats.cpu.sum * 1000, 2),
+                "cpu_p95_ms": round(stats.cpu.quantile(0.95) * 1000, 2),
+                "cpu_max_ms": round(stats.cpu.max * 1000, 2),
+                "wall_p95_ms": round(stats.wall.quantile(0.95) * 1000, 2),
+            }
+            for name, stats in self._stats.items()
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# مثيل واحد لكل عملية worker - الوضع من ANALYZER_EXECUTOR (inline أو process)
+analyzer_pool = AnalyzerPool(
+    mode=os.getenv("ANALYZER_EXECUTOR", INLINE),
+    max_workers=int(os.getenv("ANALYZER_PROCESSES", "2")),
+)
@@ -29,7 +29,8 @@ from livekit import api
 
 # Supabase and Auth imports
 from supabase_client import supabase_manager
-from auth import get_current_user, get_user_id_from_token
+from text_normalization import strip_invisible
+from auth import get_current_user, get_user_id_from_token, require_admin
 
 # Load environment variables from .env in project root
 load_dotenv()
@@ -235,17 +236,8 @@ def _sanitize_email_text(value: Optional[str]) -> str:
     if not value:
         return ""
     v = unicodedata.normalize('NFKC', value)
-    # إزالة محارف الاتجاه
-    bidi_codes = [
-        0x200E, 0x200F,       # LRM, RLM
-        0x202A, 0x202B, 0x202C, 0x202D, 0x202E,  # embeddings/overrides
-        0x2066, 0x2067, 0x2068, 0x2069,          # isolates
-        0x061C,                                    # ALM
-    ]
-    # إزالة محارف غير مرئية إضافية
-    zero_width = [0x200B, 0x200C, 0x200D, 0xFEFF, 0x2060, 0x180E]
-    tbl = {cp: None for cp in (bidi_codes + zero_width)}
-    v = v.translate(tbl)
+    # إزالة محارف الاتجاه والمحارف غير المرئية (جدول مشترك مبني مسبقاً)
+    v = strip_invisible(v)
     # إزالة جميع الفراغات بما فيها NBSP
     v = re.sub(r"[\u00A0\s]+", "", v)
     # إزالة علامات اقتباس محيطة إن وُجدت
@@ -378,6 +370,16 @@ def get_simple_sentences():
 def health() -> dict:
     return {"status": "ok"}
 
+@app.get("/metrics/db", dependencies=[Depends(require_admin)])
+def db_metrics_prometheus() -> PlainTextResponse:
+    """مقاييس زمن عمليات Supabase بصيغة Prometheus"""
+    return PlainTextResponse(supabase_manager.metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics/db", dependencies=[Depends(require_admin)])
+def db_metrics_summary() -> dict:
+    """ملخص زمن عمليات Supabase وسجل العمليات البطيئة"""
+    return {"success": True, **supabase_manager.metrics.snapshot()}
+
 @app.post("/api/feedback")
 async def save_feedback(feedback: FeedbackRequest) -> dict:
     """حفظ تقييم المستخدم"""
@@ -867,8 +869,8 @@ async def save_conversation_data_endpoint(
         raise HTTPException(status_code=500, detail=f"خطأ في حفظ بيانات المحادثة: {str(e)}")
 
 @app.get("/api/progress/conversation-history")
-async def get_conversation_history(user_id: str = Depends(get_user_id_from_token)):
-    """جلب تاريخ المحادثات الصوتية"""
+async def get_conversation_history(include_archived: bool = False, user_id: str = Depends(get_user_id_from_token)):
+    """جلب تاريخ المحادثات الصوتية (include_archived=true لاستعادة الجلسات المؤرشفة)"""
     try:
         progress = await supabase_manager.get_user_progress(user_id)
         if not progress:
@@ -877,9 +879,14 @@ async def get_conversation_history(user_id: str = Depends(get_user_id_from_token
                 "conversation_history": {}
             }
         
+        conversation_history = progress.get("conversation_history", {}) or {}
+        if include_archived:
+            archived = await supabase_manager.get_archived_sessions(user_id, "user_progress")
+            conversation_history = {**archived, **conversation_history}
+        
         return {
             "success": True,
-            "conversation_history": progress.get("conversation_history", {}),
+            "conversation_history": conversation_history,
             "current_topic": progress.get("current_topic", ""),
             "last_position": progress.get("last_position", ""),
             "words_learned": progress.get("words_learned", 0),
@@ -888,6 +895,59 @@ async def get_conversation_history(user_id: str = Depends(get_user_id_from_token
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"خطأ في جلب تاريخ المحادثات: {str(e)}")
 
+@app.get("/api/progress/archived-sessions")
+async def get_archived_sessions(table: str = "user_progress", session_id: Optional[str] = None,
+                                user_id: str = Depends(get_user_id_from_token)):
+    """استعادة الجلسات المؤرشفة من التخزين البارد (user_progress أو podcast_progress)"""
+    try:
+        sessions = await supabase_manager.get_archived_sessions(
+            user_id, table, [session_id] if session_id else None
+        )
+        return {
+            "success": True,
+            "sessions": sessions
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطأ في استعادة الجلسات المؤرشفة: {str(e)}")
+
+# ==================== Leaderboard Endpoints ====================
+
+@app.get("/api/leaderboard")
+async def get_leaderboard(board: str = "global", limit: int = 10, user_id: str = Depends(get_user_id_from_token)):
+    """أفضل المستخدمين في لوحة المتصدرين (global أو weekly) - الترتيب والنقاط فقط بدون معرفات المستخدمين"""
+    try:
+        entries = await supabase_manager.get_leaderboard(board, max(1, min(limit, 100)))
+        return {
+            "success": True,
+            "board": board,
+            "entries": [
+                {**{key: value for key, value in entry.items() if key != "user_id"},
+                 "is_current_user": entry.get("user_id") == user_id}
+                for entry in entries
+            ]
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطأ في جلب لوحة المتصدرين: {str(e)}")
+
+@app.get("/api/leaderboard/rank")
+async def get_leaderboard_rank(board: str = "global", user_id: str = Depends(get_user_id_from_token)):
+    """ترتيب المستخدم الحالي في لوحة المتصدرين"""
+    try:
+        rank = await supabase_manager.get_user_rank(user_id, board)
+        return {
+            "success": True,
+            "board": board,
+            "rank": rank
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطأ في جلب الترتيب: {str(e)}")
+
 # ==================== Debug Endpoints ====================
 
 @app.post("/api/debug/test-database")
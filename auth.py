@@ -132,3 +132,12 @@ async def verify_user_role(token: str, required_role: str) -> bool:
     except Exception as e:
         logger.error(f"خطأ في التحقق من الدور: {e}")
         return False
+
+async def require_admin(token: str = Depends(jwt_bearer)) -> str:
+    """يسمح فقط للمشرفين - الدور من app_metadata لأن user_metadata يعدله المستخدم بنفسه"""
+    payload = decode_jwt_payload(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="التوكن غير صالح")
+    if (payload.get("app_metadata") or {}).get("role") != "admin":
+        raise HTTPException(status_code=403, detail="هذه الصفحة للمشرفين فقط")
+    return payload.get("sub")
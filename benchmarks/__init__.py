@@ -0,0 +1,4 @@
+"""
+قياسات أداء للمعالجات النصية في الوكيل
+التشغيل من جذر المشروع: python -m benchmarks.<اسم_الملف>
+"""
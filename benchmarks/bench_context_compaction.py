@@ -0,0 +1,107 @@
+"""
+فحص ضغط سياق المحادثة بدون نموذج وبدون livekit: ChatContext بسيط وملخِّص بديل (stub)
+يتحقق من: بقاء السياق تحت الميزانية، تثبيت التعليمات وآخر كتلة ذاكرة فقط، حذف تذكيرات اللغة القديمة،
+وأن الملخِّص يستلم أدوار المستخدم والمساعد فقط مع الملخص السابق
+التشغيل: python -m benchmarks.bench_context_compaction [عدد الأدوار]
+"""
+import sys
+import time
+import asyncio
+import itertools
+
+from benchmarks.tutor_responses import ALL_RESPONSES
+from benchmarks.user_transcripts import ALL_TRANSCRIPTS
+from context_compaction import MEMORY_ID_PREFIX, SUMMARY_ID_PREFIX, ChatContextCompactor
+
+TURNS = 400
+TOKEN_BUDGET = 2000
+
+_ids = itertools.count()
+
+
+class StubMessage:
+    type = "message"
+
+    def __init__(self, role, content, id=None):
+        self.id = id or f"item_{next(_ids)}"
+        self.role = role
+        self.content = [content]
+        self.text_content = content
+
+
+class StubChatContext:
+    def __init__(self, items=None):
+        self.items = list(items or [])
+
+    def copy(self):
+        return StubChatContext(self.items)
+
+    def add_message(self, role, content, id=None):
+        message = StubMessage(role, content, id)
+        self.items.append(message)
+        return message
+
+
+class StubSummarizer:
+    """يسجل ما يستلمه ويعيد ملخصاً ثابت الحجم"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, previous, turns, max_tokens):
+        self.calls.append((previous, turns))
+        return f"summary #{len(self.calls)} ({len(turns)} turns)"
+
+
+async def main(turns: int) -> int:
+    summarizer = StubSummarizer()
+    compactor = ChatContextCompactor(token_budget=TOKEN_BUDGET, keep_recent_turns=8, summary_tokens=200,
+                                     summarizer=summarizer)
+    ctx = StubChatContext()
+    ctx.add_message("system", "You are Friday, an English tutor.")
+    errors = []
+    peak = 0
+    start = time.perf_counter()
+    for turn in range(turns):
+        ctx.add_message("user", ALL_TRANSCRIPTS[turn % len(ALL_TRANSCRIPTS)])
+        ctx.add_message("assistant", ALL_RESPONSES[turn % len(ALL_RESPONSES)])
+        if turn % 25 == 5:
+            ctx.add_message("system", "Language check: ask the learner to answer in English.")
+        if turn % 100 == 3:
+            # كتلة ذاكرة متأخرة (بدء سريع) - الأحدث فقط يجب أن يبقى
+            ctx.add_message("system", f"memory block {turn}", id=f"{MEMORY_ID_PREFIX}{turn}")
+        new_ctx = await compactor.compact(ctx)
+        if new_ctx is not None:
+            ctx = new_ctx
+        peak = max(peak, compactor.measure(ctx))
+    seconds = time.perf_counter() - start
+
+    if compactor.measure(ctx) > TOKEN_BUDGET:
+        errors.append(f"السياق فوق الميزانية: {compactor.measure(ctx)}")
+    if ctx.items[0].text_content != "You are Friday, an English tutor.":
+        errors.append("التعليمات الأولى لم تُثبَّت")
+    memory = [item.id for item in ctx.items if item.id.startswith(MEMORY_ID_PREFIX)]
+    latest_memory = f"{MEMORY_ID_PREFIX}{max(t for t in range(turns) if t % 100 == 3)}"
+    if memory != [latest_memory]:
+        errors.append(f"كتل الذاكرة بعد الضغط: {memory} (المتوقع {latest_memory} فقط)")
+    reminders = sum(1 for item in ctx.items if item.text_content.startswith("Language check"))
+    if reminders > 1:
+        errors.append(f"تذكيرات لغة متراكمة: {reminders}")
+    summaries = [item for item in ctx.items if item.id.startswith(SUMMARY_ID_PREFIX)]
+    if len(summaries) != 1:
+        errors.append(f"عدد الملخصات: {len(summaries)}")
+    if any(role not in ("user", "assistant") for _, dropped in summarizer.calls for role, _ in dropped):
+        errors.append("الملخِّص استلم رسائل نظام")
+    if summarizer.calls[1:] and not all(previous for previous, _ in summarizer.calls[1:]):
+        errors.append("الملخص السابق لم يُمرر للملخِّص")
+
+    for error in errors:
+        print(f"❌ {error}")
+    print(f"{turns} دور، {compactor.compactions} ضغط، أقصى حجم {peak} token (الميزانية {TOKEN_BUDGET})، "
+          f"{len(ctx.items)} عنصر في النهاية، {len(errors)} خطأ")
+    print(f"compact: {seconds / turns * 1e6:8.1f} µs/turn")
+    return len(errors)
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else TURNS)) else 0)
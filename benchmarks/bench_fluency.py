@@ -0,0 +1,63 @@
+"""
+قياس مقاييس الطلاقة: إعادة الحساب على كل نصوص الجلسة بعد كل إجابة
+مقابل FluencyTracker التدريجي (O(1) لكل كلمة)، مع فحص تطابق القيم
+التشغيل: python -m benchmarks.bench_fluency [عدد الإجابات]
+"""
+import sys
+import time
+
+from benchmarks.user_transcripts import ALL_TRANSCRIPTS
+from fluency import TTR_WINDOW, _TOKEN_RE, FluencyTracker
+from language_id import classify_language
+
+UTTERANCES = 600
+
+
+def recompute(history):
+    """كل المقاييس من الصفر على كل الإجابات حتى الآن"""
+    verdicts = [classify_language(text) for text in history]
+    verdicts = [verdict for verdict in verdicts if verdict.words]
+    english = sum(verdict.english_words for verdict in verdicts)
+    arabic = sum(verdict.arabic_words for verdict in verdicts)
+    tokens = [token for text in history for token in _TOKEN_RE.findall(text.lower())]
+    if len(tokens) >= TTR_WINDOW:
+        windows = [len(set(tokens[i:i + TTR_WINDOW])) / TTR_WINDOW for i in range(len(tokens) - TTR_WINDOW + 1)]
+        ttr = sum(windows) / len(windows)
+    else:
+        ttr = len(set(tokens)) / len(tokens) if tokens else None
+    return {
+        "utterances": len(verdicts),
+        "english_words": english,
+        "type_token_ratio": round(ttr, 3) if ttr is not None else None,
+        "mean_utterance_length": round(english / len(verdicts), 2) if verdicts else 0.0,
+        "english_share": round(english / (english + arabic), 3) if english + arabic else 0.0,
+    }
+
+
+def main():
+    utterances = int(sys.argv[1]) if len(sys.argv) > 1 else UTTERANCES
+    texts = [ALL_TRANSCRIPTS[i % len(ALL_TRANSCRIPTS)] for i in range(utterances)]
+
+    start = time.perf_counter()
+    history = []
+    for text in texts:
+        history.append(text)
+        expected = recompute(history)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tracker = FluencyTracker()
+    for text in texts:
+        tracker.observe(text, classify_language(text))
+        actual = tracker.to_dict()
+    incremental_seconds = time.perf_counter() - start
+
+    mismatches = [key for key, value in expected.items() if actual[key] != value]
+    print(f"{utterances} إجابة، اختلافات في القيم النهائية: {mismatches or 0}")
+    print(f"  recompute: {legacy_seconds / utterances * 1e6:10.1f} µs/utterance")
+    print(f"incremental: {incremental_seconds / utterances * 1e6:10.1f} µs/utterance")
+    return len(mismatches)
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
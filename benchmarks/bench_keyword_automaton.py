@@ -0,0 +1,53 @@
+"""
+فحص آلة الكلمات المفتاحية على مدونة انحدار (حدود الكلمات، السوابق واللواحق العربية، المطابقة الأطول)
+وقياس زمن المسح لكل رد
+التشغيل: python -m benchmarks.bench_keyword_automaton
+"""
+import sys
+import timeit
+
+from benchmarks.tutor_responses import ALL_RESPONSES
+from keyword_automaton import (
+    COMPLETION, CORRECT, NEW_TOPIC_INTENT, STUDY_INTENT, TOPIC, WRONG, keyword_automaton,
+)
+
+# (النص، الفئات المتوقعة مع كلماتها) - الفئات غير المذكورة يجب ألا تظهر (عدا المواضيع)
+KEYWORD_CASES = [
+    # لواحق بعد الكلمة العربية
+    ("إجابتك صحيحة!", {CORRECT: ["صحيح"]}),
+    ("إجابة غير صحيحة", {WRONG: ["غير صحيح"]}),
+    ("ممتازة", {CORRECT: ["ممتاز"], COMPLETION: ["ممتاز"]}),
+    ("رائعة", {CORRECT: ["رائع"]}),
+    ("نكمل درسنا", {STUDY_INTENT: ["درس"]}),
+    ("هذا خطأك", {WRONG: ["خطأ"]}),
+    # سوابق المضارع للأفعال فقط
+    ("أريد أن أتعلم", {STUDY_INTENT: ["تعلم"]}),
+    ("وسنتعلم اليوم", {STUDY_INTENT: ["تعلم"]}),
+    ("دعني أصحح: تصحيح بسيط", {}),
+    # سوابق الأسماء والعطف
+    ("الدرس التالي", {STUDY_INTENT: ["درس"]}),
+    ("وموضوع جديد من فضلك", {NEW_TOPIC_INTENT: ["موضوع جديد"]}),
+    # حدود الكلمات الإنجليزية
+    ("That is the greatest!", {}),
+    ("Great job, that's correct.", {CORRECT: ["great", "correct"], COMPLETION: ["great"]}),
+    ("Not quite, try again.", {WRONG: ["not quite", "try again"]}),
+]
+
+
+def main(number: int = 2000) -> int:
+    regressions = 0
+    for text, expected in KEYWORD_CASES:
+        hits = keyword_automaton.scan(text)
+        actual = {category: words for category, words in hits.items() if category != TOPIC or category in expected}
+        if actual != expected:
+            regressions += 1
+            print(f"❌ {text!r}\n   متوقع: {expected}\n   فعلي:  {actual}")
+    print(f"مدونة الانحدار: {len(KEYWORD_CASES)} نص، {regressions} اختلاف")
+
+    seconds = timeit.timeit(lambda: [keyword_automaton.scan(text) for text in ALL_RESPONSES], number=number)
+    print(f"scan: {seconds / (number * len(ALL_RESPONSES)) * 1e6:8.2f} µs/response")
+    return regressions
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
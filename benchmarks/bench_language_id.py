@@ -0,0 +1,46 @@
+"""
+قياس مصنف لغة نسخ المستخدم (language_id): دقة التصنيف على عينات معلّمة
+وزمن التصنيف لكل نسخ مقارنة بزمن محلل نسخ المستخدم كاملاً
+التشغيل: python -m benchmarks.bench_language_id
+"""
+import sys
+import timeit
+
+from analyzers import analyze_user_text
+from benchmarks.user_transcripts import ALL_TRANSCRIPTS, ARABIC_TRANSCRIPTS, ENGLISH_TRANSCRIPTS
+from language_id import ARABIC, ENGLISH, MIXED, UNKNOWN, classify_language
+
+LABELED = (
+    [(text, ENGLISH) for text in ENGLISH_TRANSCRIPTS]
+    + [(text, ARABIC) for text in ARABIC_TRANSCRIPTS]
+    + [
+        ("اسمي Sara and I am 19", ENGLISH),
+        ("I don't know, ممكن تعيد السؤال؟", MIXED),
+        ("the cat يعني القطة", MIXED),
+        ("وَصَلْـنا إلى الأفعال", ARABIC),
+        ("\u200fI live in Cairo\u200e", ENGLISH),
+        ("I’m fine thanks", ENGLISH),
+        ("123 456", UNKNOWN),
+        ("", UNKNOWN),
+    ]
+)
+
+
+def main(number: int = 2000) -> int:
+    errors = 0
+    for text, expected in LABELED:
+        verdict = classify_language(text)
+        if verdict.language != expected:
+            errors += 1
+            print(f"❌ {text!r}: متوقع {expected}، فعلي {verdict}")
+    print(f"عينات معلّمة: {len(LABELED)}، {errors} خطأ\n")
+
+    for label, fn in (("language_id", classify_language), ("user_text", analyze_user_text)):
+        seconds = timeit.timeit(lambda: [fn(text) for text in ALL_TRANSCRIPTS], number=number)
+        per_text_us = seconds / (number * len(ALL_TRANSCRIPTS)) * 1e6
+        print(f"{label:>12}: {per_text_us:7.3f} µs/transcript")
+    return errors
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
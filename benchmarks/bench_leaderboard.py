@@ -0,0 +1,92 @@
+"""
+فحص وقياس لوحة المتصدرين: SortedBoard (skip list مفهرسة) مقابل قائمة مرتبة بـ bisect (التحديث O(n))
+الفحص: ترتيب كل مستخدم وأفضل N يطابقان الحساب المباشر بعد تحديثات عشوائية
+التشغيل: python -m benchmarks.bench_leaderboard [عدد المستخدمين]
+"""
+import sys
+import time
+import bisect
+import random
+
+from leaderboard import SortedBoard
+
+USERS = 100_000
+UPDATES = 50_000
+
+
+class ListBoard:
+    """التنفيذ السابق: قائمة مفاتيح مرتبة - إدراج وحذف بإزاحة عناصر القائمة"""
+
+    def __init__(self):
+        self._keys = []
+        self._scores = {}
+
+    def update(self, user_id, score):
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            index = bisect.bisect_left(self._keys, (-old, user_id))
+            del self._keys[index]
+        bisect.insort(self._keys, (-score, user_id))
+        self._scores[user_id] = score
+
+    def rank(self, user_id):
+        return bisect.bisect_left(self._keys, (-self._scores[user_id], "")) + 1
+
+
+def check(users: int = 2000, updates: int = 20000) -> int:
+    rng = random.Random(7)
+    board = SortedBoard()
+    scores = {}
+    for _ in range(updates):
+        user_id = f"u{rng.randrange(users)}"
+        if rng.random() < 0.05 and user_id in scores:
+            board.remove(user_id)
+            del scores[user_id]
+            continue
+        scores[user_id] = rng.randrange(500)
+        board.update(user_id, scores[user_id])
+
+    errors = 0
+    ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    if board.top(50) != ordered[:50] or len(board) != len(scores):
+        errors += 1
+        print("❌ أفضل 50 أو عدد المستخدمين لا يطابق الحساب المباشر")
+    for user_id, score in scores.items():
+        expected = sum(1 for other in scores.values() if other > score) + 1 if len(scores) < 3000 else None
+        if expected is not None and board.rank(user_id) != expected:
+            errors += 1
+            print(f"❌ ترتيب {user_id}: {board.rank(user_id)} (المتوقع {expected})")
+            break
+    return errors
+
+
+def measure(board_cls, users: int, updates: int) -> tuple:
+    rng = random.Random(11)
+    board = board_cls()
+    for index in range(users):
+        board.update(f"u{index}", rng.randrange(10_000))
+    ids = [f"u{rng.randrange(users)}" for _ in range(updates)]
+    start = time.perf_counter()
+    for user_id in ids:
+        board.update(user_id, rng.randrange(10_000))
+    update_us = (time.perf_counter() - start) / updates * 1e6
+    start = time.perf_counter()
+    for user_id in ids:
+        board.rank(user_id)
+    rank_us = (time.perf_counter() - start) / updates * 1e6
+    return update_us, rank_us
+
+
+def main(users: int) -> int:
+    errors = check()
+    print(f"فحص الترتيب: {errors} خطأ")
+    for label, board_cls in (("sorted list", ListBoard), ("skip list", SortedBoard)):
+        update_us, rank_us = measure(board_cls, users, UPDATES)
+        print(f"{label:>12} ({users} مستخدم): update {update_us:7.2f} µs، rank {rank_us:6.2f} µs")
+    return errors
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else USERS) else 0)
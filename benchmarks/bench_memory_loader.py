@@ -0,0 +1,89 @@
+"""
+قياس تحميل ذاكرة الجلسة بطلبات قاعدة بيانات متزامنة (time.sleep مثل execute() في supabase-py):
+- sequential: صف بعد صف (التحميل السابق)
+- plan, on loop: خطة memory_loader لكن execute() يُستدعى مباشرة في الـ event loop - لا توازي فعلي
+- plan, threads: خطة memory_loader و execute() في asyncio.to_thread (مثل SupabaseManager._execute)
+مع أقصى توقف للـ event loop أثناء التحميل (ما يؤخر بدء الجلسة والترحيب في البدء السريع)
+التشغيل: python -m benchmarks.bench_memory_loader [زمن الطلب بالملي ثانية]
+"""
+import sys
+import time
+import asyncio
+
+from memory_loader import MEMORY_PLANS, fetch_rows
+
+ROW_LATENCY_MS = 80
+# عدد الطلبات المتتالية داخل كل صف (التحفيز: التقييم بالتوازي مع الـ streak؛ الجمل: جلب ثم إصلاح العدد)
+ROUND_TRIPS = {
+    "personal_context": 1, "gamification": 1, "user_progress": 1,
+    "sentences_progress": 2, "podcast_progress": 1,
+}
+
+
+class BlockingQuery:
+    """بديل query builder: execute() متزامن يحجز الـ thread طوال زمن الطلب"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def execute(self):
+        time.sleep(self.latency)
+        return None
+
+
+def make_loaders(latency: float, offload: bool):
+    async def row(trips: int):
+        for _ in range(trips):
+            query = BlockingQuery(latency)
+            if offload:
+                await asyncio.to_thread(query.execute)
+            else:
+                query.execute()
+
+    return {name: (lambda trips=trips: row(trips)) for name, trips in ROUND_TRIPS.items()}
+
+
+async def measure(load) -> tuple:
+    """(الزمن الكلي، أقصى توقف للـ event loop) - نبضة كل 5ms تقيس تأخر استئنافها"""
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag = max(lag, time.perf_counter() - before - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await load()
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick
+    return elapsed, lag
+
+
+async def main(latency_ms: float) -> None:
+    latency = latency_ms / 1000
+    blocking = make_loaders(latency, offload=False)
+    threaded = make_loaders(latency, offload=True)
+    print(f"زمن الطلب الواحد: {latency_ms:.0f}ms (الأرقام: الزمن الكلي / أقصى توقف للـ event loop)")
+    for mode, plan in MEMORY_PLANS.items():
+        async def sequential():
+            for row in plan.rows:
+                await blocking[row]()
+
+        results = [
+            await measure(sequential),
+            await measure(lambda: fetch_rows(plan, blocking)),
+            await measure(lambda: fetch_rows(plan, threaded)),
+        ]
+        cells = ", ".join(f"{label} {elapsed * 1000:5.0f}/{lag * 1000:4.0f}ms"
+                          for label, (elapsed, lag) in zip(("sequential", "plan on loop", "plan threads"), results))
+        print(f"{mode:>20}: {cells}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else ROW_LATENCY_MS))
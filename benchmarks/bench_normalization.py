@@ -0,0 +1,67 @@
+"""
+قياس أداء تطبيع النصوص: سلاسل replace وجداول translate المبنية في كل استدعاء (الطريقة القديمة)
+مقابل جداول text_normalization المبنية مرة واحدة، مع فحص تطابق النتائج
+التشغيل: python -m benchmarks.bench_normalization
+"""
+import sys
+import timeit
+
+from benchmarks.topic_corpus import TOPIC_CASES
+from benchmarks.tutor_responses import ALL_RESPONSES
+from benchmarks.user_transcripts import ALL_TRANSCRIPTS
+from text_normalization import fold_arabic, strip_invisible
+
+
+def legacy_strip_invisible(text):
+    """نسخة من _sanitize_email_text القديمة: الجدول يُبنى في كل استدعاء"""
+    bidi_codes = [
+        0x200E, 0x200F,
+        0x202A, 0x202B, 0x202C, 0x202D, 0x202E,
+        0x2066, 0x2067, 0x2068, 0x2069,
+        0x061C,
+    ]
+    zero_width = [0x200B, 0x200C, 0x200D, 0xFEFF, 0x2060, 0x180E]
+    tbl = {cp: None for cp in (bidi_codes + zero_width)}
+    return text.translate(tbl)
+
+
+def legacy_fold_arabic(text):
+    """سلسلة replace لكل محرف (الطريقة المعتادة قبل الجداول المشتركة)"""
+    for code in (0x200E, 0x200F, 0x202A, 0x202B, 0x202C, 0x202D, 0x202E, 0x2066, 0x2067, 0x2068, 0x2069,
+                 0x061C, 0x200B, 0x200C, 0x200D, 0xFEFF, 0x2060, 0x180E):
+        text = text.replace(chr(code), "")
+    for code in list(range(0x064B, 0x0653)) + [0x0670, 0x0640]:
+        text = text.replace(chr(code), "")
+    for char, target in (("أ", "ا"), ("إ", "ا"), ("آ", "ا"), ("ٱ", "ا"), ("ى", "ي"), ("ة", "ه")):
+        text = text.replace(char, target)
+    return text
+
+
+CASES = (
+    ("strip_invisible", legacy_strip_invisible, strip_invisible),
+    ("fold_arabic", legacy_fold_arabic, fold_arabic),
+)
+
+
+def main(number: int = 2000) -> int:
+    texts = list(ALL_TRANSCRIPTS) + list(ALL_RESPONSES) + [text for text, _, _ in TOPIC_CASES]
+    # نصوص تحتاج فعلاً إلى تطبيع (محارف غير مرئية، تشكيل، تطويل) حتى لا يقيس الفحص المسبق وحده
+    texts += ["\u200fاسمي أحمد\u200e", "الموضـوع الحالي: الأسماء", "وَصَلْنا إلى الأفعال", "Nouns are words\ufeff"]
+    mismatches = 0
+    for label, legacy, current in CASES:
+        for text in texts:
+            if legacy(text) != current(text):
+                mismatches += 1
+                print(f"❌ {label}: {text[:60]!r}")
+    print(f"{len(texts)} نص، {mismatches} اختلاف\n")
+
+    for label, legacy, current in CASES:
+        for name, fn in (("legacy", legacy), ("shared", current)):
+            seconds = timeit.timeit(lambda: [fn(text) for text in texts], number=number)
+            per_text_us = seconds / (number * len(texts)) * 1e6
+            print(f"{label:>16} {name:>7}: {per_text_us:7.3f} µs/text")
+    return mismatches
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,102 @@
+"""
+قياس أداء استخراج المعلومات الشخصية: الطريقة القديمة (re.search بأنماط نصية لكل نسخ)
+مقابل personal_info المُجمّعة، مع عدد الكتابات إلى personal_context قبل وبعد المقارنة والتجميع
+التشغيل: python -m benchmarks.bench_personal_info
+"""
+import re
+import timeit
+
+from benchmarks.user_transcripts import ALL_TRANSCRIPTS, ARABIC_TRANSCRIPTS, ENGLISH_TRANSCRIPTS, MIXED_TRANSCRIPTS
+from personal_info import (
+    AGE_PATTERN, CITY_PATTERNS, EXCLUDED_NAMES, HOBBY_KEYWORDS, LIST_PATTERN, NAME_PATTERNS,
+    OCCUPATION_PATTERNS, SURROUNDING_HINTS, diff_personal_context, extract_personal_info,
+    merge_personal_context,
+)
+
+_FLAGS = re.IGNORECASE | re.UNICODE
+
+
+def legacy_extract(text):
+    """نسخة من الاستخراج القديم: أنماط نصية تُمرر لـ re في كل استدعاء"""
+    if not text:
+        return {}
+    text_lower = text.lower()
+    updates = {}
+    for pattern in (p.pattern for p in NAME_PATTERNS):
+        match = re.search(pattern, text, _FLAGS)
+        if match and len(match.group(1)) > 1 and len(match.group(1)) < 20:
+            potential_name = match.group(1).strip()
+            if potential_name.lower() not in list(EXCLUDED_NAMES):
+                updates['first_name'] = potential_name.title()
+                break
+    age_match = re.search(AGE_PATTERN.pattern, text, _FLAGS)
+    if age_match:
+        age = int(age_match.group(1))
+        if 5 <= age <= 100:
+            updates['age'] = age
+    for pattern in (p.pattern for p in CITY_PATTERNS):
+        match = re.search(pattern, text, _FLAGS)
+        if match:
+            city = match.group(1).strip()
+            if len(city) > 2 and len(city) < 30:
+                updates['city'] = city.title()
+                break
+    for pattern in (p.pattern for p in OCCUPATION_PATTERNS):
+        match = re.search(pattern, text, _FLAGS)
+        if match:
+            updates['occupation'] = match.group(1).strip()
+            break
+    found_hobbies = []
+    for hobby in HOBBY_KEYWORDS:
+        if hobby in text_lower:
+            found_hobbies.append(hobby)
+    list_match = re.findall(LIST_PATTERN.pattern, text, re.UNICODE)
+    if list_match and not updates.get('first_name'):
+        items = [item for pair in list_match for item in pair]
+        if any(word in text_lower for word in SURROUNDING_HINTS):
+            found_hobbies.extend(items[:3])
+    if found_hobbies:
+        updates['hobbies'] = found_hobbies[:5]
+    return updates
+
+
+def count_writes(transcripts, debounce_every: int = 4):
+    """عدد الكتابات: القديم (كل تطابق) / بعد المقارنة / بعد المقارنة والتجميع (تقريب: دفعة كل N نسخ)"""
+    legacy = changed = batched = 0
+    cached, pending = {}, {}
+    for position, text in enumerate(transcripts, 1):
+        updates = extract_personal_info(text)
+        if updates:
+            legacy += 1
+        changes = diff_personal_context(cached, updates)
+        if changes:
+            changed += 1
+            merge_personal_context(cached, changes)
+            merge_personal_context(pending, changes)
+        if pending and position % debounce_every == 0:
+            batched += 1
+            pending = {}
+    if pending:
+        batched += 1
+    return legacy, changed, batched
+
+
+def main(number: int = 2000):
+    mismatches = [text for text in ALL_TRANSCRIPTS if legacy_extract(text) != extract_personal_info(text)]
+    print(f"transcripts: {len(ALL_TRANSCRIPTS)}, output mismatches vs legacy: {len(mismatches)}")
+    for text in mismatches:
+        print(f"  ! {text!r}: {legacy_extract(text)} != {extract_personal_info(text)}")
+
+    for label, corpus in (("english", ENGLISH_TRANSCRIPTS), ("arabic", ARABIC_TRANSCRIPTS),
+                          ("mixed", MIXED_TRANSCRIPTS)):
+        legacy, changed, batched = count_writes(corpus)
+        print(f"{label:>8} writes: legacy={legacy} diffed={changed} diffed+debounced={batched}")
+
+    for label, fn in (("legacy", legacy_extract), ("compiled", extract_personal_info)):
+        seconds = timeit.timeit(lambda: [fn(text) for text in ALL_TRANSCRIPTS], number=number)
+        per_transcript_us = seconds / (number * len(ALL_TRANSCRIPTS)) * 1e6
+        print(f"{label:>8}: {per_transcript_us:8.2f} µs/transcript")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+قياس أداء استخراج الجمل: الطريقة القديمة (re.findall بعشرة أنماط غير مُجمّعة)
+مقابل محرك sentence_extraction المُجمّع مع منع التداخل
+التشغيل: python -m benchmarks.bench_sentence_extraction
+"""
+import re
+import timeit
+
+from benchmarks.tutor_responses import ALL_RESPONSES, SENTENCES_MODE_RESPONSES
+from sentence_extraction import sentence_extractor
+
+LEGACY_PATTERNS = [
+    r'\*\*([A-Z][^*]+\.)\*\*',
+    r'[\d]+\.\s*\*\*([A-Z][^*]+\.)\*\*',
+    r'"([A-Z][^"]+\.)"',
+    r':\s+([A-Z][^.!?]+[.!?])',
+    r'الجملة:\s*([A-Z][^.!?]+[.!?])',
+    r'sentence:\s*([A-Z][^.!?]+[.!?])',
+    r'say:\s*([A-Z][^.!?]+[.!?])',
+    r'قل:\s*([A-Z][^.!?]+[.!?])',
+    r'\b([A-Z][a-z]+(?:\s+[a-z]+){1,8}[.!?])\b',
+    r'^([A-Z][^.!?]+[.!?])$',
+]
+
+
+def legacy_extract(text):
+    found = []
+    for pattern in LEGACY_PATTERNS:
+        found.extend(re.findall(pattern, text, re.MULTILINE))
+    return found
+
+
+def main(number: int = 2000):
+    legacy_total = sum(len(legacy_extract(text)) for text in SENTENCES_MODE_RESPONSES)
+    engine_total = sum(len(sentence_extractor.extract(text)) for text in SENTENCES_MODE_RESPONSES)
+    print(f"matches (legacy, with overlaps): {legacy_total}")
+    print(f"matches (engine, overlap-free):  {engine_total}")
+
+    for label, fn in (("legacy", legacy_extract), ("engine", sentence_extractor.extract)):
+        seconds = timeit.timeit(lambda: [fn(text) for text in ALL_RESPONSES], number=number)
+        per_response_us = seconds / (number * len(ALL_RESPONSES)) * 1e6
+        print(f"{label:>7}: {per_response_us:8.2f} µs/response")
+
+
+if __name__ == "__main__":
+    main()
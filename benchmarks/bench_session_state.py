@@ -0,0 +1,126 @@
+"""
+قياس ذاكرة حالة الجلسة لكل متعلم: السمات القديمة المتفرقة على Assistant (__dict__ + session_data dict
++ قائمة كلمات الجلسة) مقابل session_state (slots + عدادات + حاويات محدودة)
+التشغيل: python -m benchmarks.bench_session_state [عدد الجلسات]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+from sentence_dedupe import SentenceDeduper
+from session_state import PodcastState, SentencesState, SessionData, SessionStats
+
+SESSIONS = 2000
+WORDS_PER_SESSION = 120
+ANSWERS_PER_SESSION = 60
+PODCAST_NOTES = 80
+
+
+class LegacyState:
+    """نسخة من سمات Assistant القديمة المتعلقة بحالة الجلسة"""
+
+    def __init__(self, words):
+        self._last_context_save = None
+        self.session_start_time = datetime.now()
+        self.words_learned_session = []
+        self.session_correct_answers = 0
+        self.session_total_attempts = 0
+        self.session_data = {
+            "session_id": str(datetime.now().timestamp()),
+            "start_time": datetime.now().isoformat(),
+            "words_discussed": words,
+            "topics_covered": [],
+            "current_topic": "",
+            "last_position": ""
+        }
+        self._message_count = 0
+        self.sentences_session_id = f"sentences_{int(datetime.now().timestamp())}"
+        self.sentences_progress = None
+        self.current_sentences = []
+        self.sentences_completed = 0
+        self.current_level = 1
+        self.current_sentence_index = 0
+        self.learned_sentences_history = []
+        self.sentence_deduper = SentenceDeduper()
+        self._learned_history_set = set()
+
+
+class SlottedState:
+    """نفس الحالة بعد النقل إلى session_state"""
+
+    __slots__ = ("stats", "session_data", "sentences", "podcast")
+
+    def __init__(self, words):
+        self.stats = SessionStats()
+        self.session_data = SessionData(words_discussed=words)
+        self.sentences = SentencesState()
+        self.podcast = PodcastState()
+
+
+def run_legacy(state, index):
+    for i in range(WORDS_PER_SESSION):
+        state.words_learned_session.append(f"word{index}_{i}")
+    for i in range(ANSWERS_PER_SESSION):
+        state.session_total_attempts += 1
+        state.session_correct_answers += i % 2
+        state._message_count += 1
+    state._session_start_time = datetime.now()
+    state._last_auto_save = datetime.now()
+    # ملاحظات البودكاست كانت تُنشأ عند الحاجة بدون حد
+    state.conversation_mistakes = [f"mistake {index}_{i}" for i in range(PODCAST_NOTES)]
+    state.conversation_improvements = [f"improvement {index}_{i}" for i in range(PODCAST_NOTES)]
+
+
+def run_slotted(state, index):
+    for i in range(WORDS_PER_SESSION):
+        state.stats.words_learned += 1
+    for i in range(ANSWERS_PER_SESSION):
+        state.stats.total_attempts += 1
+        state.stats.correct_answers += i % 2
+        state.stats.messages += 1
+    state.stats.last_auto_save = datetime.now()
+    state.podcast.mistakes.extend(f"mistake {index}_{i}" for i in range(PODCAST_NOTES))
+    state.podcast.improvements.extend(f"improvement {index}_{i}" for i in range(PODCAST_NOTES))
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def measure(factory, run, sessions):
+    gc.collect()
+    rss_before = _rss_bytes()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    # قائمة الكلمات مملوكة لـ VocabularyTracker في الحالتين - لا تُحسب هنا
+    states = [factory([]) for _ in range(sessions)]
+    for index, state in enumerate(states):
+        run(state, index)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    traced = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    rss = _rss_bytes() - rss_before
+    del states
+    gc.collect()
+    return traced / sessions, rss / sessions
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else SESSIONS
+    print(f"{sessions} جلسة، {WORDS_PER_SESSION} كلمة، {ANSWERS_PER_SESSION} إجابة، {PODCAST_NOTES} ملاحظة بودكاست لكل جلسة\n")
+    results = {}
+    for name, factory, run in (("legacy", LegacyState, run_legacy), ("slotted", SlottedState, run_slotted)):
+        traced, rss = measure(factory, run, sessions)
+        results[name] = traced
+        print(f"{name:8s} tracemalloc: {traced / 1024:8.2f} KiB/جلسة   RSS: {rss / 1024:8.2f} KiB/جلسة")
+    print(f"\nالتوفير: {(1 - results['slotted'] / results['legacy']) * 100:.1f}% لكل جلسة")
+
+
+if __name__ == "__main__":
+    main()
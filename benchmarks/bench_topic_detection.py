@@ -0,0 +1,63 @@
+"""
+قياس أداء اكتشاف الموضوع ونقطة التوقف: الطريقة القديمة (21 استدعاء re.findall بأنماط نصية لكل رد)
+مقابل topic_detection (تعبير واحد مُجمّع بمجموعات مسماة)، مع فحص مدونة الانحدار
+التشغيل: python -m benchmarks.bench_topic_detection
+"""
+import re
+import sys
+import timeit
+
+from benchmarks.topic_corpus import TOPIC_CASES
+from benchmarks.tutor_responses import ALL_RESPONSES
+from topic_detection import POSITION_PATTERNS, TOPIC_PATTERNS, topic_detector
+
+# نفس الأنماط بدون أسماء المجموعات، كما كانت في معالج conversation_item_added
+LEGACY_TOPIC_PATTERNS = [re.sub(r"\?P<\w+>", "", pattern) for _, pattern, _ in TOPIC_PATTERNS]
+LEGACY_POSITION_PATTERNS = [re.sub(r"\?P<\w+>", "", pattern) for _, pattern, _ in POSITION_PATTERNS]
+
+
+def _legacy_candidates(patterns, text):
+    found = []
+    for pattern in patterns:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            value = matches[0].strip().rstrip('.,!?؟،')
+            if value and len(value) > 3 and value not in found:
+                found.append(value)
+    return found
+
+
+def legacy_scan(text):
+    positions = _legacy_candidates(LEGACY_POSITION_PATTERNS, text)
+    return _legacy_candidates(LEGACY_TOPIC_PATTERNS, text), positions[0] if positions else ""
+
+
+def combined_scan(text):
+    scan = topic_detector.scan(text)
+    return scan.topics, scan.position
+
+
+def main(number: int = 2000) -> int:
+    regressions = 0
+    legacy_differences = 0
+    for text, topics, position in TOPIC_CASES:
+        expected = (topics, position)
+        actual = combined_scan(text)
+        if actual != expected:
+            regressions += 1
+            print(f"❌ {text[:60]!r}\n   متوقع: {expected}\n   فعلي:  {actual}")
+        if legacy_scan(text) != expected:
+            legacy_differences += 1
+    print(f"مدونة الانحدار: {len(TOPIC_CASES)} رد، {regressions} اختلاف")
+    print(f"اختلافات مقصودة عن الطريقة القديمة: {legacy_differences}")
+
+    texts = [text for text, _, _ in TOPIC_CASES] + ALL_RESPONSES
+    for label, fn in (("legacy", legacy_scan), ("combined", combined_scan)):
+        seconds = timeit.timeit(lambda: [fn(text) for text in texts], number=number)
+        per_response_us = seconds / (number * len(texts)) * 1e6
+        print(f"{label:>8}: {per_response_us:8.2f} µs/response")
+    return regressions
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
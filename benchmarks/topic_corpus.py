@@ -0,0 +1,107 @@
+"""
+مدونة انحدار لاكتشاف الموضوع ونقطة التوقف في ردود المعلم (عربي/إنجليزي/مختلط)
+كل عنصر: (النص، المواضيع المتوقعة بترتيب الأولوية، نقطة التوقف المتوقعة)
+القيم المتوقعة مأخوذة من المستخرج الأصلي (أنماط منفصلة) - أي تغيير فيها يجب أن يكون مقصوداً.
+الحالات المعلّمة بـ "مقصود" تختلف عن المستخرج الأصلي عمداً
+"""
+from benchmarks.tutor_responses import NORMAL_MODE_RESPONSES
+
+TOPIC_CASES = [
+    ("Welcome back, Sara! Last time we were talking about proper nouns. Today's topic is Pronouns.",
+     ['nouns', 'Pronouns'],
+     'proper nouns'),
+    ("أهلاً يا محمد! الموضوع الحالي: الضمائر الشخصية\nLet's learn Personal Pronouns step by step.",
+     ['Pronouns', 'Personal Pronouns step by step', 'الضمائر الشخصية'],
+     ''),
+    ("Great job! We finished Adjectives, so now let's study Adverbs together.",
+     ['Adjectives', 'Adverbs together'],
+     'Adjectives'),
+    ('ممتاز! انتهينا من الأسماء المعدودة. سنتعلم عن الصفات في الدرس القادم.',
+     ['الصفات في الدرس القادم'],
+     'الأسماء المعدودة. سنتعلم عن الصفات في الدرس القادم'),
+    ('Our topic will be Conjunctions. A conjunction joins two ideas, for example: I like tea and coffee.',
+     ['Conjunctions'],
+     ''),
+    ('نقطة التوقف: أمثلة على الأسماء المجردة',
+     [],
+     'أمثلة على الأسماء المجردة'),
+    ("You were learning irregular verbs. Let's review the past tense of go, eat and see.",
+     ['verbs', 'irregular verbs'],
+     'irregular verbs'),
+    ('In this lesson on Prepositions we will look at in, on and at.',
+     ['Prepositions', 'Prepositions we will look at in'],
+     ''),
+    ('دعنا نتحدث عن الأزمنة في اللغة الإنجليزية. The present tense describes habits.',
+     ['الأزمنة في اللغة الإنجليزية. The present tense describes habits'],
+     'present tense'),
+    ('Correct! The subject is Articles today: a, an and the.',
+     ['Articles', 'Articles today'],
+     ''),
+    ('We left off at collective nouns. Can you give me an example of a collective noun?',
+     ['nouns'],
+     'collective nouns'),
+    ('وصلنا إلى الأفعال الشاذة. Try this one: go, went, gone.',
+     [],
+     'الأفعال الشاذة. Try this one: go, went, gone'),
+    ('Excellent! You completed Countable Nouns. Now tell me: is water countable?',
+     ['Nouns'],
+     'Countable Nouns'),
+    ('Previously we were studying Tenses and you did very well with future tense.',
+     ['Tenses', 'Tenses and you did very well with future tense'],
+     'future tense'),
+    ("تعلمنا عن أدوات التعريف في الجلسة السابقة. Let's talk about Articles again.",
+     ['Articles', 'Articles again'],
+     "أدوات التعريف في الجلسة السابقة. Let's talk about Articles again"),
+    ('Nice! I am teaching Grammar basics today, starting with the definition of a noun.',
+     ['Grammar', 'Grammar basics today'],
+     'definition'),
+    ("That's a great question. Let me explain the rules for plural nouns.",
+     ['nouns'],
+     'rules'),
+    ('سنتعلم موضوع الأفعال المساعدة اليوم. Helping verbs like be, do and have.',
+     ['verbs', 'الأفعال المساعدة اليوم. Helping verbs like be, do and have'],
+     ''),
+    ('هل تتذكر موضوع الأسماء؟ راجعنا أنواعها في المرة الماضية.',
+     ['موضوع الأسماء'],
+     ''),
+    ('Good morning! How are you today? Tell me about your weekend.',
+     [],
+     ''),
+    ('Perfect pronunciation! Say it once more: I am a student.',
+     [],
+     ''),
+    ('We are discussing Abstract Nouns: love, freedom and happiness are all abstract.',
+     ['Nouns', 'Abstract Nouns'],
+     'Abstract Nouns'),
+    ('Earlier we talked about usage of adverbs of frequency like always and never.',
+     ['adverbs'],
+     'usage'),
+    ("The topic: Verb Forms. Let's practice base form, past simple and past participle.",
+     [],
+     'Verb Forms'),
+    # مقصود: covered داخل discovered لم يعد يُلتقط كنقطة توقف
+    ("You discovered something interesting about London.",
+     [],
+     ''),
+    # السوابق العربية الملتصقة ما زالت تُلتقط
+    ("رائع! وسنتعلم عن الأفعال الماضية بعد قليل.",
+     ['الأفعال الماضية بعد قليل'],
+     ''),
+    ("فدعنا نتحدث عن الهوايات. What do you like to do?",
+     ['الهوايات. What do you like to do'],
+     ''),
+]
+
+# ردود الوضع العادي المسجلة مع نتائجها المتوقعة
+_NORMAL_MODE_EXPECTED = [
+    (['Nouns', 'Types Of Nouns together', "الأسماء. Let's learn Types Of Nouns together", "Nouns. الموضوع الحالي: الأسماء. Let's learn Types Of Nouns together"], 'Types Of Nouns'),
+    (['nouns', 'common nouns and proper nouns'], 'common nouns'),
+    (['Adjectives'], ''),
+    (['Verbs', 'Verbs now', 'الأفعال المساعدة'], 'present tense'),
+    (['nouns'], 'countable nouns'),
+    (['verbs'], 'irregular verbs'),
+]
+TOPIC_CASES += [
+    (text, topics, position)
+    for text, (topics, position) in zip(NORMAL_MODE_RESPONSES, _NORMAL_MODE_EXPECTED)
+]
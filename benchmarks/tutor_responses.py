@@ -0,0 +1,35 @@
+"""
+عينة من ردود المعلم المسجلة (وضع الجمل، الوضع العادي، البودكاست)
+تُستخدم كمدخلات ثابتة لقياسات الأداء واختبارات جودة الاستخراج
+"""
+
+SENTENCES_MODE_RESPONSES = [
+    "ممتاز يا أحمد! الجملة الأولى هي: **I am happy.** كررها بعدي من فضلك.",
+    "رائع! الآن سنتعلم جملة جديدة.\n1. **I like coffee.**\n2. **She is my sister.**\n3. **We go to school.**\nقل: I like coffee.",
+    "أحسنت! The next sentence: \"My name is Sara.\" حاول أن تقولها ببطء.",
+    "Not quite. حاول مرة أخرى. الجملة: The cat is on the table.",
+    "Great job! Now say: I have a red car.\nThis sentence uses the adjective red before the noun.",
+    "Perfect!\nI am learning English.\nYou are a good student.\nسنكمل مع جمل المستوى الثاني.",
+    "Let's practice. sentence: He plays football every day. ركز على نطق every.",
+    "ممتاز! لقد أكملت 5 جمل. **They are my friends.** **The sun is hot.** هل أنت جاهز؟",
+    "Try again please. قل: It is cold today. انتبه لكلمة cold.",
+    "Excellent! \"I drink water.\" و \"She reads a book.\" جملتان بسيطتان.",
+]
+
+NORMAL_MODE_RESPONSES = [
+    "مرحباً! اليوم سنتعلم عن Nouns. الموضوع الحالي: الأسماء. Let's learn Types Of Nouns together.",
+    "Great! We were discussing common nouns and proper nouns. وصلنا إلى أنواع الأسماء المعدودة.",
+    "Excellent work! Today's topic is Adjectives. An adjective describes a noun, for example: a big house.",
+    "Last time we were talking about present tense. Let's study Verbs now. سنتعلم عن الأفعال المساعدة.",
+    "صحيح! We covered countable nouns and uncountable nouns. نقطة التوقف: الأسماء الجماعية.",
+    "That's not quite right, try again. Remember the rules and exceptions for irregular verbs.",
+]
+
+PODCAST_MODE_RESPONSES = [
+    "That sounds wonderful! Do you like to travel? Tell me about your favorite trip.",
+    "Interesting! Technology is changing so fast. What kind of phone do you use every day?",
+    "Great answer! Food is such a fun topic. What's your favorite dish from your country?",
+    "I love music too! Do you play any instruments, or do you just enjoy listening?",
+]
+
+ALL_RESPONSES = SENTENCES_MODE_RESPONSES + NORMAL_MODE_RESPONSES + PODCAST_MODE_RESPONSES
@@ -0,0 +1,53 @@
+"""
+عينة من نصوص المستخدمين النهائية (عربي، إنجليزي، ومختلط)
+تُستخدم كمدخلات ثابتة لقياس استخراج المعلومات الشخصية وعدد الكتابات الناتجة
+"""
+
+ENGLISH_TRANSCRIPTS = [
+    "Hello",
+    "My name is Omar",
+    "I am 24 years old",
+    "I live in Cairo.",
+    "I'm a student at the university",
+    "I like football and music",
+    "My name is Omar, I told you before",
+    "I see a pen, a book, a cup around me",
+    "I have a cat and a dog",
+    "Yes",
+    "I like football very much",
+    "My job is teacher",
+    "I am from Alexandria, near the sea.",
+    "I like reading and cooking on weekends",
+    "Can you repeat the sentence please",
+    "The cat is on the table.",
+    "I am happy today",
+    "Okay",
+]
+
+ARABIC_TRANSCRIPTS = [
+    "مرحبا",
+    "اسمي أحمد",
+    "عمري 30 سنة",
+    "أسكن في الرياض.",
+    "أنا مهندس",
+    "أحب كرة القدم والموسيقى",
+    "اسمي أحمد كما قلت لك",
+    "أرى قلم و كتاب و كوب حولي",
+    "عندي قطة و كلب",
+    "نعم",
+    "مدينتي جدة.",
+    "أحب القراءة و الطبخ",
+    "لا",
+    "عمري 30 سنة تقريباً",
+]
+
+MIXED_TRANSCRIPTS = [
+    "اسمي Sara and I am 19",
+    "I live in دبي.",
+    "أحب swimming و running",
+    "My name is Sara",
+    "أنا طالب in the university",
+    "I have a phone, a laptop and a bag",
+]
+
+ALL_TRANSCRIPTS = ENGLISH_TRANSCRIPTS + ARABIC_TRANSCRIPTS + MIXED_TRANSCRIPTS
@@ -0,0 +1,167 @@
+"""
+ضغط سياق المحادثة للجلسات الطويلة
+يبقي التعليمات الأولى وآخر كتلة ذاكرة + ملخصاً مضغوطاً للجزء القديم + نافذة من آخر الأدوار،
+تحت ميزانية tokens قابلة للضبط. رسائل النظام اللاحقة (تذكير اللغة، كتل ذاكرة أقدم) لا تُثبَّت:
+تبقى ما دامت في النافذة ثم تُحذف (لا تدخل الملخص). الملخِّص قابل للاستبدال (دالة متزامنة أو async)
+حتى يمكن اختباره بدون نموذج.
+"""
+import inspect
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_ID_PREFIX = "context_summary_"
+# كتل سياق الذاكرة المحقونة (load_mode_memory) - الأحدث فقط يُثبَّت
+MEMORY_ID_PREFIX = "memory_context_"
+SUMMARY_HEADER = "📋 ملخص الجزء السابق من المحادثة (تم ضغطه لتوفير السياق):"
+_SYSTEM_ROLES = ("system", "developer")
+_SUMMARY_ROLES = ("user", "assistant")
+
+Turn = Tuple[str, str]  # (role, text)
+Summarizer = Callable[[str, List[Turn], int], Union[str, Awaitable[str]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """تقدير تقريبي: ~4 أحرف لاتينية أو ~2 حرف عربي لكل token"""
+    if not text:
+        return 0
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii // 2 + 1
+
+
+def _item_text(item) -> str:
+    text = getattr(item, "text_content", None)
+    if text is not None:
+        return text
+    content = getattr(item, "content", None)
+    if isinstance(content, list):
+        return "\n".join(part for part in content if isinstance(part, str))
+    return str(content or getattr(item, "output", "") or getattr(item, "arguments", "") or "")
+
+
+def _is_summary(item) -> bool:
+    return str(getattr(item, "id", "")).startswith(SUMMARY_ID_PREFIX)
+
+
+def _is_memory(item) -> bool:
+    return str(getattr(item, "id", "")).startswith(MEMORY_ID_PREFIX)
+
+
+def _is_system(item) -> bool:
+    return getattr(item, "type", "message") == "message" and getattr(item, "role", "") in _SYSTEM_ROLES
+
+
+def extractive_summarizer(previous: str, turns: List[Turn], max_tokens: int) -> str:
+    """ملخص بدون نموذج: أول جملة من كل دور قديم، مع حذف الأقدم عند تجاوز الميزانية"""
+    lines = [line for line in previous.splitlines() if line.startswith("- ")]
+    for role, text in turns:
+        text = " ".join(text.split())
+        if not text:
+            continue
+        first = text.split(". ")[0]
+        if len(first) > 160:
+            first = first[:157] + "..."
+        lines.append(f"- {role}: {first}")
+
+    budget = max_tokens - estimate_tokens(SUMMARY_HEADER)
+    kept: List[str] = []
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if cost > budget:
+            break
+        kept.append(line)
+        budget -= cost
+    return "\n".join([SUMMARY_HEADER] + list(reversed(kept)))
+
+
+class ChatContextCompactor:
+    """ضغط ChatContext عند تجاوز ميزانية الـ tokens"""
+
+    def __init__(self, token_budget: int = 8000, keep_recent_turns: int = 12,
+                 summary_tokens: int = 600, summarizer: Optional[Summarizer] = None):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer or extractive_summarizer
+        self.compactions = 0
+        self.last_tokens = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.token_budget > 0
+
+    def measure(self, chat_ctx) -> int:
+        return sum(estimate_tokens(_item_text(item)) for item in chat_ctx.items)
+
+    async def compact(self, chat_ctx) -> Optional[Any]:
+        """سياق جديد مضغوط، أو None إذا كان السياق ضمن الميزانية"""
+        if not self.enabled:
+            return None
+        self.last_tokens = self.measure(chat_ctx)
+        if self.last_tokens <= self.token_budget:
+            return None
+
+        items = list(chat_ctx.items)
+        # المثبت: رسائل النظام في بداية السياق (التعليمات) + آخر كتلة ذاكرة فقط
+        pinned: List[Any] = []
+        for item in items:
+            if not _is_system(item):
+                break
+            if not _is_summary(item) and not _is_memory(item):
+                pinned.append(item)
+        memory = next((item for item in reversed(items) if _is_memory(item)), None)
+        if memory is not None:
+            pinned.append(memory)
+        previous_summary = next((_item_text(item) for item in reversed(items) if _is_summary(item)), "")
+        pinned_ids = {id(item) for item in pinned}
+        # كتل الذاكرة الأقدم تُحذف؛ رسائل النظام اللاحقة تُعامل كأدوار عادية
+        turns = [item for item in items
+                 if id(item) not in pinned_ids and not _is_summary(item) and not _is_memory(item)]
+
+        # نافذة آخر الأدوار ضمن ما يتبقى بعد رسائل النظام والملخص
+        window_budget = self.token_budget - self.summary_tokens - sum(
+            estimate_tokens(_item_text(item)) for item in pinned
+        )
+        recent: List[Any] = []
+        for item in reversed(turns):
+            cost = estimate_tokens(_item_text(item))
+            if len(recent) >= self.keep_recent_turns or cost > window_budget:
+                break
+            recent.append(item)
+            window_budget -= cost
+        recent.reverse()
+        # لا نبدأ النافذة بمخرجات أداة منفصلة عن استدعائها
+        while recent and getattr(recent[0], "type", "message") == "function_call_output":
+            recent.pop(0)
+
+        dropped = turns[:len(turns) - len(recent)]
+        if not dropped:
+            return None
+
+        dropped_turns = [
+            (getattr(item, "role", getattr(item, "type", "")), _item_text(item))
+            for item in dropped
+            if getattr(item, "type", "message") == "message" and getattr(item, "role", "") in _SUMMARY_ROLES
+        ]
+        summary = self.summarizer(previous_summary, dropped_turns, self.summary_tokens)
+        if inspect.isawaitable(summary):
+            summary = await summary
+
+        self.compactions += 1
+        new_ctx = chat_ctx.copy()
+        summary_item = new_ctx.add_message(
+            role="system",
+            content=summary,
+            id=f"{SUMMARY_ID_PREFIX}{self.compactions}_{int(datetime.now().timestamp())}",
+        )
+        new_ctx.items[:] = pinned + [summary_item] + recent
+
+        after = self.measure(new_ctx)
+        logger.info(
+            f"🗜️ ضغط السياق: {self.last_tokens} → {after} token "
+            f"({len(dropped)} عنصر في الملخص، {len(recent)} في النافذة)"
+        )
+        self.last_tokens = after
+        return new_ctx
@@ -0,0 +1,83 @@
+"""
+مُجمِّع الإحصائيات اليومية على مستوى الجلسة
+يجمع الفروقات (deltas) في الذاكرة ثم يرسلها كزيادة ذرية واحدة لكل يوم
+بدلاً من قراءة وتحديث صف daily_stats مع كل إجابة
+كل دفعة تُرسل بمعرف ثابت (جلسة:تسلسل) - الدفعة التي فشل إرسالها تُعاد بنفس المعرف ونفس الأرقام
+فلا تُحسب مرتين إذا كان الخادم قد طبقها قبل انتهاء المهلة
+"""
+import uuid
+import asyncio
+import logging
+from datetime import date
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# الأعمدة العددية التي تقبل الزيادة في جدول daily_stats
+COUNTER_FIELDS = (
+    "minutes_studied", "words_learned", "words_reviewed", "lessons_completed",
+    "correct_answers", "total_attempts", "points_earned",
+)
+
+# (user_id, day, deltas, flush_id)
+FlushFn = Callable[[str, str, Dict[str, int], str], Awaitable[Dict]]
+
+
+class DailyStatsAggregator:
+    """تجميع فروقات الإحصائيات اليومية لجلسة واحدة"""
+
+    def __init__(self, user_id: str, flush_fn: FlushFn, session_id: Optional[str] = None):
+        self.user_id = user_id
+        self._flush_fn = flush_fn
+        self._pending: Dict[str, Dict[str, int]] = {}  # {day_iso: {field: delta}}
+        # دفعات أُرسلت ولم يتأكد وصولها: (معرف الدفعة، اليوم، الفروقات) - لا تُدمج مع الجديد
+        self._unsent: List[Tuple[str, str, Dict[str, int]]] = []
+        self._flush_prefix = session_id or uuid.uuid4().hex
+        self._sequence = 0
+        self._lock = asyncio.Lock()
+        self.flush_count = 0
+
+    def add(self, **deltas: int) -> None:
+        """إضافة فروقات لليوم الحالي (بدون أي اتصال بقاعدة البيانات)"""
+        day = date.today().isoformat()
+        bucket = self._pending.setdefault(day, {})
+        for field, value in deltas.items():
+            if field not in COUNTER_FIELDS:
+                raise ValueError(f"حقل غير مدعوم في daily_stats: {field}")
+            if value:
+                bucket[field] = bucket.get(field, 0) + int(value)
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._unsent) or any(self._pending.values())
+
+    def pending(self) -> Dict[str, Dict[str, int]]:
+        result = {day: dict(bucket) for day, bucket in self._pending.items() if bucket}
+        for _, day, deltas in self._unsent:
+            bucket = result.setdefault(day, {})
+            for field, value in deltas.items():
+                bucket[field] = bucket.get(field, 0) + value
+        return result
+
+    async def flush(self) -> int:
+        """إرسال الفروقات المتراكمة - زيادة ذرية واحدة لكل يوم. يعيد عدد الدفعات المرسلة"""
+        async with self._lock:
+            # الدفعات المعلقة أولاً بمعرفاتها، ثم دفعة جديدة لكل يوم
+            for day, deltas in self._pending.items():
+                if deltas:
+                    self._sequence += 1
+                    self._unsent.append((f"{self._flush_prefix}:{self._sequence}", day, deltas))
+            self._pending = {}
+            flushed = 0
+            # القائمة تبقى كما هي حتى تأكيد كل دفعة (فشل أو إلغاء أثناء الإنهاء لا يضيع شيئاً)
+            for batch in list(self._unsent):
+                flush_id, day, deltas = batch
+                try:
+                    await self._flush_fn(self.user_id, day, deltas, flush_id)
+                except Exception as e:
+                    logger.error(f"فشل إرسال إحصائيات {day}: {e}")
+                    continue
+                self._unsent.remove(batch)
+                flushed += 1
+            self.flush_count += flushed
+            return flushed
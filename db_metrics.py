@@ -0,0 +1,299 @@
+"""
+قياس زمن عمليات Supabase
+يتضمن: مدرّجات تكرارية (histograms) حسب الجدول والعملية ونوع العميل،
+حجم البيانات المرسلة والمستقبلة (من عيّنة من العمليات)، وسجل للعمليات البطيئة
+التصدير: نص Prometheus (من API أو ملف textfile في الـ agent worker)
+"""
+import os
+import json
+import time
+import logging
+import itertools
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("supabase.slow")
+
+# حدود المدرّج بالثواني
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# عمليات builder التي تحدد نوع الاستعلام
+_OPERATIONS = ("select", "insert", "update", "upsert", "delete")
+_PAYLOAD_OPERATIONS = ("insert", "update", "upsert")
+
+LabelKey = Tuple[str, str, str]  # (table, operation, client_type)
+
+
+def _payload_size(data: Any) -> int:
+    """حجم البيانات بالبايت كما تُرسل عبر JSON"""
+    if data is None:
+        return 0
+    try:
+        return len(json.dumps(data, default=str, ensure_ascii=False).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+class _PayloadSampler:
+    """قياس الحجم لعملية واحدة من كل every (إعادة التسلسل مكلفة في كل استدعاء)
+    القرار مرة واحدة لكل عملية: العملية المختارة يُقاس طلبها ورده معاً، وكل حجم يُضرب في every
+    فيبقى المجموع تقديراً لحجم كل العمليات"""
+
+    def __init__(self, every: int = 10):
+        self.every = max(1, every)
+        self._counter = itertools.count()
+
+    def sample(self) -> bool:
+        return next(self._counter) % self.every == 0
+
+    def scaled_size(self, data: Any) -> int:
+        return _payload_size(data) * self.every
+
+
+class LatencyHistogram:
+    """مدرّج تكراري تراكمي بحدود ثابتة"""
+
+    __slots__ = ("counts", "total", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # الخانة الأخيرة = +Inf
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        index = len(LATENCY_BUCKETS)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.total += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """تقدير تقريبي للنسبة المئوية من حدود المدرّج"""
+        if not self.total:
+            return 0.0
+        target = q * self.total
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+
+class DBMetrics:
+    """سجل مقاييس عمليات قاعدة البيانات (آمن للاستخدام من عدة threads)"""
+
+    def __init__(self, slow_threshold: float = 0.5, slow_log_size: int = 100, recent_size: int = 512,
+                 payload_sample_every: int = 10):
+        self.slow_threshold = slow_threshold
+        self.payload_sampler = _PayloadSampler(payload_sample_every)
+        self._lock = threading.Lock()
+        # آخر العمليات (وقت، زمن، خطأ) لقياس صحة Supabase الآن - المدرّجات تراكمية منذ بدء العملية
+        self._recent: deque = deque(maxlen=recent_size)
+        self._latency: Dict[LabelKey, LatencyHistogram] = {}
+        self._errors: Dict[LabelKey, int] = {}
+        self._request_bytes: Dict[LabelKey, int] = {}
+        self._response_bytes: Dict[LabelKey, int] = {}
+        self.slow_operations: deque = deque(maxlen=slow_log_size)
+
+    def observe(self, table: str, operation: str, client_type: str, seconds: float,
+                request_bytes: int = 0, response_bytes: int = 0, error: bool = False) -> None:
+        key = (table, operation, client_type)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = LatencyHistogram()
+            histogram.observe(seconds)
+            self._request_bytes[key] = self._request_bytes.get(key, 0) + request_bytes
+            self._response_bytes[key] = self._response_bytes.get(key, 0) + response_bytes
+            if error:
+                self._errors[key] = self._errors.get(key, 0) + 1
+            self._recent.append((time.monotonic(), seconds, error))
+
+        if seconds >= self.slow_threshold:
+            entry = {
+                "table": table,
+                "operation": operation,
+                "client_type": client_type,
+                "duration_ms": round(seconds * 1000, 1),
+                "request_bytes": request_bytes,
+                "response_bytes": response_bytes,
+                "error": error,
+                "at": time.time(),
+            }
+            self.slow_operations.append(entry)
+            slow_logger.warning(
+                f"🐢 عملية بطيئة: {operation} {table} ({client_type}) {entry['duration_ms']}ms "
+                f"req={request_bytes}B resp={response_bytes}B"
+            )
+
+    def recent(self, window: float) -> Tuple[int, float, float]:
+        """(عدد العمليات، p95 للزمن بالثواني، نسبة الأخطاء) لآخر window ثانية"""
+        cutoff = time.monotonic() - window
+        with self._lock:
+            samples = [(seconds, error) for at, seconds, error in self._recent if at >= cutoff]
+        if not samples:
+            return 0, 0.0, 0.0
+        latencies = sorted(seconds for seconds, _ in samples)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        return len(samples), p95, sum(error for _, error in samples) / len(samples)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """ملخص المقاييس كـ dict (للـ API واللوج)"""
+        with self._lock:
+            operations = []
+            for key, histogram in sorted(self._latency.items()):
+                table, operation, client_type = key
+                operations.append({
+                    "table": table,
+                    "operation": operation,
+                    "client_type": client_type,
+                    "count": histogram.total,
+                    "errors": self._errors.get(key, 0),
+                    "avg_ms": round(histogram.sum / histogram.total * 1000, 1) if histogram.total else 0,
+                    "p50_ms": round(histogram.quantile(0.5) * 1000, 1),
+                    "p95_ms": round(histogram.quantile(0.95) * 1000, 1),
+                    "max_ms": round(histogram.max * 1000, 1),
+                    "request_bytes": self._request_bytes.get(key, 0),
+                    "response_bytes": self._response_bytes.get(key, 0),
+                })
+            return {
+                "slow_threshold_ms": int(self.slow_threshold * 1000),
+                "operations": operations,
+                "slow_operations": list(self.slow_operations),
+            }
+
+    def render_prometheus(self) -> str:
+        """تصدير المقاييس بصيغة Prometheus text exposition"""
+        lines = [
+            "# HELP supabase_operation_seconds Supabase operation latency",
+            "# TYPE supabase_operation_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self._latency.items())
+            for (table, operation, client_type), histogram in items:
+                labels = f'table="{table}",operation="{operation}",client_type="{client_type}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'supabase_operation_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'supabase_operation_seconds_bucket{{{labels},le="+Inf"}} {histogram.total}')
+                lines.append(f"supabase_operation_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"supabase_operation_seconds_count{{{labels}}} {histogram.total}")
+
+            for name, help_text, values in (
+                ("supabase_operation_errors_total", "Failed Supabase operations", self._errors),
+                ("supabase_request_bytes_total", "Bytes sent to Supabase", self._request_bytes),
+                ("supabase_response_bytes_total", "Bytes received from Supabase", self._response_bytes),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for (table, operation, client_type), value in sorted(values.items()):
+                    lines.append(f'{name}{{table="{table}",operation="{operation}",client_type="{client_type}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, directory: str) -> Optional[str]:
+        """كتابة المقاييس في ملف لكل عملية (node_exporter textfile collector)"""
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"supabase_{os.getpid()}.prom")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+
+class _InstrumentedQuery:
+    """غلاف حول query builder يقيس زمن execute() ويحفظ نوع العملية وحجم البيانات"""
+
+    __slots__ = ("_builder", "_metrics", "_table", "_client_type", "_operation", "_payload")
+
+    def __init__(self, builder, metrics: DBMetrics, table: str, client_type: str,
+                 operation: str = "select", payload: Any = None):
+        self._builder = builder
+        self._metrics = metrics
+        self._table = table
+        self._client_type = client_type
+        self._operation = operation
+        self._payload = payload  # بيانات الطلب - تُقاس عند execute() فقط إذا اختيرت العملية للعينة
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._builder, name)
+        if name == "execute":
+            return self._execute
+        if not callable(attr):
+            return attr
+
+        def _wrapper(*args, **kwargs):
+            operation, payload = self._operation, self._payload
+            if name in _OPERATIONS:
+                operation = name
+                if name in _PAYLOAD_OPERATIONS and args:
+                    payload = args[0]
+            result = attr(*args, **kwargs)
+            if hasattr(result, "execute"):
+                return _InstrumentedQuery(result, self._metrics, self._table, self._client_type,
+                                          operation, payload)
+            return result
+
+        return _wrapper
+
+    def _execute(self):
+        start = time.perf_counter()
+        result = None
+        error = False
+        try:
+            result = self._builder.execute()
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            sampler = self._metrics.payload_sampler
+            sampled = sampler.sample()
+            self._metrics.observe(
+                self._table, self._operation, self._client_type, seconds,
+                request_bytes=sampler.scaled_size(self._payload) if sampled else 0,
+                response_bytes=sampler.scaled_size(getattr(result, "data", None)) if sampled else 0,
+                error=error,
+            )
+
+
+class InstrumentedClient:
+    """غلاف حول عميل Supabase - كل table()/rpc() تمر عبر القياس، وباقي الخصائص كما هي"""
+
+    def __init__(self, client, client_type: str, metrics: DBMetrics):
+        self._client = client
+        self._client_type = client_type
+        self._metrics = metrics
+
+    def table(self, table_name: str):
+        return _InstrumentedQuery(self._client.table(table_name), self._metrics, table_name, self._client_type)
+
+    def from_(self, table_name: str):
+        return self.table(table_name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None, *args, **kwargs):
+        builder = self._client.rpc(fn, params or {}, *args, **kwargs)
+        return _InstrumentedQuery(builder, self._metrics, f"rpc:{fn}", self._client_type,
+                                  "rpc", params)
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+# مثيل عام لكل عملية
+db_metrics = DBMetrics(
+    slow_threshold=int(os.getenv("SUPABASE_SLOW_MS", "500")) / 1000,
+    payload_sample_every=int(os.getenv("SUPABASE_PAYLOAD_SAMPLE_EVERY", "10")),
+)
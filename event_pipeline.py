@@ -0,0 +1,172 @@
+"""
+خط معالجة أحداث الجلسة (واحد لكل جلسة)
+طابور محدود بمستهلك واحد يعالج الأحداث بالترتيب بدلاً من create_task لكل حدث.
+سياسات لكل نوع حدث:
+- keep: لا يُحذف أبداً (إلا إذا امتلأ الطابور بأحداث غير قابلة للحذف)
+- drop_oldest: عند الامتلاء يُحذف أقدم حدث من هذا النوع، ويُتجاهل إذا تأخر أكثر من stale_after
+- merge: حدث جديد بنفس المفتاح يحل محل الحدث المنتظر (الأحدث فقط يُعالج)
+مع مقاييس عمق الطابور وزمن الانتظار (lag).
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from db_metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+KEEP = "keep"
+DROP_OLDEST = "drop_oldest"
+MERGE = "merge"
+POLICIES = (KEEP, DROP_OLDEST, MERGE)
+
+Handler = Callable[[Any], Awaitable[Any]]
+
+
+class _Entry:
+    __slots__ = ("kind", "key", "handler", "event", "enqueued_at")
+
+    def __init__(self, kind: str, key: Optional[Hashable], handler: Handler, event: Any):
+        self.kind = kind
+        self.key = key
+        self.handler = handler
+        self.event = event
+        self.enqueued_at = time.monotonic()
+
+
+class SessionEventPipeline:
+    """طابور أحداث محدود بمستهلك واحد مرتب"""
+
+    def __init__(self, name: str = "session", maxsize: int = 64,
+                 policies: Optional[Dict[str, str]] = None, stale_after: float = 30.0):
+        if maxsize < 1:
+            raise ValueError("maxsize يجب أن يكون 1 على الأقل")
+        for kind, policy in (policies or {}).items():
+            if policy not in POLICIES:
+                raise ValueError(f"سياسة غير معروفة للحدث {kind}: {policy}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policies = dict(policies or {})
+        self.stale_after = stale_after
+
+        self._queue: deque = deque()
+        self._pending: Dict[tuple, _Entry] = {}  # (kind, key) -> entry لسياسة merge
+        self._wakeup = asyncio.Event()
+        self._consumer: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.lag = LatencyHistogram()
+        self.max_depth = 0
+        self.counters = {
+            "enqueued": 0, "processed": 0, "merged": 0,
+            "dropped": 0, "stale": 0, "errors": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def policy_for(self, kind: str) -> str:
+        return self.policies.get(kind, KEEP)
+
+    def start(self) -> None:
+        if self._consumer is None:
+            self._consumer = asyncio.create_task(self._run(), name=f"events:{self.name}")
+
+    def submit(self, kind: str, handler: Handler, event: Any, key: Optional[Hashable] = None) -> bool:
+        """إضافة حدث (متزامنة - تُستدعى من معالجات session.on). تعيد False إذا رُفض الحدث"""
+        if self._closed:
+            return False
+        policy = self.policy_for(kind)
+
+        if policy == MERGE:
+            pending = self._pending.get((kind, key))
+            if pending is not None:
+                # الاحتفاظ بموضع الحدث في الطابور مع أحدث بيانات
+                pending.handler = handler
+                pending.event = event
+                self.counters["merged"] += 1
+                return True
+
+        if len(self._queue) >= self.maxsize and not self._evict_one():
+            self.counters["dropped"] += 1
+            logger.warning(f"[{self.name}] الطابور ممتلئ ({self.maxsize}) - تم رفض حدث {kind}")
+            return False
+
+        entry = _Entry(kind, key, handler, event)
+        self._queue.append(entry)
+        if policy == MERGE:
+            self._pending[(kind, key)] = entry
+        self.counters["enqueued"] += 1
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._wakeup.set()
+        return True
+
+    def _evict_one(self) -> bool:
+        """حذف أقدم حدث قابل للحذف لإفساح المكان"""
+        for entry in self._queue:
+            if self.policy_for(entry.kind) != KEEP:
+                self._queue.remove(entry)
+                self._forget(entry)
+                self.counters["dropped"] += 1
+                return True
+        return False
+
+    def _forget(self, entry: _Entry) -> None:
+        if self._pending.get((entry.kind, entry.key)) is entry:
+            del self._pending[(entry.kind, entry.key)]
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                if self._closed:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            entry = self._queue.popleft()
+            self._forget(entry)
+            waited = time.monotonic() - entry.enqueued_at
+            self.lag.observe(waited)
+
+            if waited > self.stale_after and self.policy_for(entry.kind) != KEEP:
+                self.counters["stale"] += 1
+                continue
+
+            try:
+                await entry.handler(entry.event)
+                self.counters["processed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.error(f"[{self.name}] خطأ في معالجة حدث {entry.kind}: {e}")
+
+    async def close(self, timeout: Optional[float] = None) -> bool:
+        """إيقاف استقبال الأحداث ومعالجة المتبقي خلال المهلة. تعيد False إذا انتهت المهلة"""
+        self._closed = True
+        self._wakeup.set()
+        if self._consumer is None:
+            return not self._queue
+        try:
+            await asyncio.wait_for(asyncio.shield(self._consumer), timeout)
+            return True
+        except asyncio.TimeoutError:
+            self._consumer.cancel()
+            self.counters["dropped"] += len(self._queue)
+            self._queue.clear()
+            self._pending.clear()
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "depth": len(self._queue),
+            "max_depth": self.max_depth,
+            "lag_p50_ms": round(self.lag.quantile(0.5) * 1000, 1),
+            "lag_p95_ms": round(self.lag.quantile(0.95) * 1000, 1),
+            "lag_max_ms": round(self.lag.max * 1000, 1),
+            **self.counters,
+        }
@@ -0,0 +1,155 @@
+"""
+مقاييس الطلاقة في وضع البودكاست - تُحدَّث تدريجياً مع كل نسخ نهائي بدون إعادة المرور على المحادثة:
+- سرعة الكلام: كلمات في الدقيقة من زمن كلام المستخدم الفعلي (أحداث user_state_changed)
+- تنوع المفردات: متوسط نسبة الأنواع إلى الكلمات بنافذة متحركة (MATTR) - لا يتأثر بطول الجلسة
+- متوسط طول الإجابة بالكلمات الإنجليزية
+- نسبة الإنجليزية من حكم language_id
+مستوى الطلاقة (beginner / intermediate / advanced) يُقدّر فقط بعد أدلة كافية في الجلسة
+"""
+import re
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+BEGINNER = "beginner"
+INTERMEDIATE = "intermediate"
+ADVANCED = "advanced"
+LEVELS = (BEGINNER, INTERMEDIATE, ADVANCED)
+
+# حجم نافذة MATTR بالكلمات
+TTR_WINDOW = 50
+# الحد الأدنى من الأدلة قبل تقدير المستوى (وإلا يبقى المستوى المحفوظ)
+MIN_LEVEL_WORDS = 40
+MIN_LEVEL_UTTERANCES = 5
+# حدود (متوسط -> متقدم) لكل مقياس
+RATE_BANDS = (80.0, 120.0)  # كلمة/دقيقة
+TTR_BANDS = (0.6, 0.72)
+UTTERANCE_BANDS = (5.0, 10.0)  # كلمة/إجابة
+# أقل نسبة إنجليزية لكل مستوى فوق المبتدئ
+SHARE_BANDS = (0.6, 0.9)
+
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)*")
+
+
+def _band(value: float, bands) -> int:
+    return sum(value >= edge for edge in bands)
+
+
+class FluencyTracker:
+    """مقاييس طلاقة المستخدم في الجلسة - O(1) لكل كلمة، وذاكرة ثابتة (نافذة MATTR فقط)"""
+
+    __slots__ = (
+        "utterances", "english_words", "arabic_words", "speaking_seconds", "_speech_started",
+        "_window", "_window_counts", "_ttr_sum", "_ttr_windows",
+    )
+
+    def __init__(self):
+        self.utterances = 0
+        self.english_words = 0
+        self.arabic_words = 0
+        self.speaking_seconds = 0.0
+        self._speech_started: Optional[float] = None
+        self._window: deque = deque()
+        self._window_counts: Counter = Counter()
+        self._ttr_sum = 0.0
+        self._ttr_windows = 0
+
+    def speech_started(self, timestamp: float) -> None:
+        self._speech_started = timestamp
+
+    def speech_ended(self, timestamp: float) -> None:
+        if self._speech_started is not None and timestamp > self._speech_started:
+            self.speaking_seconds += timestamp - self._speech_started
+        self._speech_started = None
+
+    def observe(self, text: str, verdict) -> None:
+        """نسخ نهائي للمستخدم مع LanguageVerdict الخاص به"""
+        if not verdict.words:
+            return
+        self.utterances += 1
+        self.english_words += verdict.english_words
+        self.arabic_words += verdict.arabic_words
+        window, counts = self._window, self._window_counts
+        for token in _TOKEN_RE.findall((text or "").lower()):
+            window.append(token)
+            counts[token] += 1
+            if len(window) > TTR_WINDOW:
+                old = window.popleft()
+                counts[old] -= 1
+                if not counts[old]:
+                    del counts[old]
+            if len(window) == TTR_WINDOW:
+                self._ttr_sum += len(counts) / TTR_WINDOW
+                self._ttr_windows += 1
+
+    @property
+    def speaking_rate(self) -> Optional[float]:
+        """كلمات إنجليزية في دقيقة كلام (None بدون أحداث حالة المستخدم)"""
+        if self.speaking_seconds <= 0:
+            return None
+        return self.english_words / (self.speaking_seconds / 60)
+
+    @property
+    def type_token_ratio(self) -> Optional[float]:
+        if self._ttr_windows:
+            return self._ttr_sum / self._ttr_windows
+        # أقل من نافذة كاملة - النسبة المباشرة
+        return len(self._window_counts) / len(self._window) if self._window else None
+
+    @property
+    def mean_utterance_length(self) -> float:
+        return self.english_words / self.utterances if self.utterances else 0.0
+
+    @property
+    def english_share(self) -> float:
+        words = self.english_words + self.arabic_words
+        return self.english_words / words if words else 0.0
+
+    def level(self) -> Optional[str]:
+        """مستوى الطلاقة المقدر، أو None إذا لم تكفِ الأدلة بعد"""
+        if self.english_words < MIN_LEVEL_WORDS or self.utterances < MIN_LEVEL_UTTERANCES:
+            return None
+        scores = [_band(self.mean_utterance_length, UTTERANCE_BANDS)]
+        if self.type_token_ratio is not None:
+            scores.append(_band(self.type_token_ratio, TTR_BANDS))
+        if self.speaking_rate is not None:
+            scores.append(_band(self.speaking_rate, RATE_BANDS))
+        score = round(sum(scores) / len(scores))
+        # الطلاقة بالإنجليزية لا تتجاوز ما تسمح به نسبة الإنجليزية في الإجابات
+        return LEVELS[min(score, _band(self.english_share, SHARE_BANDS))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """الحالة الكاملة (قابلة لـ JSON) لاستئناف الجلسة"""
+        return {
+            "utterances": self.utterances,
+            "english_words": self.english_words,
+            "arabic_words": self.arabic_words,
+            "speaking_seconds": self.speaking_seconds,
+            "window": list(self._window),
+            "ttr_sum": self._ttr_sum,
+            "ttr_windows": self._ttr_windows,
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "FluencyTracker":
+        tracker = cls()
+        tracker.utterances = data.get("utterances", 0)
+        tracker.english_words = data.get("english_words", 0)
+        tracker.arabic_words = data.get("arabic_words", 0)
+        tracker.speaking_seconds = data.get("speaking_seconds", 0.0)
+        tracker._window.extend(data.get("window", [])[-TTR_WINDOW:])
+        tracker._window_counts.update(tracker._window)
+        tracker._ttr_sum = data.get("ttr_sum", 0.0)
+        tracker._ttr_windows = data.get("ttr_windows", 0)
+        return tracker
+
+    def to_dict(self) -> Dict[str, Any]:
+        rate, ttr = self.speaking_rate, self.type_token_ratio
+        return {
+            "utterances": self.utterances,
+            "english_words": self.english_words,
+            "speaking_rate_wpm": round(rate, 1) if rate is not None else None,
+            "type_token_ratio": round(ttr, 3) if ttr is not None else None,
+            "mean_utterance_length": round(self.mean_utterance_length, 2),
+            "english_share": round(self.english_share, 3),
+            "level": self.level(),
+        }
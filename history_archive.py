@@ -0,0 +1,243 @@
+"""
+أرشفة تاريخ المحادثات القديم (Cold Storage)
+الجلسات الأقدم من N يوم (أو الزائدة عن الحد) تُنقل كـ blob مضغوط بـ zstd
+إلى Supabase Storage أو مجلد محلي (للاختبار)، ويبقى في الصف فهرس مختصر فقط.
+الفهرس محدود الحجم: المدخلات الأقدم تُنقل إلى ملف فهرس (manifest) في التخزين نفسه.
+اسم كل ملف مشتق من معرفات محتواه: إعادة محاولة نفس الأرشفة تكتب فوق نفس الملف.
+الجلسات المؤرشفة تُستعاد عند الطلب فقط.
+"""
+import os
+import json
+import zlib
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstd اختياري - نستخدم zlib كبديل ونسجل نوع الضغط في الفهرس
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# المفتاح المحجوز داخل conversation_history لفهرس الجلسات المؤرشفة
+ARCHIVE_INDEX_KEY = "_archive_index"
+
+
+def iter_sessions(history: Optional[Dict[str, Any]]) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    """الجلسات الفعلية فقط (بدون الفهرس أو ملخصات الضغط القديمة)"""
+    for session_id, session in (history or {}).items():
+        if session_id in (ARCHIVE_INDEX_KEY, "compressed_data") or not isinstance(session, dict):
+            continue
+        yield session_id, session
+
+
+def _content_id(ids: Iterable[str]) -> str:
+    """معرف ثابت لمجموعة (جلسات أو مدخلات فهرس): إعادة المحاولة تكتب فوق نفس الملف بدل نسخة يتيمة"""
+    return hashlib.sha1("\n".join(sorted(ids)).encode("utf-8")).hexdigest()[:16]
+
+
+def _compress(raw: bytes) -> Tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(raw), "zstd"
+    return zlib.compress(raw, 9), "zlib"
+
+
+def _decompress(blob: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("مكتبة zstandard مطلوبة لفك ضغط هذا الأرشيف")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+class LocalArchiveStore:
+    """تخزين الأرشيف في مجلد محلي"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def put(self, key: str, data: bytes) -> None:
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def get(self, key: str) -> bytes:
+        with open(os.path.join(self.directory, key), "rb") as f:
+            return f.read()
+
+
+class SupabaseArchiveStore:
+    """تخزين الأرشيف في Supabase Storage bucket"""
+
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.storage.from_(self.bucket).upload(
+            key, data, {"content-type": "application/octet-stream", "upsert": "true"}
+        )
+
+    def get(self, key: str) -> bytes:
+        return self.client.storage.from_(self.bucket).download(key)
+
+
+class HistoryArchiver:
+    """نقل الجلسات القديمة إلى التخزين البارد واستعادتها عند الطلب
+    عمليات التخزين متزامنة (Supabase Storage / ملفات) فتُنفذ في thread حتى لا توقف الـ event loop
+    """
+
+    def __init__(self, store, archive_after_days: int = 30, max_index_entries: int = 20):
+        self.store = store
+        self.archive_after_days = archive_after_days
+        self.max_index_entries = max(2, max_index_entries)
+
+    @staticmethod
+    def _session_time(session_id: str, session: Dict[str, Any]) -> Optional[datetime]:
+        """وقت الجلسة بالتوقيت المحلي بدون tzinfo (مثل datetime.now() المستخدم في الحفظ والمقارنة)"""
+        timestamp = session.get("timestamp")
+        try:
+            if timestamp:
+                parsed = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))
+                if parsed.tzinfo is not None:
+                    # تحويل للتوقيت المحلي أولاً - حذف المنطقة مباشرة يخلط ترتيب جلسات بفروق توقيت مختلفة
+                    parsed = parsed.astimezone().replace(tzinfo=None)
+                return parsed
+            return datetime.fromtimestamp(float(session_id))
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+    async def _put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self.store.put, key, data)
+
+    async def _get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self.store.get, key)
+
+    async def _compact_index(self, user_id: str, table: str, index: Dict[str, Any]) -> Dict[str, Any]:
+        """نقل مدخلات الفهرس الأقدم إلى manifest في التخزين وإبقاء مدخل واحد يشير إليه
+        الـ manifest قد يحتوي manifest أقدم - الاستعادة تتبعها عند الحاجة فقط
+        """
+        if len(index) <= self.max_index_entries:
+            return index
+        keys = list(index)  # بترتيب الإضافة: الأقدم أولاً
+        moved = {key: index[key] for key in keys[:len(keys) - self.max_index_entries + 1]}
+        raw = json.dumps(moved, ensure_ascii=False, default=str).encode("utf-8")
+        blob, codec = _compress(raw)
+        manifest_key = f"{table}/{user_id}/index-{_content_id(moved)}.json.{codec}"
+        try:
+            await self._put(manifest_key, blob)
+        except Exception as e:
+            # الفهرس يبقى كاملاً ونحاول مرة أخرى في الأرشفة التالية
+            logger.error(f"فشل ضغط فهرس الأرشيف ({len(moved)} مدخل) في {table}: {e}")
+            return index
+        compacted = {manifest_key: {
+            "manifest": True,
+            "codec": codec,
+            "archived_at": datetime.now().isoformat(),
+            "entries": len(moved),
+            "session_count": sum(entry.get("session_count", len(entry.get("sessions", {})))
+                                 for entry in moved.values()),
+        }}
+        compacted.update((key, entry) for key, entry in index.items() if key not in moved)
+        return compacted
+
+    async def archive(self, user_id: str, table: str, history: Dict[str, Any],
+                max_hot_sessions: Optional[int] = None) -> Dict[str, Any]:
+        """نقل الجلسات الأقدم من N يوم (والزائدة عن max_hot_sessions) إلى الأرشيف
+
+        يعيد conversation_history جديداً: الفهرس أولاً ثم الجلسات الحديثة.
+        عند فشل الكتابة في الأرشيف يُعاد التاريخ كما هو حتى لا يضيع شيء.
+        """
+        if not history:
+            return history
+
+        cutoff = datetime.now() - timedelta(days=self.archive_after_days)
+        sessions = sorted(
+            iter_sessions(history),
+            key=lambda item: self._session_time(*item) or datetime.max,
+            reverse=True
+        )
+
+        hot: Dict[str, Any] = {}
+        cold: Dict[str, Any] = {}
+        for position, (session_id, session) in enumerate(sessions):
+            session_time = self._session_time(session_id, session)
+            too_old = session_time is not None and session_time < cutoff
+            overflow = max_hot_sessions is not None and position >= max_hot_sessions
+            if too_old or overflow:
+                cold[session_id] = session
+            else:
+                hot[session_id] = session
+
+        if not cold:
+            return history
+
+        archive_id = _content_id(cold)
+        raw = json.dumps(cold, ensure_ascii=False, default=str).encode("utf-8")
+        blob, codec = _compress(raw)
+        key = f"{table}/{user_id}/{archive_id}.json.{codec}"
+
+        try:
+            await self._put(key, blob)
+        except Exception as e:
+            logger.error(f"فشل أرشفة {len(cold)} جلسة من {table}: {e}")
+            return history
+
+        index = dict(history.get(ARCHIVE_INDEX_KEY) or {})
+        index[key] = {
+            "codec": codec,
+            "archived_at": datetime.now().isoformat(),
+            "raw_bytes": len(raw),
+            "stored_bytes": len(blob),
+            # فهرس مختصر: الموعد والموضوع فقط لكل جلسة
+            "sessions": {
+                session_id: {"timestamp": session.get("timestamp", ""), "topic": session.get("topic", "")}
+                for session_id, session in cold.items()
+            },
+        }
+        index = await self._compact_index(user_id, table, index)
+
+        logger.info(f"📦 أرشفة {len(cold)} جلسة من {table} ({len(raw)}B → {len(blob)}B {codec})")
+        # الاحتفاظ بأي مفاتيح أخرى غير الجلسات (مثل compressed_data القديم)
+        extras = {k: v for k, v in history.items()
+                  if k != ARCHIVE_INDEX_KEY and k not in hot and k not in cold}
+        hot_in_order = dict(reversed(list(hot.items())))  # الأقدم أولاً كما في الصف الأصلي
+        return {ARCHIVE_INDEX_KEY: index, **extras, **hot_in_order}
+
+    async def rehydrate(self, history: Dict[str, Any], session_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """استعادة الجلسات المؤرشفة (كلها أو المحددة فقط) - تحميل الـ blobs المطلوبة فقط"""
+        index = (history or {}).get(ARCHIVE_INDEX_KEY) or {}
+        wanted = set(session_ids) if session_ids else None
+        restored: Dict[str, Any] = {}
+        await self._rehydrate_index(index, wanted, restored)
+        return restored
+
+    async def _rehydrate_index(self, index: Dict[str, Any], wanted: Optional[set],
+                               restored: Dict[str, Any]) -> None:
+        for key, entry in index.items():
+            if wanted is not None and wanted.issubset(restored):
+                return
+            if entry.get("manifest"):
+                # معرفات جلسات الـ manifest غير موجودة في الصف - يجب تحميله لمعرفتها
+                try:
+                    nested = json.loads(_decompress(await self._get(key), entry.get("codec", "zstd")))
+                except Exception as e:
+                    logger.error(f"فشل تحميل فهرس الأرشيف {key}: {e}")
+                    continue
+                await self._rehydrate_index(nested, wanted, restored)
+                continue
+            archived_ids = entry.get("sessions", {}).keys()
+            if wanted is not None and not wanted.intersection(archived_ids):
+                continue
+            try:
+                sessions = json.loads(_decompress(await self._get(key), entry.get("codec", "zstd")))
+            except Exception as e:
+                logger.error(f"فشل استعادة الأرشيف {key}: {e}")
+                continue
+            for session_id, session in sessions.items():
+                if wanted is None or session_id in wanted:
+                    restored[session_id] = session
@@ -0,0 +1,153 @@
+"""
+آلة Aho-Corasick للكلمات المفتاحية (عربي/إنجليزي)
+مسح واحد للنص يعيد كل الفئات المطابقة: مؤشرات الإجابة الصحيحة/الخاطئة،
+إكمال الجملة، المواضيع الشائعة، ونوايا المستخدم (متابعة / موضوع جديد).
+المطابقة تحترم حدود الكلمات: "great" لا تطابق "greatest"، والكلمة العربية تقبل السوابق
+الملتصقة (و، ف، ب، ك، ل، ال): "الدرس" و"بالمتابعة" و"وموضوع جديد"، واللواحق الشائعة
+(ة، ات، ها، نا، ك، ي...): "صحيحة" و"درسنا"، وسوابق المضارع (أ، ن، ي، ت) للأفعال فقط: "أتعلم".
+المطابقة المحتواة داخل مطابقة أطول تُهمل: "غير صحيح" لا تُحسب "صحيح".
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+from text_normalization import fold_arabic
+
+# فئات الكلمات المفتاحية
+CORRECT = "correct"
+WRONG = "wrong"
+COMPLETION = "completion"
+TOPIC = "topic"
+CONTINUE_INTENT = "continue_intent"
+NEW_TOPIC_INTENT = "new_topic_intent"
+STUDY_INTENT = "study_intent"
+
+KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    CORRECT: ('excellent', 'great', 'perfect', 'correct', 'right', 'well done',
+              'ممتاز', 'رائع', 'صحيح', 'أحسنت', 'جيد جداً', 'جيد جدا'),
+    WRONG: ('incorrect', 'wrong', 'not quite', 'try again', 'mistake',
+            'خطأ', 'غير صحيح', 'حاول مرة أخرى'),
+    COMPLETION: ('ممتاز', 'أحسنت', 'جيد جداً', 'جيد جدا', 'excellent', 'great', 'perfect'),
+    TOPIC: ('technology', 'phones', 'computers', 'travel', 'food', 'sports',
+            'movies', 'music', 'work', 'study', 'hobbies', 'family', 'weather'),
+    CONTINUE_INTENT: ('متابعة', 'استئناف', 'من حيث توقفت'),
+    NEW_TOPIC_INTENT: ('موضوع جديد', 'بدء جديد', 'شيء جديد', 'موضوع آخر'),
+    STUDY_INTENT: ('موضوع', 'درس', 'تعلم', 'كلمة'),
+}
+# كلمات عربية تُستخدم كأفعال - وحدها تقبل سوابق المضارع (أتعلم، ندرس)
+# ولا تُطبق على غيرها حتى لا تطابق "تصحيح" كلمة "صحيح"
+ARABIC_VERBS = frozenset(('تعلم', 'درس'))
+
+
+# السوابق المسموحة قبل الكلمة العربية: حرف عطف، ثم حرف جر، ثم أداة التعريف (لل = ل + ال)
+_ARABIC_PREFIX_RE = re.compile(r"[وف]?(?:[بك]?ال|لل|[بكل])?")
+# سوابق المضارع بعد التطبيع (أ = ا): حرف عطف، ثم لام التعليل أو سين المستقبل، ثم حرف المضارعة
+_ARABIC_VERB_PREFIX_RE = re.compile(r"[وف]?[لس]?[انيت]")
+# اللواحق المسموحة بعد الكلمة العربية (ة = ه بعد التطبيع): تاء التأنيث أو الجمع، ثم ضمير متصل
+_ARABIC_SUFFIX_RE = re.compile(r"(?:ه|ات|ت)?(?:ها|هم|نا|كم|ك|ي|ه)?")
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _is_arabic(char: str) -> bool:
+    return "\u0600" <= char <= "\u06ff"
+
+
+class KeywordAutomaton:
+    """آلة Aho-Corasick تُبنى مرة واحدة وتُستخدم للمسح بدون حالة مشتركة"""
+
+    def __init__(self, keywords: Dict[str, Iterable[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, str, str]]] = [[]]  # (category, normalized, keyword)
+        self._verbs = frozenset(fold_arabic(verb) for verb in ARABIC_VERBS)
+
+        # الكلمات والنص يُطبَّعان بنفس الجدول (أحسنت = احسنت، جيداً = جيدا)
+        for category, words in keywords.items():
+            for word in words:
+                self._add(fold_arabic(word).lower(), category, word)
+        self._build()
+
+    def _add(self, word: str, category: str, keyword: str) -> None:
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((category, word, keyword))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """{category: [keywords...]} بترتيب الظهور - مسح واحد O(n)"""
+        hits: Dict[str, List[str]] = {}
+        if not text:
+            return hits
+
+        text = " ".join(fold_arabic(text).lower().split())
+        length = len(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        matches: List[Tuple[int, int, str, str]] = []
+
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            end = index + 1
+            for category, word, keyword in output[state]:
+                start = end - len(word)
+                # التحقق من حدود الكلمة في الطرفين (مع السوابق واللواحق العربية)
+                if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(word[0]):
+                    if not _is_arabic(word[0]):
+                        continue
+                    word_start = start
+                    while word_start > 0 and _is_word_char(text[word_start - 1]):
+                        word_start -= 1
+                    if not (_ARABIC_PREFIX_RE.fullmatch(text, word_start, start) or
+                            word in self._verbs and _ARABIC_VERB_PREFIX_RE.fullmatch(text, word_start, start)):
+                        continue
+                if end < length and _is_word_char(text[end]) and _is_word_char(word[-1]):
+                    if not _is_arabic(word[-1]):
+                        continue
+                    word_end = end
+                    while word_end < length and _is_word_char(text[word_end]):
+                        word_end += 1
+                    if not _ARABIC_SUFFIX_RE.fullmatch(text, end, word_end):
+                        continue
+                matches.append((start, end, category, keyword))
+
+        for start, end, category, keyword in matches:
+            # أطول مطابقة تغلب: كلمة داخل عبارة أطول لا تُحسب وحدها
+            if any(other_start <= start and end <= other_end and other_end - other_start > end - start
+                   for other_start, other_end, _, _ in matches):
+                continue
+            found = hits.setdefault(category, [])
+            if keyword not in found:
+                found.append(keyword)
+
+        return hits
+
+
+# آلة واحدة لكل عملية تُبنى عند الاستيراد
+keyword_automaton = KeywordAutomaton(KEYWORDS)
@@ -0,0 +1,53 @@
+"""
+تمييز لغة نسخ المستخدم (عربي / إنجليزي / مختلط) من نطاقات الحروف
+عدّ الكلمات العربية واللاتينية بتعبيرين مُجمّعين - مسح خطي O(n) بدون نموذج أو دور إضافي للـ LLM،
+فيصبح فرض الإجابة بالإنجليزية ومقاييس الطلاقة مبنية على إشارة محلية فورية
+"""
+import re
+from typing import NamedTuple
+
+from text_normalization import strip_marks
+
+ENGLISH = "en"
+ARABIC = "ar"
+MIXED = "mixed"
+UNKNOWN = "unknown"  # لا حروف (أرقام، رموز، نسخ فارغ)
+
+# نسبة الكلمات الإنجليزية التي يُعتبر عندها النسخ إنجليزياً (وعكسها للعربي)، وما بينهما مختلط
+ENGLISH_SHARE_THRESHOLD = 0.8
+
+# الحروف العربية (بدون الأرقام والترقيم العربي) + أشكال العرض
+_ARABIC_WORD = re.compile(r"[\u0621-\u064A\u066E-\u06D3\u06FA-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFC]+")
+_LATIN_WORD = re.compile(r"[A-Za-z\u00C0-\u024F]+(?:['\u2019][A-Za-z]+)*")
+
+
+class LanguageVerdict(NamedTuple):
+    language: str  # en / ar / mixed / unknown
+    english_words: int
+    arabic_words: int
+
+    @property
+    def words(self) -> int:
+        return self.english_words + self.arabic_words
+
+    @property
+    def english_share(self) -> float:
+        return self.english_words / self.words if self.words else 0.0
+
+
+def classify_language(text: str) -> LanguageVerdict:
+    """لغة النسخ حسب نسبة الكلمات اللاتينية إلى العربية"""
+    # التشكيل والتطويل والمحارف غير المرئية تقسم الكلمة العربية الواحدة إلى عدة كلمات
+    text = strip_marks(text)
+    english_words = len(_LATIN_WORD.findall(text))
+    arabic_words = len(_ARABIC_WORD.findall(text))
+    total = english_words + arabic_words
+    if not total:
+        language = UNKNOWN
+    elif english_words >= total * ENGLISH_SHARE_THRESHOLD:
+        language = ENGLISH
+    elif arabic_words >= total * ENGLISH_SHARE_THRESHOLD:
+        language = ARABIC
+    else:
+        language = MIXED
+    return LanguageVerdict(language, english_words, arabic_words)
@@ -0,0 +1,241 @@
+"""
+نظام لوحة المتصدرين (Leaderboard)
+يحتوي على: ذاكرة مؤقتة مرتبة داخل العملية لأفضل N مستخدم وترتيب أي مستخدم
+(skip list مفهرسة: التحديث والترتيب O(log n) متوقع)
+اللوحات المدعومة: global (إجمالي النقاط) و weekly (نقاط الأسبوع الحالي)
+"""
+import random
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple, Any
+
+BOARD_GLOBAL = "global"
+BOARD_WEEKLY = "weekly"
+BOARDS = (BOARD_GLOBAL, BOARD_WEEKLY)
+
+
+def current_week_start(today: Optional[date] = None) -> str:
+    """بداية الأسبوع الحالي (الاثنين) بصيغة ISO - تُستخدم كمفتاح للوحة الأسبوعية"""
+    today = today or date.today()
+    return (today - timedelta(days=today.weekday())).isoformat()
+
+
+Key = Tuple[int, str]  # (-score, user_id) ⇒ الأعلى نقاطاً أولاً
+
+
+class _SkipNode:
+    __slots__ = ("key", "next", "span")
+
+    def __init__(self, key: Optional[Key], level: int):
+        self.key = key
+        self.next: List[Optional["_SkipNode"]] = [None] * level
+        # span[i] = عدد العناصر في المستوى 0 بين هذه العقدة و next[i] (يعطي الترتيب بدون مرور كامل)
+        self.span: List[int] = [0] * level
+
+
+class _IndexedSkipList:
+    """skip list مرتبة تصاعدياً مع أطوال القفزات: إدراج وحذف وعدّ ما قبل مفتاح O(log n) متوقع"""
+
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self._head = _SkipNode(None, self.MAX_LEVEL)
+        self._level = 1
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def insert(self, key: Key) -> None:
+        update: List[_SkipNode] = [self._head] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            rank[i] = rank[i + 1] if i + 1 < self._level else 0
+            while node.next[i] is not None and node.next[i].key < key:
+                rank[i] += node.span[i]
+                node = node.next[i]
+            update[i] = node
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._length
+            self._level = level
+        new = _SkipNode(key, level)
+        for i in range(level):
+            new.next[i] = update[i].next[i]
+            update[i].next[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        self._length += 1
+
+    def remove(self, key: Key) -> bool:
+        update: List[_SkipNode] = [self._head] * self.MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+        target = node.next[0]
+        if target is None or target.key != key:
+            return False
+        for i in range(self._level):
+            if update[i].next[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].next[i] = target.next[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+        self._length -= 1
+        return True
+
+    def count_less(self, key: Key) -> int:
+        """عدد المفاتيح الأصغر تماماً من key"""
+        count = 0
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                count += node.span[i]
+                node = node.next[i]
+        return count
+
+    def first(self, limit: int) -> List[Key]:
+        keys = []
+        node = self._head.next[0]
+        while node is not None and len(keys) < limit:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class SortedBoard:
+    """لوحة مرتبة تنازلياً حسب النقاط: التحديث والترتيب O(log n) متوقع، وأفضل N في O(log n + N)"""
+
+    def __init__(self):
+        self._keys = _IndexedSkipList()
+        self._scores: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, user_id: str, score: int) -> None:
+        """تحديث نقاط مستخدم (إزالة المفتاح القديم وإدراج الجديد في موضعه)"""
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._keys.remove((-old, user_id))
+        self._keys.insert((-score, user_id))
+        self._scores[user_id] = score
+
+    def remove(self, user_id: str) -> None:
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._keys.remove((-old, user_id))
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._scores.clear()
+
+    def score(self, user_id: str) -> Optional[int]:
+        return self._scores.get(user_id)
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """ترتيب المستخدم (يبدأ من 1) - المتعادلون يأخذون نفس الترتيب"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        # عدد المستخدمين ذوي النقاط الأعلى تماماً + 1
+        return self._keys.count_less((-score, "")) + 1
+
+    def top(self, limit: int) -> List[Tuple[str, int]]:
+        return [(user_id, -neg_score) for neg_score, user_id in self._keys.first(max(0, limit))]
+
+
+class LeaderboardCache:
+    """ذاكرة مؤقتة للوحات المتصدرين - يتم تحديثها تدريجياً من award_points و update_streak"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boards: Dict[str, SortedBoard] = {board: SortedBoard() for board in BOARDS}
+        self._details: Dict[str, Dict[str, Any]] = {}
+        self._week_start = current_week_start()
+        self.loaded = False
+
+    def _roll_week_if_needed(self) -> None:
+        """تصفير اللوحة الأسبوعية عند بداية أسبوع جديد"""
+        week_start = current_week_start()
+        if week_start != self._week_start:
+            self._week_start = week_start
+            self._boards[BOARD_WEEKLY].clear()
+
+    def record(self, row: Dict[str, Any]) -> None:
+        """تسجيل صف من جدول leaderboard_scores في الذاكرة المؤقتة"""
+        user_id = row.get("user_id")
+        if not user_id:
+            return
+        with self._lock:
+            self._roll_week_if_needed()
+            self._details[user_id] = {
+                "current_level": row.get("current_level", 1),
+                "current_streak": row.get("current_streak", 0),
+            }
+            self._boards[BOARD_GLOBAL].update(user_id, int(row.get("total_points", 0) or 0))
+            if row.get("week_start") == self._week_start:
+                self._boards[BOARD_WEEKLY].update(user_id, int(row.get("weekly_points", 0) or 0))
+            else:
+                self._boards[BOARD_WEEKLY].remove(user_id)
+
+    def load(self, rows: List[Dict[str, Any]]) -> None:
+        """تعبئة الذاكرة المؤقتة دفعة واحدة (عند أول طلب في العملية)"""
+        for row in rows:
+            self.record(row)
+        self.loaded = True
+
+    def top(self, board: str = BOARD_GLOBAL, limit: int = 10) -> List[Dict[str, Any]]:
+        """أفضل N مستخدم في اللوحة المطلوبة"""
+        with self._lock:
+            self._roll_week_if_needed()
+            entries = []
+            for position, (user_id, points) in enumerate(self._boards[board].top(limit), start=1):
+                entries.append({
+                    "rank": self._boards[board].rank(user_id) or position,
+                    "user_id": user_id,
+                    "points": points,
+                    **self._details.get(user_id, {}),
+                })
+            return entries
+
+    def rank_of(self, user_id: str, board: str = BOARD_GLOBAL) -> Optional[Dict[str, Any]]:
+        """ترتيب مستخدم محدد ونقاطه وعدد المشاركين في اللوحة"""
+        with self._lock:
+            self._roll_week_if_needed()
+            rank = self._boards[board].rank(user_id)
+            if rank is None:
+                return None
+            return {
+                "rank": rank,
+                "user_id": user_id,
+                "points": self._boards[board].score(user_id),
+                "total_players": len(self._boards[board]),
+                **self._details.get(user_id, {}),
+            }
+
+
+# مثيل عام لكل عملية (API أو agent worker)
+leaderboard_cache = LeaderboardCache()
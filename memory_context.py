@@ -0,0 +1,412 @@
+"""
+قوالب سياق الذاكرة المحقون في النموذج (مقسمة إلى أقسام)
+كل قسم يعلن الحقول التي يعتمد عليها، ويُعاد رسمه فقط عند تغير أحدها؛
+وإلا يُستخدم النص المحفوظ. كل قسم يسجل حجمه لمعرفة ما نرسله للنموذج بالضبط.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from history_archive import iter_sessions
+
+_MISSING = object()
+
+
+def _resolve(owner, path: Tuple[str, ...]):
+    """قيمة الحقل (مثل personal_context.first_name أو sentences.progress.current_level) أو _MISSING"""
+    value = getattr(owner, path[0], _MISSING)
+    for key in path[1:]:
+        if isinstance(value, dict):
+            value = value.get(key, _MISSING)
+        elif value is None or value is _MISSING:
+            return _MISSING
+        else:
+            value = getattr(value, key, _MISSING)
+    return value
+
+
+def _fingerprint(value) -> Tuple[Any, int]:
+    # المرجع نفسه (لا id - حتى لا يُعاد استخدام العنوان) + الطول لاكتشاف الإضافة في نفس القائمة
+    return value, (len(value) if isinstance(value, (list, dict, str)) else -1)
+
+
+class ContextSection:
+    """قسم واحد من سياق الذاكرة"""
+
+    __slots__ = ("name", "sources", "render_fn", "_paths", "_key", "text", "renders", "hits")
+
+    def __init__(self, name: str, sources: Tuple[str, ...], render_fn: Callable[[Any], str]):
+        self.name = name
+        self.sources = sources
+        self.render_fn = render_fn
+        self._paths = tuple(tuple(source.split(".")) for source in sources)
+        self._key: Optional[tuple] = None
+        self.text = ""
+        self.renders = 0
+        self.hits = 0
+
+    def _changed(self, key: tuple) -> bool:
+        if self._key is None or len(key) != len(self._key):
+            return True
+        return any(new[0] is not old[0] or new[1] != old[1] for new, old in zip(key, self._key))
+
+    def render(self, owner) -> str:
+        key = tuple(_fingerprint(_resolve(owner, path)) for path in self._paths)
+        if self._changed(key):
+            self.text = self.render_fn(owner)
+            self._key = key
+            self.renders += 1
+        else:
+            self.hits += 1
+        return self.text
+
+    def invalidate(self) -> None:
+        self._key = None
+
+
+class MemoryContextRenderer:
+    """مستندات سياق الذاكرة (progress / sentences / podcast / personal) بأقسام مخزنة مؤقتاً"""
+
+    def __init__(self, documents: Dict[str, Tuple[str, List[ContextSection]]]):
+        # اسم المستند -> (الحقل الذي يجب أن يكون موجوداً - قد يكون مساراً، الأقسام بالترتيب)
+        self.documents = documents
+
+    def render(self, owner, document: str) -> str:
+        guard, sections = self.documents[document]
+        value = _resolve(owner, tuple(guard.split(".")))
+        if value is _MISSING or not value:
+            return ""
+        return "".join(section.render(owner) for section in sections)
+
+    def invalidate(self, *sources: str) -> None:
+        """إعلام بتعديل داخلي لحقل (مثل personal_context) لا يغير مرجعه"""
+        for _, sections in self.documents.values():
+            for section in sections:
+                if not sources or any(
+                    source == declared or declared.startswith(source + ".")
+                    for source in sources for declared in section.sources
+                ):
+                    section.invalidate()
+
+    def sizes(self, document: str) -> Dict[str, int]:
+        """حجم كل قسم (بالأحرف) كما رُسم آخر مرة"""
+        return {section.name: len(section.text) for section in self.documents[document][1]}
+
+    def report(self, document: str) -> str:
+        sizes = self.sizes(document)
+        parts = ", ".join(f"{name}={size}" for name, size in sizes.items())
+        return f"{document}: {sum(sizes.values())} حرف ({parts})"
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "document": document,
+                "section": section.name,
+                "chars": len(section.text),
+                "bytes": len(section.text.encode("utf-8")),
+                "renders": section.renders,
+                "hits": section.hits,
+            }
+            for document, (_, sections) in self.documents.items()
+            for section in sections
+        ]
+
+
+# ==================== الوضع العادي (user_progress) ====================
+
+def _progress_summary(owner) -> str:
+    progress = owner.user_progress
+    learned_words = list(progress.get('vocabulary', {}).keys())[:10]  # أول 10 كلمات
+    current_topic = progress.get('current_topic', '')
+    progress_percentage = progress.get('progress_percentage', 0)
+    return f"""
+=== ذاكرة المستخدم: {owner.user_name} ===
+📊 إحصائيات التعلم:
+- عدد الكلمات المتعلمة: {progress.get('words_learned', 0)}
+- نسبة التقدم: {progress_percentage}%
+- آخر جلسة: {progress.get('last_session_at', 'لا توجد جلسات سابقة')}
+
+📚 الموضوع الحالي: {current_topic or 'لم يبدأ بعد'}
+📍 آخر نقطة توقف: {progress.get('last_position', 'البداية')}
+✅ المواضيع المكتملة: {', '.join(progress.get('topics_completed', [])) or 'لا توجد'}
+
+🔤 بعض الكلمات المتعلمة: {', '.join(learned_words) if learned_words else 'لا توجد كلمات بعد'}
+
+"""
+
+
+def _progress_instructions(owner) -> str:
+    progress = owner.user_progress
+    current_topic = progress.get('current_topic', '')
+    is_topic_incomplete = current_topic and progress.get('progress_percentage', 0) < 100
+    return f"""🎯 تعليمات مهمة للمساعد:
+{"⚠️ هناك موضوع غير مكتمل!" if is_topic_incomplete else "✅ لا يوجد موضوع معلق"}
+
+CRITICAL INSTRUCTIONS FOR RETURNING USER:
+1. إذا كان هناك موضوع حالي غير مكتمل ({current_topic}), يجب أن تسأل المستخدم:
+   "أهلاً بك مرة أخرى! أرى أنك كنت تدرس موضوع {current_topic} وتوقفت عند {progress.get('last_position', 'البداية')}"
+   "هل تريد أن نكمل من حيث توقفنا، أم تفضل البدء بموضوع جديد؟"
+
+2. انتظر إجابة المستخدم قبل المتابعة - لا تفترض أي شيء!
+
+3. إذا اختار "نكمل":
+   - استكمل من آخر نقطة توقف
+   - راجع الكلمات السابقة بسرعة
+   - تابع الشرح من النقطة المحفوظة
+
+4. إذا اختار "موضوع جديد":
+   - اقترح الموضوع التالي المناسب
+   - امسح بيانات الجلسة القديمة
+   - ابدأ بتقييم سريع إذا لزم الأمر
+
+5. للمستخدمين الجدد: ابدأ بالتقييم المعتاد (5 أسئلة) ثم موضوع الأسماء
+
+6. احفظ التقدم باستمرار أثناء الجلسة
+"""
+
+
+def _progress_recent_sessions(owner) -> str:
+    conversation_history = owner.user_progress.get('conversation_history', {})
+    if not conversation_history:
+        return ""
+    recent_sessions = list(iter_sessions(conversation_history))[-2:]  # آخر جلستين
+    context = "\n📝 آخر المحادثات:\n"
+    for session_id, session_data in recent_sessions:
+        topic = session_data.get('topic', 'غير محدد')
+        words_count = len(session_data.get('words_discussed', []))
+        last_pos = session_data.get('last_position', '')
+        context += f"- {topic}: {words_count} كلمة، توقف عند: {last_pos}\n"
+    return context
+
+
+def _progress_footer(owner) -> str:
+    return "\n⚠️ مهم: استخدم هذه المعلومات لتقديم تجربة تعليمية متواصلة ومخصصة!\n"
+
+
+# ==================== وضع تعليم الجمل ====================
+
+def _sentences_stats(owner) -> str:
+    progress = owner.sentences.progress
+    current_sentences = progress.get('generated_sentences', [])
+    return f"""
+=== ذاكرة تعليم الجمل للمستخدم: {owner.user_name} ===
+📊 إحصائيات الجلسة:
+- المستوى الحالي: {progress.get('current_level', 1)}
+- الجمل المكتملة: {progress.get('completed_sentences', 0)}
+- إجمالي الجمل في الجلسة: {len(current_sentences)}
+- الجملة التالية: {progress.get('current_sentence_index', 0) + 1}
+
+"""
+
+
+def _sentences_learned(owner) -> str:
+    learned_sentences_history = owner.sentences.progress.get('learned_sentences_history', [])
+    recent_learned = learned_sentences_history[-10:] if learned_sentences_history else []  # آخر 10 جمل متعلمة
+    return f"""📝 آخر 10 جمل تعلمها المستخدم:
+{chr(10).join([f"- {sentence}" for sentence in recent_learned]) if recent_learned else "- لا توجد جمل متعلمة بعد"}
+
+"""
+
+
+def _sentences_upcoming(owner) -> str:
+    progress = owner.sentences.progress
+    current_sentences = progress.get('generated_sentences', [])
+    current_sentence_index = progress.get('current_sentence_index', 0)
+    remaining_sentences = current_sentences[current_sentence_index:current_sentence_index + 5] if current_sentences else []
+    return f"""🎯 الجمل التالية في الجلسة:
+{chr(10).join([f"- {sentence}" for sentence in remaining_sentences]) if remaining_sentences else "- لا توجد جمل جديدة"}
+
+"""
+
+
+def _sentences_instructions(owner) -> str:
+    progress = owner.sentences.progress
+    learned_count = len(progress.get('learned_sentences_history', []))
+    current_level = progress.get('current_level', 1)
+    return f"""🔥 تعليمات مهمة للمساعد في وضع الجمل:
+1. أنت في وضع تعليم الجمل البسيطة - ركز على الجمل فقط
+2. المستخدم تعلم بالفعل {learned_count} جملة في المجموع
+3. يجب عليك تذكر الجمل التي تعلمها وتجنب تكرارها
+4. ابدأ من المستوى {current_level} واستمر في التدرج
+5. استخدم الجمل المتعلمة كمرجع لبناء جمل جديدة
+6. انتبه للتقدم التدريجي من البسيط للمعقد
+
+⚠️ CRITICAL: تذكر الجمل المحددة أعلاه - لا تكررها!
+"""
+
+
+# ==================== وضع البودكاست ====================
+
+def _podcast_stats(owner) -> str:
+    progress = owner.podcast_progress
+    topics_discussed = progress.get('topics_discussed', [])
+    return f"""
+=== Podcast Conversation Memory for: {owner.user_name} ===
+📊 Statistics:
+- Total conversations: {progress.get('total_conversations', 0)}
+- Fluency level: {progress.get('fluency_level', 'beginner')}
+- Topics discussed: {', '.join(topics_discussed[-5:]) if topics_discussed else 'None yet'}
+
+"""
+
+
+def _podcast_last_session(owner) -> str:
+    progress = owner.podcast_progress
+    return f"""📍 Last Session:
+- Topic: {progress.get('last_topic', '') or 'First conversation'}
+- Position: {progress.get('last_position', '') or 'Starting fresh'}
+- Context: {progress.get('last_context', '') or 'No previous context'}
+- Summary: {progress.get('conversation_summary', '') or 'This is our first conversation'}
+
+"""
+
+
+def _podcast_feedback(owner) -> str:
+    common_mistakes = owner.podcast_progress.get('common_mistakes', [])
+    improvements = owner.podcast_progress.get('improvements', [])
+    return f"""🎯 Common Mistakes to Address:
+{chr(10).join([f"- {mistake}" for mistake in common_mistakes[-5:]]) if common_mistakes else "- No mistakes recorded yet"}
+
+✨ Noticed Improvements:
+{chr(10).join([f"- {improvement}" for improvement in improvements[-5:]]) if improvements else "- First session"}
+
+"""
+
+
+def _podcast_instructions(owner) -> str:
+    last_topic = owner.podcast_progress.get('last_topic', '')
+    last_position = owner.podcast_progress.get('last_position', '')
+    fluency_level = owner.podcast_progress.get('fluency_level', 'beginner')
+    return f"""🔥 CRITICAL INSTRUCTIONS FOR RETURNING USER:
+1. If there was a previous topic ({last_topic}), acknowledge it naturally:
+   "Hey! Last time we were talking about {last_topic}. {last_position}"
+   "Would you like to continue that conversation or talk about something new?"
+
+2. Reference their progress naturally:
+   - Mention improvements you've noticed
+   - Gently correct recurring mistakes
+   - Build on previous conversations
+
+3. Adapt to their fluency level ({fluency_level}):
+   - Beginner: Simple vocabulary, more support
+   - Intermediate: Mix complexity, gentle corrections
+   - Advanced: Natural flow, minimal interruptions
+
+4. Make the conversation feel continuous and personal!
+"""
+
+
+# ==================== السياق الشخصي ====================
+
+def _personal_profile(owner) -> str:
+    personal = owner.personal_context
+    return f"""
+=== 🌟 PERSONAL CONTEXT FOR: {owner.user_name} ===
+
+USE THIS INFORMATION TO CREATE PERSONALIZED, REAL-LIFE EXAMPLES!
+
+👤 **Basic Info:**
+- Name: {personal.get('first_name', 'Unknown')}
+- Age: {personal.get('age', 'Unknown')}
+- Occupation: {personal.get('occupation', 'Unknown')}
+- City: {personal.get('city', 'Unknown')}
+
+👨‍👩‍👧‍👦 **Family & Friends:**
+- Family members: {', '.join([f"{k}: {v}" for k, v in personal.get('family_members', {}).items()]) or 'Not yet collected'}
+- Friends: {', '.join(personal.get('friends', [])) or 'Not yet collected'}
+- Pets: {', '.join([f"{p.get('name')} ({p.get('type')})" for p in personal.get('pets', [])]) or 'None'}
+
+❤️ **Interests & Preferences:**
+- Hobbies: {', '.join(personal.get('hobbies', [])) or 'Not yet collected'}
+- Favorite foods: {', '.join(personal.get('favorite_foods', [])) or 'Not yet collected'}
+- Favorite colors: {', '.join(personal.get('favorite_colors', [])) or 'Not yet collected'}
+
+🏠 **Environment:**
+- Objects around: {', '.join(personal.get('objects_around', [])) or 'Not yet collected'}
+- Home items: {', '.join(personal.get('home_items', [])) or 'Not yet collected'}
+- Room: {personal.get('room_description', 'Not described yet')}
+
+🎯 **Goals & Dreams:**
+- Learning goals: {', '.join(personal.get('learning_goals', [])) or 'Not yet discussed'}
+- Dream job: {personal.get('dream_job', 'Not shared yet')}
+- Want to visit: {', '.join(personal.get('places_want_to_visit', [])) or 'Not shared yet'}
+
+📊 **Context Completeness: {personal.get('context_completeness', 0)}%**
+
+"""
+
+
+def _personal_instructions(owner) -> str:
+    personal = owner.personal_context
+    return f"""⚠️ **CRITICAL INSTRUCTIONS:**
+
+1. **IF INFO IS MISSING**: Ask naturally during the lesson!
+   - Example: "Before we continue, what's your name?" (if name is missing)
+   - Example: "Tell me, what objects do you see around you?" (when teaching nouns)
+
+2. **USE THEIR ACTUAL INFO IN EXAMPLES**:
+   - ❌ DON'T SAY: "John has a book"
+   - ✅ DO SAY: "{personal.get('first_name', 'You')} has a {personal.get('objects_around', ['phone'])[0] if personal.get('objects_around') else 'phone'}"
+
+3. **MAKE IT PERSONAL AND ENGAGING**:
+   - Use their family names, friend names, hobbies, favorite things
+   - Reference their daily life, environment, goals
+   - Make them the HERO of every example!
+
+4. **UPDATE AS YOU GO**:
+   - When they mention new info, use it immediately
+   - Keep the context fresh and current
+
+**Remember**: This is THEIR English learning journey, not a generic textbook!
+"""
+
+
+_PROGRESS = "user_progress"
+_SENTENCES = "sentences.progress"
+_PODCAST = "podcast_progress"
+_PERSONAL = "personal_context"
+_PERSONAL_FIELDS = (
+    "first_name", "age", "occupation", "city", "family_members", "friends", "pets", "hobbies",
+    "favorite_foods", "favorite_colors", "objects_around", "home_items", "room_description",
+    "learning_goals", "dream_job", "places_want_to_visit", "context_completeness",
+)
+
+
+def create_memory_renderer() -> MemoryContextRenderer:
+    """مُرسِم جديد لكل جلسة (الأقسام تحفظ النص المرسوم لهذه الجلسة فقط)"""
+    return MemoryContextRenderer({
+        "progress": (_PROGRESS, [
+            ContextSection("summary", ("user_name", f"{_PROGRESS}.words_learned", f"{_PROGRESS}.progress_percentage",
+                                       f"{_PROGRESS}.last_session_at", f"{_PROGRESS}.current_topic",
+                                       f"{_PROGRESS}.last_position", f"{_PROGRESS}.topics_completed",
+                                       f"{_PROGRESS}.vocabulary"), _progress_summary),
+            ContextSection("instructions", (f"{_PROGRESS}.current_topic", f"{_PROGRESS}.progress_percentage",
+                                            f"{_PROGRESS}.last_position"), _progress_instructions),
+            ContextSection("recent_sessions", (f"{_PROGRESS}.conversation_history",), _progress_recent_sessions),
+            ContextSection("footer", (), _progress_footer),
+        ]),
+        "sentences": (_SENTENCES, [
+            ContextSection("stats", ("user_name", f"{_SENTENCES}.current_level", f"{_SENTENCES}.completed_sentences",
+                                     f"{_SENTENCES}.generated_sentences", f"{_SENTENCES}.current_sentence_index"),
+                           _sentences_stats),
+            ContextSection("learned", (f"{_SENTENCES}.learned_sentences_history",), _sentences_learned),
+            ContextSection("upcoming", (f"{_SENTENCES}.generated_sentences", f"{_SENTENCES}.current_sentence_index"),
+                           _sentences_upcoming),
+            ContextSection("instructions", (f"{_SENTENCES}.learned_sentences_history", f"{_SENTENCES}.current_level"),
+                           _sentences_instructions),
+        ]),
+        "podcast": (_PODCAST, [
+            ContextSection("stats", ("user_name", f"{_PODCAST}.total_conversations", f"{_PODCAST}.fluency_level",
+                                     f"{_PODCAST}.topics_discussed"), _podcast_stats),
+            ContextSection("last_session", (f"{_PODCAST}.last_topic", f"{_PODCAST}.last_position",
+                                            f"{_PODCAST}.last_context", f"{_PODCAST}.conversation_summary"),
+                           _podcast_last_session),
+            ContextSection("feedback", (f"{_PODCAST}.common_mistakes", f"{_PODCAST}.improvements"), _podcast_feedback),
+            ContextSection("instructions", (f"{_PODCAST}.last_topic", f"{_PODCAST}.last_position",
+                                            f"{_PODCAST}.fluency_level"), _podcast_instructions),
+        ]),
+        "personal": (_PERSONAL, [
+            ContextSection("profile", ("user_name",) + tuple(f"{_PERSONAL}.{field}" for field in _PERSONAL_FIELDS),
+                           _personal_profile),
+            ContextSection("instructions", (f"{_PERSONAL}.first_name", f"{_PERSONAL}.objects_around"),
+                           _personal_instructions),
+        ]),
+    })
@@ -0,0 +1,69 @@
+"""
+خطة تحميل ذاكرة المستخدم لكل وضع
+- الخطة تحدد الصفوف المطلوبة من قاعدة البيانات ومستندات السياق التي تُرسم منها (بالترتيب)
+- الصفوف تُجلب بالتوازي (كل صف مستقل عن الآخر)، وفشل صف لا يوقف بقية الصفوف
+  التوازي فعلي فقط إذا لم يحجز المحمّل الـ event loop: طلبات supabase-py المتزامنة تمر عبر
+  SupabaseManager._execute / _hedged_read (asyncio.to_thread)
+- السياق المرسوم من كل المستندات يُحقن مرة واحدة في update_chat_ctx واحد
+"""
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+PERSONAL_CONTEXT = "personal_context"
+GAMIFICATION = "gamification"
+USER_PROGRESS = "user_progress"
+SENTENCES_PROGRESS = "sentences_progress"
+PODCAST_PROGRESS = "podcast_progress"
+
+RowLoader = Callable[[], Awaitable[Any]]
+
+
+@dataclass(frozen=True, slots=True)
+class MemoryPlan:
+    mode: str
+    rows: Tuple[str, ...]  # الصفوف المطلوبة من قاعدة البيانات
+    documents: Tuple[str, ...]  # مستندات memory_context بترتيب الحقن
+
+
+# السياق الشخصي والتحفيز لكل الأوضاع (الكلمات الجديدة والنقاط تُحسب في كل وضع)
+MEMORY_PLANS: Dict[str, MemoryPlan] = {
+    "normal": MemoryPlan(
+        "normal", (PERSONAL_CONTEXT, GAMIFICATION, USER_PROGRESS), ("personal", "progress"),
+    ),
+    "sentences_learning": MemoryPlan(
+        "sentences_learning", (PERSONAL_CONTEXT, GAMIFICATION, SENTENCES_PROGRESS), ("personal", "sentences"),
+    ),
+    "english_conversation": MemoryPlan(
+        "english_conversation", (PERSONAL_CONTEXT, GAMIFICATION, PODCAST_PROGRESS), ("personal", "podcast"),
+    ),
+}
+
+
+def memory_plan(mode: str) -> MemoryPlan:
+    """خطة الوضع (الأوضاع غير المعروفة تُعامل كالوضع العادي)"""
+    return MEMORY_PLANS.get(mode, MEMORY_PLANS["normal"])
+
+
+async def fetch_rows(plan: MemoryPlan, loaders: Dict[str, RowLoader]) -> Dict[str, float]:
+    """
+    تشغيل محمّلات صفوف الخطة بالتوازي
+    يعيد زمن كل صف بالثواني؛ الصفوف الفاشلة تُسجل ولا تظهر في النتيجة
+    """
+    async def timed(row: str) -> float:
+        started = time.perf_counter()
+        await loaders[row]()
+        return time.perf_counter() - started
+
+    results = await asyncio.gather(*(timed(row) for row in plan.rows), return_exceptions=True)
+    timings = {}
+    for row, result in zip(plan.rows, results):
+        if isinstance(result, BaseException):
+            logger.error(f"فشل تحميل {row} ({plan.mode}): {result}")
+        else:
+            timings[row] = result
+    return timings
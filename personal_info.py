@@ -0,0 +1,202 @@
+"""
+استخراج المعلومات الشخصية من كلام المستخدم (عربي/إنجليزي)
+- أنماط مُجمّعة مرة واحدة عند الاستيراد (نفس قواعد الاستخراج السابقة)
+- مقارنة النتيجة مع personal_context المحفوظ وتجاهل التحديثات التي لا تغير شيئاً
+- تجميع التغييرات الفعلية في كتابة واحدة كل بضع ثوانٍ
+"""
+import re
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from text_normalization import fold_arabic, strip_invisible
+
+logger = logging.getLogger(__name__)
+
+_FLAGS = re.IGNORECASE | re.UNICODE
+
+NAME_PATTERNS = (
+    re.compile(r"(?:my name is|i'm|i am|call me|\u0627\u0633\u0645\u064a|\u0623\u0646\u0627)\s+([\u0627-\u064a\u0621-\u064a\w]+)", _FLAGS),
+    re.compile(r"^([\u0627-\u064a\u0621-\u064a\w]+)$", _FLAGS),  # إذا كانت إجابة بكلمة واحدة فقط
+)
+AGE_PATTERN = re.compile(r'(?:\u0639\u0645\u0631\u064a|age|i am|i\'m|\u0623\u0646\u0627)\s*(\d{1,2})(?:\s*(?:year|\u0633\u0646\u0629|\u0639\u0627\u0645))?', _FLAGS)
+CITY_PATTERNS = (
+    re.compile(r'(?:from|in|live in|\u0645\u0646|\u0641\u064a|\u0623\u0633\u0643\u0646 \u0641\u064a)\s+([\u0627-\u064a\u0621-\u064a\w\s]+?)(?:\.|,|$)', _FLAGS),
+    re.compile(r'(?:city|\u0645\u062f\u064a\u0646\u0629|\u0645\u062f\u064a\u0646\u062a\u064a)\s+(?:is|:)?\s*([\u0627-\u064a\u0621-\u064a\w\s]+?)(?:\.|,|$)', _FLAGS),
+)
+OCCUPATION_PATTERNS = (
+    re.compile(r'(?:i\'m a|i am a|i work as|\u0623ن\u0627|\u0639مل\u064a)\s+(student|teacher|engineer|doctor|developer|designer|\u0637\u0627\u0644\u0628|\u0645ه\u0646\u062f\u0633|\u0637\u0628\u064a\u0628|\u0645\u0639\u0644\u0645|\u0645\u0628\u0631\u0645\u062c)', _FLAGS),
+    re.compile(r'(?:job|work|occupation|\u0645\u0647\u0646\u0629|\u0639\u0645\u0644)\s*(?:is|:)?\s*([\u0627-\u064a\u0621-\u064a\w]+)', _FLAGS),
+)
+LIST_PATTERN = re.compile(r'([\u0627-\u064a\u0621-\u064a\w]+)\s*(?:,|\u0648)\s*([\u0627-\u064a\u0621-\u064a\w]+)', re.UNICODE)
+
+EXCLUDED_NAMES = frozenset(['yes', 'no', 'okay', 'sure', 'hello', 'hi', 'thanks', 'thank', 'نعم', 'لا', 'شوكرا', 'مرحبا'])
+HOBBY_KEYWORDS = ('football', 'soccer', 'reading', 'cooking', 'gaming', 'music', 'swimming', 'running',
+                  'قراءة', 'كرة', 'طبخ', 'ألعاب', 'موسيقى', 'سباحة', 'جري')
+SURROUNDING_HINTS = ('see', 'have', 'around', 'حول', 'عندي', 'أرى')
+# نفس الكلمات بعد توحيد الحروف العربية (ألعاب = العاب)
+_HOBBY_MATCHERS = tuple((fold_arabic(hobby), hobby) for hobby in HOBBY_KEYWORDS)
+_SURROUNDING_MATCHERS = tuple(fold_arabic(word) for word in SURROUNDING_HINTS)
+
+# الحقول التي يدمجها الخادم بدلاً من استبدالها (انظر update_personal_context)
+LIST_FIELDS = ('hobbies', 'friends', 'favorite_foods', 'favorite_colors', 'favorite_subjects',
+               'learning_goals', 'places_want_to_visit', 'home_items', 'objects_around', 'pets',
+               'recent_activities')
+DICT_FIELDS = ('family_members', 'daily_routine')
+
+
+def extract_personal_info(text: str) -> Dict[str, Any]:
+    """استخراج معلومات شخصية من نص المستخدم"""
+    if not text:
+        return {}
+
+    text = strip_invisible(text)
+    text_lower = fold_arabic(text).lower()
+    updates: Dict[str, Any] = {}
+
+    # الاسم
+    for pattern in NAME_PATTERNS:
+        match = pattern.search(text)
+        if match and 1 < len(match.group(1)) < 20:
+            potential_name = match.group(1).strip()
+            if potential_name.lower() not in EXCLUDED_NAMES:
+                updates['first_name'] = potential_name.title()
+                break
+
+    # العمر
+    age_match = AGE_PATTERN.search(text)
+    if age_match:
+        age = int(age_match.group(1))
+        if 5 <= age <= 100:  # عمر منطقي
+            updates['age'] = age
+
+    # المدينة
+    for pattern in CITY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            city = match.group(1).strip()
+            if 2 < len(city) < 30:
+                updates['city'] = city.title()
+                break
+
+    # المهنة
+    for pattern in OCCUPATION_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            updates['occupation'] = match.group(1).strip()
+            break
+
+    # الهوايات
+    found_hobbies = [hobby for folded, hobby in _HOBBY_MATCHERS if folded in text_lower]
+
+    # قوائم عامة - قد تكون أسماء أشياء محيطة
+    if not updates.get('first_name') and any(word in text_lower for word in _SURROUNDING_MATCHERS):
+        list_match = LIST_PATTERN.findall(text)
+        if list_match:
+            items = [item for pair in list_match for item in pair]
+            found_hobbies.extend(items[:3])  # أول 3 عناصر
+
+    if found_hobbies:
+        updates['hobbies'] = found_hobbies[:5]  # أقصى 5
+
+    return updates
+
+
+def diff_personal_context(cached: Optional[Dict[str, Any]], updates: Dict[str, Any]) -> Dict[str, Any]:
+    """التغييرات الفعلية فقط مقارنة بالسياق المحفوظ (عناصر القوائم الجديدة، مفاتيح القواميس المتغيرة)"""
+    cached = cached or {}
+    changes: Dict[str, Any] = {}
+    for field, value in updates.items():
+        current = cached.get(field)
+        if field in LIST_FIELDS and isinstance(value, list):
+            known = current if isinstance(current, list) else []
+            new_items = [item for item in value if item and item not in known]
+            if new_items:
+                changes[field] = new_items
+        elif field in DICT_FIELDS and isinstance(value, dict):
+            known = current if isinstance(current, dict) else {}
+            new_entries = {key: item for key, item in value.items() if known.get(key) != item}
+            if new_entries:
+                changes[field] = new_entries
+        elif value is not None and value != current:
+            changes[field] = value
+    return changes
+
+
+def merge_personal_context(target: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    """دمج التغييرات في dict بنفس قواعد الخادم (القوائم تُضاف، القواميس تُحدث، الباقي يُستبدل)"""
+    for field, value in changes.items():
+        current = target.get(field)
+        if field in LIST_FIELDS and isinstance(value, list):
+            merged = list(current) if isinstance(current, list) else []
+            merged.extend(item for item in value if item not in merged)
+            target[field] = merged
+        elif field in DICT_FIELDS and isinstance(value, dict):
+            merged = dict(current) if isinstance(current, dict) else {}
+            merged.update(value)
+            target[field] = merged
+        else:
+            target[field] = value
+    return target
+
+
+WriteFn = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+# (اسم الكتابة، الكتابة) - مثل DeferredWrites.submit لتأجيل كتابة المؤقت أثناء تدهور قاعدة البيانات
+SubmitFn = Callable[[str, Callable[[], Awaitable[Any]]], Awaitable[Any]]
+
+
+class PersonalContextDebouncer:
+    """تجميع تغييرات السياق الشخصي وإرسالها كتحديث واحد بعد delay ثانية من أول تغيير"""
+
+    def __init__(self, user_id: str, write_fn: WriteFn, delay: float = 5.0, submit: Optional[SubmitFn] = None):
+        self.user_id = user_id
+        self.delay = delay
+        self._write_fn = write_fn
+        self._submit = submit
+        self._pending: Dict[str, Any] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.write_count = 0
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def add(self, changes: Dict[str, Any]) -> None:
+        if not changes:
+            return
+        merge_personal_context(self._pending, changes)
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.delay)
+        if self._submit is None:
+            await self.flush(from_timer=True)
+        else:
+            # عند التأجيل تبقى التغييرات في _pending وتتراكم معها التغييرات الجديدة
+            await self._submit("personal_context", lambda: self.flush(from_timer=True))
+
+    async def flush(self, from_timer: bool = False) -> bool:
+        """إرسال التغييرات المتراكمة الآن. يعيد True إذا تمت كتابة شيء"""
+        # مؤقت ينتظر يُلغى؛ مؤقت يكتب الآن (يحمل القفل) يُنتظر حتى ينتهي بدل قطع كتابته
+        if not from_timer and self._timer is not None and not self._timer.done() and not self._lock.locked():
+            self._timer.cancel()
+        async with self._lock:
+            if not self._pending:
+                return False
+            batch, self._pending = self._pending, {}
+            try:
+                # الخادم يعدل الـ dict أثناء الدمج - نرسل نسخة
+                await self._write_fn(self.user_id, dict(batch))
+                self.write_count += 1
+                return True
+            except asyncio.CancelledError:
+                # إلغاء أثناء الكتابة (إنهاء الجلسة) - التغييرات تعود حتى لا تضيع
+                self._pending = merge_personal_context(batch, self._pending)
+                raise
+            except Exception as e:
+                # إعادة التغييرات للمحاولة في الدفعة التالية
+                logger.error(f"فشل تحديث السياق الشخصي: {e}")
+                self._pending = merge_personal_context(batch, self._pending)
+                return False
@@ -0,0 +1,141 @@
+"""
+كشف تكرار الجمل المتعلمة
+- تطابق تام: مجموعة hash للنص بعد التطبيع (O(1) لكل جملة)
+  ("I am happy." و "I'm happy!" تطابق تام بعد فك الاختصارات)
+- تشابه قريب: فهرس MinHash/LSH للصياغات المتقاربة ("I go to school every day." و"...every morning.")
+  للتسجيل فقط - جملة قريبة قد تكون جملة جديدة يدرّسها المعلم فعلاً
+"""
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from text_normalization import fold_english_tokens
+
+# فك الاختصارات الشائعة حتى تتطابق الصيغتان تماماً
+_CONTRACTIONS = {
+    "i'm": "i am", "you're": "you are", "we're": "we are", "they're": "they are",
+    "he's": "he is", "she's": "she is", "it's": "it is", "that's": "that is",
+    "what's": "what is", "there's": "there is", "here's": "here is",
+    "i've": "i have", "you've": "you have", "we've": "we have", "they've": "they have",
+    "i'll": "i will", "you'll": "you will", "we'll": "we will", "they'll": "they will",
+    "he'll": "he will", "she'll": "she will", "it'll": "it will",
+    "i'd": "i would", "you'd": "you would", "we'd": "we would", "they'd": "they would",
+    "isn't": "is not", "aren't": "are not", "wasn't": "was not", "weren't": "were not",
+    "don't": "do not", "doesn't": "does not", "didn't": "did not", "can't": "can not",
+    "cannot": "can not", "won't": "will not", "haven't": "have not", "hasn't": "has not",
+    "couldn't": "could not", "shouldn't": "should not", "wouldn't": "would not", "let's": "let us",
+}
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_sentence(text: str) -> str:
+    """تطبيع الجملة للمقارنة: أحرف صغيرة، فك الاختصارات، إزالة الترقيم والرموز"""
+    tokens = _TOKEN_RE.findall(fold_english_tokens(text).lower())
+    return " ".join(_CONTRACTIONS.get(token, token.strip("'")) for token in tokens).strip()
+
+
+def _shingles(normalized: str) -> Set[str]:
+    """كلمات مفردة + أزواج كلمات متتالية"""
+    words = normalized.split()
+    shingles = set(words)
+    shingles.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return shingles
+
+
+class MinHashLSH:
+    """فهرس MinHash مع تقسيم LSH إلى نطاقات (bands) للبحث التقريبي"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.7, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm يجب أن يقبل القسمة على bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        # معاملات دوال التجزئة (a*x + b) mod p - حتمية لكل بذرة
+        state = seed
+        self._params: List[Tuple[int, int]] = []
+        for _ in range(num_perm):
+            state = (state * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+            a = (state >> 3) % (_MERSENNE_PRIME - 1) + 1
+            state = (state * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+            b = (state >> 3) % _MERSENNE_PRIME
+            self._params.append((a, b))
+        self._buckets: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, shingles: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles] or [0]
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._params
+        )
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, key: str, signature: Tuple[int, ...]) -> None:
+        if key in self._signatures:
+            return
+        self._signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def query(self, signature: Tuple[int, ...]) -> Optional[Tuple[str, float]]:
+        """أقرب مفتاح مشابه (مع التشابه التقديري) إن تجاوز العتبة"""
+        candidates: Set[str] = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+
+        best: Optional[Tuple[str, float]] = None
+        for key in candidates:
+            other = self._signatures[key]
+            similarity = sum(1 for x, y in zip(signature, other) if x == y) / self.num_perm
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+
+class SentenceDeduper:
+    """فهرس الجمل المعروفة للمستخدم: تطابق تام + تشابه قريب"""
+
+    def __init__(self, near_threshold: float = 0.7):
+        self._exact: Set[str] = set()
+        self._lsh = MinHashLSH(threshold=near_threshold)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def __contains__(self, sentence: str) -> bool:
+        return normalize_sentence(sentence) in self._exact
+
+    def add(self, sentence: str) -> None:
+        normalized = normalize_sentence(sentence)
+        if not normalized or normalized in self._exact:
+            return
+        self._exact.add(normalized)
+        self._lsh.add(normalized, self._lsh.signature(_shingles(normalized)))
+
+    def add_many(self, sentences: Iterable[str]) -> None:
+        for sentence in sentences:
+            if sentence:
+                self.add(sentence)
+
+    def find_duplicate(self, sentence: str) -> Optional[Tuple[str, str, float]]:
+        """يعيد (نوع التكرار، الجملة المطابقة بعد التطبيع، التشابه) أو None"""
+        normalized = normalize_sentence(sentence)
+        if not normalized:
+            return None
+        if normalized in self._exact:
+            return ("exact", normalized, 1.0)
+        near = self._lsh.query(self._lsh.signature(_shingles(normalized)))
+        if near:
+            return ("near", near[0], near[1])
+        return None
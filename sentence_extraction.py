@@ -0,0 +1,69 @@
+"""
+محرك استخراج الجمل الإنجليزية من ردود المعلم (وضع تعليم الجمل)
+أنماط مُجمّعة مسبقاً بترتيب أولوية ثابت، مع منع التداخل حسب موضع التطابق:
+إذا التقط نمط ذو أولوية أعلى جزءاً من النص، لا يُعاد التقاطه بنمط آخر.
+"""
+import bisect
+import re
+from typing import List, NamedTuple, Tuple
+
+# الأنماط بترتيب الأولوية (الأعلى أولاً)
+SENTENCE_PATTERNS: Tuple[Tuple[str, "re.Pattern"], ...] = tuple(
+    (name, re.compile(pattern, re.MULTILINE))
+    for name, pattern in (
+        ("numbered_bold", r'[\d]+\.\s*\*\*([A-Z][^*]+\.)\*\*'),  # 1. **I am happy.**
+        ("bold", r'\*\*([A-Z][^*]+\.)\*\*'),  # **I am happy.**
+        ("quoted", r'"([A-Z][^"]+\.)"'),  # "I am happy."
+        ("arabic_label", r'الجملة:\s*([A-Z][^.!?]+[.!?])'),  # الجملة: I am happy.
+        ("sentence_label", r'sentence:\s*([A-Z][^.!?]+[.!?])'),  # sentence: I am happy.
+        ("say_label", r'say:\s*([A-Z][^.!?]+[.!?])'),  # say: I am happy.
+        ("arabic_say_label", r'قل:\s*([A-Z][^.!?]+[.!?])'),  # قل: I am happy.
+        ("after_colon", r':\s+([A-Z][^.!?]+[.!?])'),  # : I am happy.
+        ("full_line", r'^([A-Z][^.!?]+[.!?])$'),  # I am happy. (سطر كامل)
+        ("plain", r'\b([A-Z][a-z]+(?:\s+[a-z]+){1,8}[.!?])\b'),  # جملة بسيطة بدون علامات
+    )
+)
+
+
+class ExtractedSentence(NamedTuple):
+    text: str
+    start: int
+    end: int
+    pattern: str
+
+
+class SentenceExtractor:
+    """استخراج الجمل بمسح واحد لكل نمط وقبول التطابقات غير المتداخلة فقط"""
+
+    def __init__(self, patterns=SENTENCE_PATTERNS):
+        self.patterns = patterns
+
+    def extract_matches(self, text: str) -> List[ExtractedSentence]:
+        """كل التطابقات المقبولة مرتبة حسب موضعها في النص"""
+        if not text:
+            return []
+
+        starts: List[int] = []  # بدايات المقاطع المقبولة (مرتبة)
+        ends: List[int] = []
+        accepted: List[ExtractedSentence] = []
+
+        for name, pattern in self.patterns:
+            for match in pattern.finditer(text):
+                start, end = match.span(1)
+                # أقرب مقطع مقبول يبدأ قبل نهاية هذا التطابق
+                index = bisect.bisect_left(starts, end)
+                if index > 0 and ends[index - 1] > start:
+                    continue  # متداخل مع تطابق بأولوية أعلى
+                starts.insert(index, start)
+                ends.insert(index, end)
+                accepted.insert(index, ExtractedSentence(match.group(1), start, end, name))
+
+        return accepted
+
+    def extract(self, text: str) -> List[str]:
+        """نصوص الجمل المستخرجة بترتيب ظهورها"""
+        return [sentence.text for sentence in self.extract_matches(text)]
+
+
+# مثيل عام يُبنى مرة واحدة عند الاستيراد
+sentence_extractor = SentenceExtractor()
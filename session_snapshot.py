@@ -0,0 +1,101 @@
+"""
+لقطات حالة الجلسة للاستئناف السريع بعد انقطاع الاتصال
+عند انتهاء الجلسة تُكتب حالة Assistant (الصفوف المحملة، سياق المحادثة، مفردات الجلسة، حالة الجمل والبودكاست)
+في ملف محلي لكل (مستخدم، وضع). إذا عاد المستخدم خلال نافذة الاستئناف تُستعاد الحالة مباشرة
+بدون قراءات من قاعدة البيانات وبدون ترحيب بارد. اللقطة تُستهلك مرة واحدة عند القراءة.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# رقم صيغة اللقطة - اللقطات بصيغة مختلفة تُتجاهل
+SNAPSHOT_VERSION = 1
+
+
+class SessionSnapshotStore:
+    """مخزن لقطات محلي (ملف JSON لكل مستخدم ووضع) بنافذة صلاحية"""
+
+    def __init__(self, directory: str, window_seconds: float):
+        self.directory = directory
+        self.window_seconds = window_seconds
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def _path(self, user_id: str, mode: str) -> str:
+        # اسم الملف لا يكشف معرف المستخدم
+        key = hashlib.sha256(f"{user_id}:{mode}".encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{key}.json")
+
+    def save(self, user_id: str, mode: str, state: Dict[str, Any]) -> bool:
+        """كتابة ذرية للقطة (ملف مؤقت ثم استبدال) - تعيد False عند الفشل بدون رفع استثناء"""
+        if not self.enabled or not user_id:
+            return False
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            data = {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "user_id": user_id, "mode": mode, "state": state}
+            path = self._path(user_id, mode)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, default=str)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self.prune()
+            return True
+        except Exception as e:
+            logger.error(f"فشل حفظ لقطة الجلسة: {e}")
+            return False
+
+    def take(self, user_id: str, mode: str) -> Optional[Dict[str, Any]]:
+        """قراءة اللقطة وحذفها - None إذا لم توجد أو انتهت صلاحيتها"""
+        if not self.enabled or not user_id:
+            return None
+        path = self._path(user_id, mode)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            os.unlink(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"لقطة جلسة تالفة: {e}")
+            return None
+        if (data.get("version") != SNAPSHOT_VERSION or data.get("user_id") != user_id
+                or time.time() - data.get("saved_at", 0) > self.window_seconds):
+            return None
+        return data["state"]
+
+    def prune(self) -> int:
+        """حذف اللقطات المنتهية (لمستخدمين لم يعودوا)"""
+        removed = 0
+        cutoff = time.time() - self.window_seconds
+        try:
+            entries = os.scandir(self.directory)
+        except OSError:
+            return 0
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.name.endswith((".json", ".tmp")) and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
+
+
+# مثيل واحد لكل عملية worker - المجلد ونافذة الاستئناف من متغيرات البيئة (0 = تعطيل)
+session_snapshots = SessionSnapshotStore(
+    directory=os.getenv("SESSION_SNAPSHOT_DIR") or os.path.join(tempfile.gettempdir(), "friday-session-snapshots"),
+    window_seconds=float(os.getenv("SESSION_RESUME_WINDOW_SECONDS", "120")),
+)
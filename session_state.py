@@ -0,0 +1,221 @@
+"""
+حالة الجلسة لكل متعلم (slots بدون __dict__ لكل كائن)
+بدلاً من سمات متفرقة على Assistant تُنشأ عند الحاجة بـ hasattr:
+- SessionData: بيانات الموضوع الحالي (تُحفظ كـ dict عبر to_dict)
+- SessionStats: عدادات الجلسة وأوقاتها
+- SentencesState: حالة وضع تعليم الجمل
+- PodcastState: ملاحظات محادثة البودكاست (حاويات محدودة) ومقاييس الطلاقة
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from fluency import FluencyTracker
+from language_id import ENGLISH, UNKNOWN
+from sentence_dedupe import SentenceDeduper
+
+# الحد الأقصى للأخطاء والتحسينات المحفوظة في ذاكرة الجلسة (نفس حدود podcast_progress)
+MAX_PODCAST_MISTAKES = 20
+MAX_PODCAST_IMPROVEMENTS = 10
+
+
+def _new_session_id() -> str:
+    return str(datetime.now().timestamp())
+
+
+def _new_sentences_session_id() -> str:
+    return f"sentences_{int(datetime.now().timestamp())}"
+
+
+@dataclass(slots=True)
+class SessionData:
+    """بيانات الموضوع الحالي للجلسة"""
+    words_discussed: List[str] = field(default_factory=list)  # قائمة VocabularyTracker نفسها
+    current_topic: str = ""
+    last_position: str = ""
+    topics_covered: List[str] = field(default_factory=list)
+    session_id: str = field(default_factory=_new_session_id)
+    start_time: str = field(default_factory=lambda: datetime.now().isoformat())
+    # المعرفات الثابتة من topics.py للموضوع الحالي والأقسام التي غُطيت ("1.1"، "1.2")
+    topic_id: Optional[int] = None
+    sections_covered: List[str] = field(default_factory=list)
+
+    def track_topic(self, ref) -> None:
+        """تسجيل TopicRef مطابق للموضوع أو نقطة التوقف"""
+        if ref is None:
+            return
+        if ref.section_id is None or self.topic_id is None:
+            self.topic_id = ref.topic_id
+        if ref.section_id and ref.section_id not in self.sections_covered:
+            self.sections_covered.append(ref.section_id)
+
+    def to_dict(self, include_words: bool = True) -> Dict[str, Any]:
+        data = {
+            "session_id": self.session_id,
+            "start_time": self.start_time,
+            "topics_covered": list(self.topics_covered),
+            "current_topic": self.current_topic,
+            "last_position": self.last_position,
+            "topic_id": self.topic_id,
+            "sections_covered": list(self.sections_covered),
+        }
+        if include_words:
+            data["words_discussed"] = list(self.words_discussed)
+        return data
+
+    def restore(self, data: Dict[str, Any]) -> None:
+        """استعادة الحقول من to_dict(include_words=False) - قائمة الكلمات تبقى مشتركة مع المتتبع"""
+        self.session_id = data.get("session_id", self.session_id)
+        self.start_time = data.get("start_time", self.start_time)
+        self.topics_covered = list(data.get("topics_covered", []))
+        self.current_topic = data.get("current_topic", "")
+        self.last_position = data.get("last_position", "")
+        self.topic_id = data.get("topic_id")
+        self.sections_covered = list(data.get("sections_covered", []))
+
+
+@dataclass(slots=True)
+class SessionStats:
+    """عدادات الجلسة"""
+    started_at: datetime = field(default_factory=datetime.now)
+    correct_answers: int = 0
+    total_attempts: int = 0
+    words_learned: int = 0
+    messages: int = 0
+    last_auto_save: Optional[datetime] = None
+    # لغة نسخ المستخدم النهائي (language_id): عدد الأدوار لكل لغة + الأدوار غير الإنجليزية المتتالية
+    language_turns: Dict[str, int] = field(default_factory=dict)
+    non_english_streak: int = 0
+
+    def count_language(self, verdict) -> None:
+        """تسجيل LanguageVerdict لنسخ نهائي (الأدوار بدون حروف لا تكسر السلسلة)"""
+        self.language_turns[verdict.language] = self.language_turns.get(verdict.language, 0) + 1
+        if verdict.language == ENGLISH:
+            self.non_english_streak = 0
+        elif verdict.language != UNKNOWN:
+            self.non_english_streak += 1
+
+    @property
+    def accuracy(self) -> float:
+        return (self.correct_answers / self.total_attempts) * 100 if self.total_attempts else 0.0
+
+    def seconds_since_start(self) -> float:
+        return (datetime.now() - self.started_at).total_seconds()
+
+    def snapshot(self) -> Dict[str, Any]:
+        # وقت البدء والكلمات المتعلمة أُرسلت إلى daily_stats في نهاية الجلسة السابقة - لا تُستعاد حتى لا تُحسب مرتين
+        return {
+            "correct_answers": self.correct_answers,
+            "total_attempts": self.total_attempts,
+            "messages": self.messages,
+            "language_turns": dict(self.language_turns),
+            "non_english_streak": self.non_english_streak,
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "SessionStats":
+        return cls(
+            correct_answers=data.get("correct_answers", 0),
+            total_attempts=data.get("total_attempts", 0),
+            messages=data.get("messages", 0),
+            language_turns=dict(data.get("language_turns", {})),
+            non_english_streak=data.get("non_english_streak", 0),
+        )
+
+
+@dataclass(slots=True)
+class SentencesState:
+    """حالة وضع تعليم الجمل"""
+    session_id: str = field(default_factory=_new_sentences_session_id)
+    progress: Optional[Dict[str, Any]] = None
+    current: List[str] = field(default_factory=list)
+    completed: int = 0
+    level: int = 1
+    index: int = 0
+    history: List[str] = field(default_factory=list)
+    # فهرس دائم للجمل المعروفة (تطابق تام + تشابه قريب) بدل البحث الخطي في القوائم
+    deduper: SentenceDeduper = field(default_factory=SentenceDeduper)
+    history_set: Set[str] = field(default_factory=set)
+
+    def load(self, progress: Dict[str, Any]) -> None:
+        """تحميل جلسة محفوظة وبناء فهرس التكرار مرة واحدة"""
+        self.progress = progress
+        self.session_id = progress["session_id"]
+        self.current = progress.get("generated_sentences", []) or []
+        self.completed = progress.get("completed_sentences", 0)
+        self.level = progress.get("current_level", 1)
+        self.history = progress.get("learned_sentences_history", []) or []
+        # المؤشر يشير للجملة التالية غير المكتملة
+        self.index = progress.get("current_sentence_index", self.completed)
+        self.deduper = SentenceDeduper()
+        self.deduper.add_many(self.current)
+        self.deduper.add_many(self.history)
+        self.history_set = set(self.history)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "progress": self.progress,
+            "current": list(self.current),
+            "completed": self.completed,
+            "level": self.level,
+            "index": self.index,
+            "history": list(self.history),
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "SentencesState":
+        state = cls(
+            session_id=data["session_id"],
+            progress=data.get("progress"),
+            current=list(data.get("current", [])),
+            completed=data.get("completed", 0),
+            level=data.get("level", 1),
+            index=data.get("index", 0),
+            history=list(data.get("history", [])),
+        )
+        state.deduper.add_many(state.current)
+        state.deduper.add_many(state.history)
+        state.history_set = set(state.history)
+        return state
+
+    def add_to_history(self, sentence: str) -> bool:
+        if not sentence or sentence in self.history_set:
+            return False
+        self.history.append(sentence)
+        self.history_set.add(sentence)
+        return True
+
+
+@dataclass(slots=True)
+class PodcastState:
+    """ملاحظات محادثة البودكاست خلال الجلسة"""
+    started_at: Optional[datetime] = None
+    mistakes: Deque[str] = field(default_factory=lambda: deque(maxlen=MAX_PODCAST_MISTAKES))
+    improvements: Deque[str] = field(default_factory=lambda: deque(maxlen=MAX_PODCAST_IMPROVEMENTS))
+    # مقاييس الطلاقة التدريجية (سرعة الكلام، تنوع المفردات، طول الإجابة، نسبة الإنجليزية)
+    fluency: FluencyTracker = field(default_factory=FluencyTracker)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "mistakes": list(self.mistakes),
+            "improvements": list(self.improvements),
+            "fluency": self.fluency.snapshot(),
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "PodcastState":
+        state = cls(
+            started_at=datetime.fromisoformat(data["started_at"]) if data.get("started_at") else None,
+            fluency=FluencyTracker.from_snapshot(data.get("fluency", {})),
+        )
+        state.mistakes.extend(data.get("mistakes", []))
+        state.improvements.extend(data.get("improvements", []))
+        return state
+
+    def duration_minutes(self) -> int:
+        if self.started_at is None:
+            return 0
+        return int((datetime.now() - self.started_at).total_seconds() / 60)
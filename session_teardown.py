@@ -0,0 +1,140 @@
+"""
+إنهاء الجلسة بمهلة قصوى (واحد لكل جلسة)
+- المهام الخلفية للجلسة (الحفظ الدوري وما يطلقه) تُسجل هنا وتُلغى أولاً
+- خطوات الإنهاء بمراحل مرتبة: prepare (تفريغ طابور الأحداث) ثم critical (التقدم) ثم best_effort (الإحصائيات)
+  خطوات المرحلة الواحدة تعمل بالتوازي، وكل مرحلة تأخذ ما تبقى من المهلة فقط
+- ما لم يكتمل عند انتهاء المهلة يُلغى (dropped)، وما لم يبدأ أصلاً يُؤجل (deferred)
+- finalizers محلية سريعة (لقطة الاستئناف، المقاييس) تعمل دائماً بعد المراحل
+"""
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREPARE = "prepare"
+CRITICAL = "critical"
+BEST_EFFORT = "best_effort"
+PHASES = (PREPARE, CRITICAL, BEST_EFFORT)
+
+Step = Callable[[], Awaitable[Any]]
+
+
+@dataclass(slots=True)
+class TeardownReport:
+    completed: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)  # أُلغيت عند انتهاء المهلة
+    deferred: List[str] = field(default_factory=list)  # لم تبدأ - لم يتبق وقت لمرحلتها
+    cancelled_tasks: int = 0
+    elapsed: float = 0.0
+    deadline: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "completed": len(self.completed),
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "deferred": self.deferred,
+            "cancelled_tasks": self.cancelled_tasks,
+            "elapsed_s": round(self.elapsed, 2),
+            "deadline_s": self.deadline,
+        }
+
+
+class SessionTeardown:
+    """تتبع مهام الجلسة الخلفية وتشغيل خطوات الإنهاء بأولوية ومهلة قصوى"""
+
+    def __init__(self, name: str = "session", deadline: float = 10.0):
+        self.name = name
+        self.deadline = deadline
+        self._tasks: Set[asyncio.Task] = set()
+        self._steps: Dict[str, List[Tuple[str, Step]]] = {phase: [] for phase in PHASES}
+        self._finalizers: List[Tuple[str, Callable[[], Any]]] = []
+        self._run_task: Optional[asyncio.Task] = None
+        self.report: Optional[TeardownReport] = None
+
+    @property
+    def started(self) -> bool:
+        return self._run_task is not None
+
+    def spawn(self, coro: Awaitable[Any], name: Optional[str] = None) -> Optional[asyncio.Task]:
+        """إطلاق مهمة خلفية للجلسة - تُلغى عند الإنهاء (بعد بدء الإنهاء لا تُطلق مهام جديدة)"""
+        if self.started:
+            coro.close()
+            return None
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def add_step(self, name: str, step: Step, phase: str = CRITICAL) -> None:
+        if phase not in self._steps:
+            raise ValueError(f"مرحلة إنهاء غير معروفة: {phase}")
+        self._steps[phase].append((name, step))
+
+    def add_finalizer(self, name: str, fn: Callable[[], Any]) -> None:
+        """خطوة محلية متزامنة تعمل دائماً بعد المراحل (حتى بعد انتهاء المهلة)"""
+        self._finalizers.append((name, fn))
+
+    def start(self) -> asyncio.Task:
+        """بدء الإنهاء كمهمة محفوظة (آمن من معالج متزامن، والاستدعاء المكرر يعيد نفس المهمة)"""
+        if self._run_task is None:
+            self._run_task = asyncio.create_task(self.run(), name=f"teardown:{self.name}")
+        return self._run_task
+
+    async def _cancel_tasks(self) -> int:
+        current = asyncio.current_task()
+        tasks = [task for task in self._tasks if task is not current and not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return len(tasks)
+
+    async def _run_phase(self, steps: List[Tuple[str, Step]], timeout: float, report: TeardownReport) -> None:
+        running = {asyncio.ensure_future(step()): name for name, step in steps}
+        done, pending = await asyncio.wait(running, timeout=timeout)
+        for task in pending:
+            task.cancel()
+            report.dropped.append(running[task])
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            if task.cancelled():
+                report.dropped.append(running[task])
+                continue
+            error = task.exception()
+            if error is None:
+                report.completed.append(running[task])
+            else:
+                report.failed.append(running[task])
+                logger.error(f"[{self.name}] فشل {running[task]} أثناء الإنهاء: {error}")
+
+    async def run(self) -> TeardownReport:
+        report = TeardownReport(deadline=self.deadline)
+        start = time.monotonic()
+        try:
+            report.cancelled_tasks = await self._cancel_tasks()
+            for phase in PHASES:
+                steps = self._steps[phase]
+                if not steps:
+                    continue
+                remaining = self.deadline - (time.monotonic() - start)
+                if remaining <= 0:
+                    report.deferred.extend(name for name, _ in steps)
+                    continue
+                await self._run_phase(steps, remaining, report)
+        finally:
+            for name, fn in self._finalizers:
+                try:
+                    fn()
+                    report.completed.append(name)
+                except Exception as e:
+                    report.failed.append(name)
+                    logger.error(f"[{self.name}] فشل {name} أثناء الإنهاء: {e}")
+            report.elapsed = time.monotonic() - start
+            self.report = report
+        return report
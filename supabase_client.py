@@ -11,12 +11,39 @@ from fastapi import HTTPException
 import logging
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from db_metrics import InstrumentedClient, db_metrics
+from history_archive import HistoryArchiver, LocalArchiveStore, SupabaseArchiveStore, ARCHIVE_INDEX_KEY
+from leaderboard import leaderboard_cache, current_week_start, BOARDS, BOARD_GLOBAL
 
 # تحميل متغيرات البيئة
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+
+class HedgeBudget:
+    """ميزانية عامة للطلبات المكررة (token bucket) حتى لا تضاعف الحمل أثناء الأعطال"""
+    
+    def __init__(self, ratio: float = 0.1, burst: int = 10):
+        self.ratio = ratio  # نسبة الطلبات المكررة المسموحة من إجمالي القراءات
+        self.burst = burst  # أقصى رصيد متراكم
+        self.tokens = float(burst)
+        self.reads = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+    
+    def on_read(self) -> None:
+        self.reads += 1
+        self.tokens = min(float(self.burst), self.tokens + self.ratio)
+    
+    def try_acquire(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.hedges += 1
+            return True
+        return False
+
+
 class SupabaseManager:
     """مدير Supabase للتعامل مع Auth, Storage, Database مع آلية إعادة المحاولة وضغط البيانات"""
     
@@ -28,9 +55,14 @@ class SupabaseManager:
         if not self.url or not self.key:
             raise ValueError("SUPABASE_URL و SUPABASE_ANON_KEY مطلوبان في متغيرات البيئة")
         
-        self.client: Client = create_client(self.url, self.key)
+        # كل العمليات تمر عبر غلاف القياس (زمن/حجم البيانات حسب الجدول والعملية ونوع العميل)
+        self.metrics = db_metrics
+        self.client: Client = InstrumentedClient(create_client(self.url, self.key), "regular_client", self.metrics)
         # عميل بامتيازات أعلى (يتجاوز RLS) إذا تم توفير مفتاح الخدمة
-        self.service_client: Optional[Client] = create_client(self.url, self.service_key) if self.service_key else None
+        self.service_client: Optional[Client] = (
+            InstrumentedClient(create_client(self.url, self.service_key), "service_client", self.metrics)
+            if self.service_key else None
+        )
         
         # إعدادات إعادة المحاولة
         self.max_retries = 3
@@ -40,6 +72,35 @@ class SupabaseManager:
         # إعدادات ضغط البيانات
         self.max_conversation_history = 50  # أقصى عدد محادثات محفوظة
         self.compression_threshold_days = 30  # ضغط البيانات الأقدم من 30 يوم
+        self.max_podcast_history = 20  # أقصى عدد محادثات بودكاست في الصف
+        
+        # أرشفة الجلسات القديمة (مجلد محلي للاختبار أو Supabase Storage bucket)
+        archive_dir = os.getenv("HISTORY_ARCHIVE_DIR")
+        archive_store = (
+            LocalArchiveStore(archive_dir) if archive_dir
+            else SupabaseArchiveStore(self.service_client or self.client, os.getenv("HISTORY_ARCHIVE_BUCKET", "history-archive"))
+        )
+        self.history_archiver = HistoryArchiver(
+            archive_store,
+            archive_after_days=int(os.getenv("HISTORY_ARCHIVE_AFTER_DAYS", str(self.compression_threshold_days))),
+            max_index_entries=int(os.getenv("HISTORY_ARCHIVE_MAX_INDEX_ENTRIES", "20"))
+        )
+        
+        # إعدادات القراءات المكررة (hedged reads) لاستعلامات بدء الجلسة
+        self.hedged_reads_enabled = os.getenv("SUPABASE_HEDGED_READS", "0") == "1"
+        self.hedge_delay = int(os.getenv("SUPABASE_HEDGE_DELAY_MS", "300")) / 1000  # تأخير p95 بالثواني
+        self.hedge_budget = HedgeBudget(
+            ratio=float(os.getenv("SUPABASE_HEDGE_BUDGET_RATIO", "0.1")),
+            burst=int(os.getenv("SUPABASE_HEDGE_BUDGET_BURST", "10"))
+        )
+        
+        # إعدادات لوحة المتصدرين
+        self.leaderboard_refresh_seconds = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", "30"))
+        self.leaderboard_page_size = 1000
+        # updated_at = وقت بدء المعاملة، فصف يُثبَّت متأخراً قد يحمل وقتاً قبل آخر ما قرأناه - نعيد قراءة هذه النافذة
+        self.leaderboard_sync_overlap = timedelta(seconds=int(os.getenv("LEADERBOARD_SYNC_OVERLAP_SECONDS", "60")))
+        self._leaderboard_watermark: Optional[str] = None  # آخر updated_at تمت مزامنته
+        self._leaderboard_last_refresh: Optional[datetime] = None
         
         logger.info("تم إنشاء عميل Supabase بنجاح مع آلية إعادة المحاولة وضغط البيانات")
     
@@ -77,6 +138,41 @@ class SupabaseManager:
             detail=f"فشل في تنفيذ {operation_name} بعد {self.max_retries + 1} محاولات: {str(last_exception)}"
         )
     
+    @staticmethod
+    async def _execute(query):
+        """execute() في supabase-py متزامن - يُنفذ في thread حتى لا يوقف الـ event loop
+        (تحميل ذاكرة الجلسة يجلب عدة صفوف بالتوازي أثناء بدء الصوت)"""
+        return await asyncio.to_thread(query.execute)
+    
+    async def _hedged_read(self, read_fn, operation_name: str):
+        """تنفيذ قراءة مع طلب مكرر إذا تجاوزت تأخير p95 - يُعاد أول رد يصل"""
+        if not self.hedged_reads_enabled:
+            return await asyncio.to_thread(read_fn)
+        
+        self.hedge_budget.on_read()
+        primary = asyncio.ensure_future(asyncio.to_thread(read_fn))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+        if done or not self.hedge_budget.try_acquire():
+            return await primary
+        
+        logger.info(f"⏱️ {operation_name} تجاوزت {int(self.hedge_delay * 1000)}ms - إرسال طلب مكرر")
+        hedge = asyncio.ensure_future(asyncio.to_thread(read_fn))
+        pending = {primary, hedge}
+        last_exception = None
+        
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        self.hedge_budget.hedge_wins += 1
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                last_exception = task.exception()
+        
+        raise last_exception
+    
     def _compress_conversation_history(self, conversation_history: Dict[str, Any]) -> Dict[str, Any]:
         """ضغط تاريخ المحادثات للحفاظ على المساحة"""
         if not conversation_history or len(conversation_history) <= self.max_conversation_history:
@@ -289,7 +385,10 @@ class SupabaseManager:
             # استخدام service_client إذا كان متاحاً لتجاوز RLS
             client = self.service_client if self.service_client else self.client
             
-            response = client.table("user_progress").select("*").eq("user_id", user_id).execute()
+            response = await self._hedged_read(
+                lambda: client.table("user_progress").select("*").eq("user_id", user_id).execute(),
+                "جلب تقدم المستخدم"
+            )
             
             if response.data:
                 logger.info(f"تم جلب تقدم المستخدم: {user_id}")
@@ -327,7 +426,7 @@ class SupabaseManager:
             client_type = "service_client" if self.service_client else "regular_client"
             logger.info(f"🔑 استخدام: {client_type}")
             
-            result = client.table("user_progress").insert(progress_data).execute()
+            result = await self._execute(client.table("user_progress").insert(progress_data))
             
             if result.data:
                 logger.info(f"✅ تم إنشاء user_progress بنجاح: {user_id}")
@@ -399,7 +498,10 @@ class SupabaseManager:
                 new_history = progress_data.get("conversation_history", {}) or {}
                 # دمج بالمعرّف session_id بحيث لا نفقد الجلسات السابقة
                 existing_history.update(new_history)
-                progress_data["conversation_history"] = existing_history
+                # نقل الجلسات القديمة للأرشيف بدلاً من تضخيم الصف
+                progress_data["conversation_history"] = await self.history_archiver.archive(
+                    user_id, "user_progress", existing_history, self.max_conversation_history
+                )
 
             # دمج المواضيع المكتملة topics_completed إن وُجدت
             if isinstance(progress_data.get("topics_completed"), list):
@@ -430,6 +532,21 @@ class SupabaseManager:
             logger.error(f"خطأ في تحديث تقدم المستخدم: {e}")
             raise HTTPException(status_code=500, detail=f"خطأ في تحديث تقدم المستخدم: {str(e)}")
     
+    async def get_archived_sessions(self, user_id: str, table: str = "user_progress",
+                                    session_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """استعادة الجلسات المؤرشفة عند الطلب (user_progress أو podcast_progress)"""
+        if table == "podcast_progress":
+            row = await self.get_podcast_progress(user_id)
+        elif table == "user_progress":
+            row = await self.get_user_progress(user_id)
+        else:
+            raise HTTPException(status_code=400, detail=f"جدول غير مدعوم للأرشيف: {table}")
+        
+        history = (row or {}).get("conversation_history") or {}
+        if not history.get(ARCHIVE_INDEX_KEY):
+            return {}
+        return await self.history_archiver.rehydrate(history, session_ids)
+    
     async def save_conversation_data(self, user_id: str, conversation_data: Dict[str, Any]) -> Dict[str, Any]:
         """حفظ بيانات المحادثة الصوتية"""
         try:
@@ -449,11 +566,16 @@ class SupabaseManager:
             conversation_history = current_progress.get("conversation_history", {})
             session_id = conversation_data.get("session_id", str(datetime.utcnow().timestamp()))
             
+            # الـ agent يرسل الكلمات الجديدة فقط - ندمجها مع كلمات نفس الجلسة
+            session_words = list((conversation_history.get(session_id) or {}).get("words_discussed", []))
+            known_words = set(session_words)
+            session_words.extend(word for word in conversation_data.get("words_discussed", []) if word not in known_words)
+            
             # إضافة session_data للمحادثة
             conversation_history[session_id] = {
                 "timestamp": datetime.utcnow().isoformat(),
                 "topic": conversation_data.get("topic", ""),
-                "words_discussed": conversation_data.get("words_discussed", []),
+                "words_discussed": session_words,
                 "progress_made": conversation_data.get("progress_made", 0),
                 "last_position": conversation_data.get("last_position", ""),
                 "session_summary": conversation_data.get("session_summary", ""),
@@ -581,7 +703,7 @@ class SupabaseManager:
             
             # استخدام service_client للتجاوز RLS
             client = self.service_client if self.service_client else self.client
-            result = client.table("sentences_progress").insert(data).execute()
+            result = await self._execute(client.table("sentences_progress").insert(data))
             logger.info(f"تم إنشاء جلسة جمل جديدة للمستخدم: {user_id} (المستوى الأولي: 1)")
             return {"success": True, "data": result.data[0] if result.data else None}
         
@@ -600,7 +722,7 @@ class SupabaseManager:
                 # جلب آخر جلسة نشطة
                 query = query.eq("session_status", "active").order("last_activity", desc=True).limit(1)
             
-            result = query.execute()
+            result = await self._hedged_read(query.execute, "جلب تقدم الجمل")
             
             if result.data:
                 logger.info(f"تم جلب تقدم الجمل للمستخدم: {user_id}")
@@ -628,7 +750,7 @@ class SupabaseManager:
             
             # استخدام service_client للتجاوز RLS
             client = self.service_client if self.service_client else self.client
-            result = client.table("sentences_progress").update(updates).eq("user_id", user_id).eq("session_id", session_id).execute()
+            result = await self._execute(client.table("sentences_progress").update(updates).eq("user_id", user_id).eq("session_id", session_id))
             
             logger.info(f"تم تحديث تقدم الجمل للمستخدم: {user_id} (المستوى: {updates.get('current_level', '?')})")
             return {"success": True, "data": result.data[0] if result.data else None}
@@ -692,7 +814,10 @@ class SupabaseManager:
         """جلب تقدم البودكاست للمستخدم"""
         async def _get_operation():
             client = self.service_client if self.service_client else self.client
-            result = client.table("podcast_progress").select("*").eq("user_id", user_id).execute()
+            result = await self._hedged_read(
+                lambda: client.table("podcast_progress").select("*").eq("user_id", user_id).execute(),
+                "جلب تقدم البودكاست"
+            )
             
             if result.data:
                 return result.data[0]
@@ -728,7 +853,7 @@ class SupabaseManager:
             }
             
             client = self.service_client if self.service_client else self.client
-            result = client.table("podcast_progress").insert(data).execute()
+            result = await self._execute(client.table("podcast_progress").insert(data))
             
             return {"success": True, "data": result.data[0] if result.data else None}
         
@@ -777,14 +902,14 @@ class SupabaseManager:
                 "duration_minutes": conversation_data.get("duration_minutes", 0),
                 "vocabulary": conversation_data.get("vocabulary", []),
                 "mistakes": conversation_data.get("mistakes", []),
-                "improvements": conversation_data.get("improvements", [])
+                "improvements": conversation_data.get("improvements", []),
+                "fluency": conversation_data.get("fluency", {})
             }
             
-            # ضغط التاريخ إذا تجاوز 20 محادثة
-            if len(conversation_history) > 20:
-                # الاحتفاظ بآخر 20 محادثة فقط
-                sorted_sessions = sorted(conversation_history.items(), key=lambda x: x[0], reverse=True)
-                conversation_history = dict(sorted_sessions[:20])
+            # أرشفة الجلسات القديمة أو الزائدة عن 20 محادثة (بدون حذف أي شيء)
+            conversation_history = await self.history_archiver.archive(
+                user_id, "podcast_progress", conversation_history, self.max_podcast_history
+            )
             
             # تحديث المواضيع المناقشة
             topics_discussed = list(set(progress.get("topics_discussed", []) + [conversation_data.get("topic", "")]))
@@ -867,7 +992,10 @@ class SupabaseManager:
         """جلب السياق الشخصي للمستخدم"""
         async def _get_operation():
             client = self.service_client if self.service_client else self.client
-            result = client.table("user_personal_context").select("*").eq("user_id", user_id).execute()
+            result = await self._hedged_read(
+                lambda: client.table("user_personal_context").select("*").eq("user_id", user_id).execute(),
+                "جلب السياق الشخصي"
+            )
             
             if result.data:
                 logger.info(f"تم جلب السياق الشخصي للمستخدم: {user_id}")
@@ -915,7 +1043,7 @@ class SupabaseManager:
             }
             
             client = self.service_client if self.service_client else self.client
-            result = client.table("user_personal_context").insert(data).execute()
+            result = await self._execute(client.table("user_personal_context").insert(data))
             
             logger.info(f"تم إنشاء سياق شخصي جديد للمستخدم: {user_id}")
             return {"success": True, "data": result.data[0] if result.data else None}
@@ -1053,14 +1181,17 @@ class SupabaseManager:
         """جلب أو إنشاء تقييم المستوى"""
         async def _get_or_create():
             client = self.service_client if self.service_client else self.client
-            result = client.table("user_level_assessment").select("*").eq("user_id", user_id).execute()
+            result = await self._hedged_read(
+                lambda: client.table("user_level_assessment").select("*").eq("user_id", user_id).execute(),
+                "جلب تقييم المستوى"
+            )
             
             if result.data and len(result.data) > 0:
                 return result.data[0]
             
             # إنشاء جديد
             new_assessment = {"user_id": user_id}
-            insert_result = client.table("user_level_assessment").insert(new_assessment).execute()
+            insert_result = await self._execute(client.table("user_level_assessment").insert(new_assessment))
             return insert_result.data[0] if insert_result.data else None
         
         return await self._retry_operation(_get_or_create, "تقييم المستوى")
@@ -1180,13 +1311,16 @@ class SupabaseManager:
         """جلب أو إنشاء إنجازات المستخدم"""
         async def _get_or_create():
             client = self.service_client if self.service_client else self.client
-            result = client.table("user_achievements").select("*").eq("user_id", user_id).execute()
+            result = await self._hedged_read(
+                lambda: client.table("user_achievements").select("*").eq("user_id", user_id).execute(),
+                "جلب الإنجازات"
+            )
             
             if result.data and len(result.data) > 0:
                 return result.data[0]
             
             new_achievements = {"user_id": user_id}
-            insert_result = client.table("user_achievements").insert(new_achievements).execute()
+            insert_result = await self._execute(client.table("user_achievements").insert(new_achievements))
             return insert_result.data[0] if insert_result.data else None
         
         return await self._retry_operation(_get_or_create, "إنجازات")
@@ -1221,6 +1355,7 @@ class SupabaseManager:
             result = client.table("user_achievements").update(updates).eq("user_id", user_id).execute()
             
             logger.info(f"منح {points} نقطة - {reason}")
+            await self._sync_leaderboard_score(user_id, result.data[0] if result.data else None, points_delta=points)
             return {
                 "success": True, 
                 "level_up": level_up,
@@ -1265,12 +1400,94 @@ class SupabaseManager:
             }
             
             client = self.service_client if self.service_client else self.client
-            result = client.table("user_achievements").update(updates).eq("user_id", user_id).execute()
+            result = await self._execute(client.table("user_achievements").update(updates).eq("user_id", user_id))
             
+            await self._sync_leaderboard_score(user_id, result.data[0] if result.data else None)
             return {"success": True, "streak": current_streak, "data": result.data[0] if result.data else None}
         
         return await self._retry_operation(_update_streak, "تحديث streak")
     
+    # ============================================
+    # 🥇 لوحة المتصدرين
+    # ============================================
+    
+    async def _sync_leaderboard_score(self, user_id: str, achievements: Optional[Dict[str, Any]], points_delta: int = 0) -> None:
+        """تحديث صف المستخدم في جدول leaderboard_scores المفهرس (لا يوقف العملية الأصلية عند الفشل)"""
+        if not achievements:
+            return
+        
+        try:
+            client = self.service_client if self.service_client else self.client
+            # زيادة النقاط الأسبوعية داخل قاعدة البيانات (ذرية - لا تضيع مع التحديثات المتزامنة)
+            result = await self._execute(client.rpc("sync_leaderboard_score", {
+                "p_user_id": user_id,
+                "p_total_points": achievements.get("total_points", 0),
+                "p_current_level": achievements.get("current_level", 1),
+                "p_current_streak": achievements.get("current_streak", 0),
+                "p_week_start": current_week_start(),
+                "p_points_delta": points_delta,
+            }))
+            row = result.data[0] if isinstance(result.data, list) and result.data else result.data
+            if row:
+                leaderboard_cache.record(row)
+            
+        except Exception as e:
+            logger.error(f"خطأ في تحديث لوحة المتصدرين: {e}")
+    
+    async def _refresh_leaderboard_cache(self) -> None:
+        """مزامنة الذاكرة المؤقتة تدريجياً: تحميل كامل أول مرة ثم الصفوف المحدثة فقط"""
+        now = datetime.now()
+        if (self._leaderboard_last_refresh and
+                (now - self._leaderboard_last_refresh).total_seconds() < self.leaderboard_refresh_seconds):
+            return
+        
+        client = self.service_client if self.service_client else self.client
+        rows: List[Dict[str, Any]] = []
+        since = None
+        if self._leaderboard_watermark:
+            since = (datetime.fromisoformat(self._leaderboard_watermark.replace("Z", "+00:00"))
+                     - self.leaderboard_sync_overlap).isoformat()
+        cursor = None  # (updated_at, user_id) لآخر صف - ترقيم بالمفتاح بدل offset حتى لا تزيح الصفوف الجديدة الصفحات
+        
+        while True:
+            query = client.table("leaderboard_scores").select("*")
+            if cursor:
+                updated_at, user_id = cursor
+                query = query.or_(f'updated_at.gt."{updated_at}",'
+                                  f'and(updated_at.eq."{updated_at}",user_id.gt.{user_id})')
+            elif since:
+                query = query.gte("updated_at", since)
+            query = query.order("updated_at").order("user_id").limit(self.leaderboard_page_size)
+            result = await self._execute(query)
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < self.leaderboard_page_size:
+                break
+            cursor = (page[-1]["updated_at"], page[-1]["user_id"])
+        
+        # صفوف النافذة المتداخلة تُسجل مرة أخرى - record يستبدل القيم فلا يتضاعف شيء
+        leaderboard_cache.load(rows)
+        if rows:
+            self._leaderboard_watermark = max(self._leaderboard_watermark or "", rows[-1].get("updated_at") or "") or None
+        self._leaderboard_last_refresh = now
+        logger.info(f"تمت مزامنة لوحة المتصدرين: {len(rows)} صف")
+    
+    async def get_leaderboard(self, board: str = BOARD_GLOBAL, limit: int = 10) -> List[Dict[str, Any]]:
+        """أفضل N مستخدم في اللوحة (global أو weekly)"""
+        if board not in BOARDS:
+            raise HTTPException(status_code=400, detail=f"لوحة غير معروفة: {board}")
+        
+        await self._retry_operation(self._refresh_leaderboard_cache, "مزامنة لوحة المتصدرين")
+        return leaderboard_cache.top(board, limit)
+    
+    async def get_user_rank(self, user_id: str, board: str = BOARD_GLOBAL) -> Optional[Dict[str, Any]]:
+        """ترتيب المستخدم في اللوحة"""
+        if board not in BOARDS:
+            raise HTTPException(status_code=400, detail=f"لوحة غير معروفة: {board}")
+        
+        await self._retry_operation(self._refresh_leaderboard_cache, "مزامنة لوحة المتصدرين")
+        return leaderboard_cache.rank_of(user_id, board)
+    
     # ============================================
     # 📈 إحصائيات يومية
     # ============================================
@@ -1309,6 +1526,30 @@ class SupabaseManager:
             return {"success": True, "data": result.data[0] if result.data else None}
         
         return await self._retry_operation(_update_daily, "إحصائيات يومية")
+    
+    async def increment_daily_stats(self, user_id: str, day: str, deltas: Dict[str, int],
+                                    flush_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        زيادة ذرية لإحصائيات يوم محدد (استدعاء واحد بدلاً من select ثم update)
+        الزيادة غير متساوية القوة (idempotent): إعادة المحاولة فقط مع flush_id تتجاهله الدالة إن طُبق
+        (انتهاء المهلة بعد تطبيق الخادم لا يضاعف الأرقام)، وبدونه تُرسل مرة واحدة
+        """
+        async def _increment():
+            params = {"p_user_id": user_id, "p_date": day}
+            for key, value in deltas.items():
+                params[f"p_{key}"] = int(value)
+            if flush_id:
+                params["p_flush_id"] = flush_id
+            
+            client = self.service_client if self.service_client else self.client
+            result = client.rpc("increment_daily_stats", params).execute()
+            
+            data = result.data[0] if isinstance(result.data, list) and result.data else result.data
+            return {"success": True, "data": data}
+        
+        if not flush_id:
+            return await _increment()
+        return await self._retry_operation(_increment, "زيادة الإحصائيات اليومية")
 
 # إنشاء مثيل عام
 supabase_manager = SupabaseManager()
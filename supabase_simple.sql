@@ -341,6 +341,131 @@ ALTER TABLE daily_stats ENABLE ROW LEVEL SECURITY;
 CREATE POLICY "daily_stats_policy" ON daily_stats FOR ALL USING (auth.uid() = user_id OR auth.role() = 'service_role');
 CREATE INDEX idx_daily_stats_user_date ON daily_stats(user_id, date DESC);
 
+-- معرفات الدفعات المطبقة (session:sequence) - إعادة إرسال نفس الدفعة بعد انتهاء مهلة لا تضاعف الأرقام
+CREATE TABLE IF NOT EXISTS daily_stats_flushes (
+    flush_id TEXT PRIMARY KEY,
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE daily_stats_flushes ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "daily_stats_flushes_policy" ON daily_stats_flushes FOR ALL USING (auth.role() = 'service_role');
+CREATE INDEX idx_daily_stats_flushes_user ON daily_stats_flushes(user_id, applied_at);
+
+-- النسخة السابقة بدون p_flush_id (حتى لا يبقى تحميلان زائدان للدالة)
+DROP FUNCTION IF EXISTS increment_daily_stats(UUID, DATE, INTEGER, INTEGER, INTEGER, INTEGER, INTEGER, INTEGER, INTEGER);
+
+-- زيادة ذرية لإحصائيات اليوم (صف واحد لكل يوم) - تُستدعى من مُجمِّع الجلسة في الوكيل
+-- p_flush_id: دفعة سبق تطبيقها تعيد الصف الحالي بدون زيادة
+CREATE OR REPLACE FUNCTION increment_daily_stats(
+    p_user_id UUID,
+    p_date DATE,
+    p_minutes_studied INTEGER DEFAULT 0,
+    p_words_learned INTEGER DEFAULT 0,
+    p_words_reviewed INTEGER DEFAULT 0,
+    p_lessons_completed INTEGER DEFAULT 0,
+    p_correct_answers INTEGER DEFAULT 0,
+    p_total_attempts INTEGER DEFAULT 0,
+    p_points_earned INTEGER DEFAULT 0,
+    p_flush_id TEXT DEFAULT NULL
+) RETURNS daily_stats AS $$
+DECLARE
+    result daily_stats;
+BEGIN
+    IF p_flush_id IS NOT NULL THEN
+        INSERT INTO daily_stats_flushes (flush_id, user_id) VALUES (p_flush_id, p_user_id)
+        ON CONFLICT (flush_id) DO NOTHING;
+        IF NOT FOUND THEN
+            SELECT * INTO result FROM daily_stats WHERE user_id = p_user_id AND date = p_date;
+            RETURN result;
+        END IF;
+        -- إعادة المحاولة تحدث خلال دقائق - المعرفات الأقدم لا حاجة لها
+        DELETE FROM daily_stats_flushes WHERE user_id = p_user_id AND applied_at < NOW() - INTERVAL '2 days';
+    END IF;
+
+    INSERT INTO daily_stats AS d (
+        user_id, date, minutes_studied, words_learned, words_reviewed, lessons_completed,
+        correct_answers, total_attempts, points_earned, daily_accuracy
+    ) VALUES (
+        p_user_id, p_date, p_minutes_studied, p_words_learned, p_words_reviewed, p_lessons_completed,
+        p_correct_answers, p_total_attempts, p_points_earned,
+        CASE WHEN p_total_attempts > 0 THEN (p_correct_answers::numeric / p_total_attempts) * 100 ELSE 0 END
+    )
+    ON CONFLICT (user_id, date) DO UPDATE SET
+        minutes_studied = d.minutes_studied + EXCLUDED.minutes_studied,
+        words_learned = d.words_learned + EXCLUDED.words_learned,
+        words_reviewed = d.words_reviewed + EXCLUDED.words_reviewed,
+        lessons_completed = d.lessons_completed + EXCLUDED.lessons_completed,
+        correct_answers = d.correct_answers + EXCLUDED.correct_answers,
+        total_attempts = d.total_attempts + EXCLUDED.total_attempts,
+        points_earned = d.points_earned + EXCLUDED.points_earned,
+        daily_accuracy = CASE
+            WHEN d.total_attempts + EXCLUDED.total_attempts > 0
+            THEN ((d.correct_answers + EXCLUDED.correct_answers)::numeric / (d.total_attempts + EXCLUDED.total_attempts)) * 100
+            ELSE 0
+        END
+    RETURNING * INTO result;
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- 🥇 لوحة المتصدرين (تُحدَّث من award_points و update_streak)
+-- ============================================
+CREATE TABLE IF NOT EXISTS leaderboard_scores (
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE PRIMARY KEY,
+    total_points INTEGER DEFAULT 0,
+    current_level INTEGER DEFAULT 1,
+    current_streak INTEGER DEFAULT 0,
+    weekly_points INTEGER DEFAULT 0,
+    week_start DATE DEFAULT date_trunc('week', CURRENT_DATE)::date, -- بداية الأسبوع (الاثنين)
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE leaderboard_scores ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "leaderboard_scores_policy" ON leaderboard_scores FOR ALL USING (auth.uid() = user_id OR auth.role() = 'service_role');
+CREATE INDEX idx_leaderboard_total_points ON leaderboard_scores(total_points DESC);
+CREATE INDEX idx_leaderboard_weekly ON leaderboard_scores(week_start, weekly_points DESC);
+-- المزامنة التدريجية ترقّم الصفحات بالمفتاح (updated_at, user_id)
+CREATE INDEX idx_leaderboard_updated_at ON leaderboard_scores(updated_at, user_id);
+
+-- تعبئة اللوحة من الإنجازات الحالية (وإلا يغيب المستخدمون الحاليون حتى أول نقاط جديدة)
+-- النقاط الأسبوعية السابقة غير معروفة فتبدأ من 0 للأسبوع الحالي
+INSERT INTO leaderboard_scores (user_id, total_points, current_level, current_streak, weekly_points, week_start, updated_at)
+SELECT user_id, COALESCE(total_points, 0), COALESCE(current_level, 1), COALESCE(current_streak, 0),
+       0, date_trunc('week', CURRENT_DATE)::date, NOW()
+FROM user_achievements
+WHERE user_id IS NOT NULL
+ON CONFLICT (user_id) DO NOTHING;
+
+-- تحديث ذري لصف المستخدم: النقاط الأسبوعية تُزاد في نفس الاستعلام (أو تبدأ من جديد مع أسبوع جديد)
+-- بدلاً من قراءة ثم upsert يضيع فيه أحد التحديثين المتزامنين
+CREATE OR REPLACE FUNCTION sync_leaderboard_score(
+    p_user_id UUID,
+    p_total_points INTEGER,
+    p_current_level INTEGER,
+    p_current_streak INTEGER,
+    p_week_start DATE,
+    p_points_delta INTEGER DEFAULT 0
+) RETURNS leaderboard_scores AS $$
+    INSERT INTO leaderboard_scores AS l (
+        user_id, total_points, current_level, current_streak, weekly_points, week_start, updated_at
+    ) VALUES (
+        p_user_id, p_total_points, p_current_level, p_current_streak, p_points_delta, p_week_start, NOW()
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_points = EXCLUDED.total_points,
+        current_level = EXCLUDED.current_level,
+        current_streak = EXCLUDED.current_streak,
+        weekly_points = CASE
+            WHEN l.week_start = EXCLUDED.week_start THEN l.weekly_points + EXCLUDED.weekly_points
+            ELSE EXCLUDED.weekly_points
+        END,
+        week_start = EXCLUDED.week_start,
+        updated_at = NOW()
+    RETURNING *;
+$$ LANGUAGE sql;
+
 
 
 
@@ -0,0 +1,89 @@
+"""
+تطبيع النصوص العربية/الإنجليزية المشترك بين كل المطابِقات
+جداول str.translate مبنية مرة واحدة عند الاستيراد (تمريرة واحدة على النص بدل سلاسل replace):
+- محارف الاتجاه (bidi) والمحارف غير المرئية (zero-width)
+- التشكيل والتطويل
+- توحيد الألف (أ إ آ ٱ -> ا) والياء (ى -> ي) والتاء المربوطة (ة -> ه)
+- الترقيم العربي والإنجليزي -> مسافة
+"""
+import re
+import string
+from typing import Dict, List, Optional
+
+# LRM/RLM، embeddings/overrides، isolates، ALM
+BIDI_MARKS = (
+    0x200E, 0x200F,
+    0x202A, 0x202B, 0x202C, 0x202D, 0x202E,
+    0x2066, 0x2067, 0x2068, 0x2069,
+    0x061C,
+)
+# ZWSP/ZWNJ/ZWJ، BOM، WORD JOINER، MONGOLIAN VOWEL SEPARATOR
+ZERO_WIDTH = (0x200B, 0x200C, 0x200D, 0xFEFF, 0x2060, 0x180E)
+TATWEEL = 0x0640
+# الفتحتان ... السكون، والألف الخنجرية
+ARABIC_DIACRITICS = tuple(range(0x064B, 0x0653)) + (0x0670,)
+ARABIC_FOLDING = {"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه"}
+APOSTROPHES = {"’": "'", "‘": "'", "`": "'"}
+PUNCTUATION = string.punctuation + "،؛؟«»“”‘’…–—"
+
+# الجداول قوائم كثيفة حتى هذا الحد (اللاتينية + العربية + علامات الترقيم العامة وbidi):
+# البحث بالفهرس أسرع من dict التي تفشل داخلياً (LookupError) لكل حرف غير موجود فيها
+_DENSE_LIMIT = 0x2070
+_IDENTITY = list(range(_DENSE_LIMIT))
+
+
+class Translator:
+    """جدول translate مُجمّع مع فحص مسبق: النص الذي لا يحتوي أي محرف من الجدول يُعاد كما هو"""
+
+    __slots__ = ("mapping", "_dense", "_outliers", "_needs")
+
+    def __init__(self, *parts: Dict[int, Optional[str]]):
+        self.mapping: Dict[int, Optional[str]] = {}
+        for part in parts:
+            self.mapping.update(part)
+        self._dense: List = list(_IDENTITY)
+        self._outliers = []  # محارف بعد الحد (مثل BOM) تُستبدل مباشرة
+        for code, target in self.mapping.items():
+            if code < _DENSE_LIMIT:
+                self._dense[code] = target
+            else:
+                self._outliers.append((chr(code), target or ""))
+        # فئة محارف مُجمّعة لمفاتيح الجدول - مسح C سريع يتخطى translate في الحالة الشائعة
+        self._needs = re.compile("[" + "".join(re.escape(chr(code)) for code in sorted(self.mapping)) + "]")
+
+    def __call__(self, text: str) -> str:
+        text = text or ""
+        if not self._needs.search(text):
+            return text
+        text = text.translate(self._dense)
+        for char, target in self._outliers:
+            text = text.replace(char, target)
+        return text
+
+
+_INVISIBLE = {code: None for code in BIDI_MARKS + ZERO_WIDTH}
+_MARKS = {code: None for code in ARABIC_DIACRITICS + (TATWEEL,)}
+_FOLD = {ord(char): target for char, target in ARABIC_FOLDING.items()}
+_APOSTROPHES = {ord(char): target for char, target in APOSTROPHES.items()}
+_PUNCTUATION = {ord(char): " " for char in PUNCTUATION}
+
+# إزالة محارف الاتجاه والمحارف غير المرئية فقط
+strip_invisible = Translator(_INVISIBLE)
+# + التشكيل والتطويل مع إبقاء الحروف كما هي
+strip_marks = Translator(_INVISIBLE, _MARKS)
+# + توحيد الألف والياء والتاء المربوطة
+fold_arabic = Translator(_INVISIBLE, _MARKS, _FOLD)
+# للمطابِقات الإنجليزية على مستوى الكلمات: إزالة غير المرئي وتوحيد الفاصلة العليا
+fold_english_tokens = Translator(_INVISIBLE, _APOSTROPHES)
+# كل ما سبق + الترقيم إلى مسافة (الفاصلة العليا تُحذف: don't -> dont)
+_match = Translator(_INVISIBLE, _MARKS, _FOLD, _PUNCTUATION, {ord("'"): None, ord("’"): None})
+
+
+def strip_markdown(text: str) -> str:
+    """رموز التنسيق (* و _) في نص المعلم - محرفان فقط، replace أسرع من أي جدول"""
+    return (text or "").replace("*", "").replace("_", "")
+
+
+def normalize_text(text: str) -> str:
+    """تطبيع كامل للمقارنة: fold_arabic + حروف صغيرة + حذف الترقيم + توحيد المسافات"""
+    return " ".join(_match(text).lower().split())
@@ -0,0 +1,104 @@
+"""
+اكتشاف الموضوع ونقطة التوقف في ردود المعلم بمسح واحد
+كل الأنماط (المواضيع ثم نقاط التوقف، بترتيب الأولوية) في تعبير واحد مُجمّع بمجموعات مسماة.
+كل بديل داخل lookahead حتى يُجرَّب عند كل موضع دون استهلاك النص، فيبقى أول تطابق لكل نمط
+مطابقاً لـ findall المنفصل القديم، مع استثناءين:
+- عند تطابق نمطين من نفس الموضع يفوز الأعلى أولوية
+- المؤشرات الإنجليزية لا تُلتقط من داخل كلمة (مثلاً covered داخل discovered)
+"""
+import re
+from typing import Dict, List, NamedTuple, Tuple
+
+from text_normalization import strip_marks
+
+# مؤشرات الموضوع بالإنجليزية والعربية (بترتيب الأولوية) - مجموعة مسماة واحدة لكل نمط هي القيمة
+# (الاسم، النمط، يبدأ من حد كلمة): الأنماط الإنجليزية تُجرَّب عند بدايات الكلمات فقط،
+# والعربية عند كل موضع لأن الكلمة قد تلتصق بها سوابق (و، ف، ب)
+TOPIC_PATTERNS: Tuple[Tuple[str, str, bool], ...] = (
+    # English patterns - مواضيع مباشرة
+    ("topic_category", r"\b(?P<topic_category>Nouns|Verbs|Adjectives|Adverbs|Pronouns|Prepositions|Conjunctions|Articles|Tenses|Grammar)\b", True),
+    ("topic_is", r"(?:topic|subject)\s+(?:is|are|will be)\s+(?P<topic_is>[A-Z][A-Za-z\s]+)", True),
+    ("topic_studying", r"(?:studying|learning|teaching|discussing)\s+(?P<topic_studying>[A-Z][A-Za-z\s]+)", True),
+    ("topic_lets", r"(?:Let's|let's)\s+(?:learn|study|talk about|discuss)\s+(?P<topic_lets>[A-Z][A-Za-z\s]+)", True),
+    ("topic_today", r"(?:Today's topic|Our topic|The topic)\s+(?:is|will be)?:?\s*(?P<topic_today>[A-Z][A-Za-z\s]+)", True),
+    ("topic_lesson", r"(?:chapter|lesson|section)\s+(?:on|about)\s+(?P<topic_lesson>[A-Z][A-Za-z\s]+)", True),
+    # Arabic patterns
+    ("topic_ar_current", r"الموضوع\s+(?:الحالي|اليوم)[:؟]?\s*(?P<topic_ar_current>.+)", False),
+    ("topic_ar_learn", r"سنتعلم\s+(?:عن|موضوع)\s*(?P<topic_ar_learn>.+)", False),
+    ("topic_ar_talk", r"دعنا\s+نتحدث\s+عن\s*(?P<topic_ar_talk>.+)", False),
+    ("topic_ar_nouns", r"(?P<topic_ar_nouns>موضوع\s+الأسماء)", False),  # "موضوع الأسماء" -> Nouns
+)
+
+# نقطة التوقف بالإنجليزية والعربية (بترتيب الأولوية)
+POSITION_PATTERNS: Tuple[Tuple[str, str, bool], ...] = (
+    # English patterns - مواضع محددة
+    ("position_noun_types", r"\b(?P<position_noun_types>types of nouns|common nouns|proper nouns|abstract nouns|collective nouns|countable nouns|uncountable nouns)\b", True),
+    ("position_tense", r"\b(?P<position_tense>present tense|past tense|future tense|verb forms|irregular verbs)\b", True),
+    ("position_part", r"\b(?P<position_part>definition|examples|usage|rules|exceptions)\b", True),
+    ("position_were", r"(?:We were|You were)\s+(?:discussing|talking about|learning)\s+(?P<position_were>[A-Za-z][A-Za-z\s]+)", True),
+    ("position_last_time", r"(?:Last time|Previously|Earlier).*?(?:about|discussing|studying)\s+(?P<position_last_time>[A-Za-z][A-Za-z\s]+)", True),
+    ("position_stopped", r"(?:stopped at|paused at|left off at|ended with)\s+(?P<position_stopped>[A-Za-z][A-Za-z\s]+)", True),
+    ("position_covered", r"(?:covered|finished|completed)\s+(?P<position_covered>[A-Za-z][A-Za-z\s]+)", True),
+    # Arabic patterns
+    ("position_ar_stop", r"نقطة\s+التوقف[:؟]?\s*(?P<position_ar_stop>.+)", False),
+    ("position_ar_reached", r"وصلنا\s+إلى\s*(?P<position_ar_reached>.+)", False),
+    ("position_ar_finished", r"انتهينا\s+من\s*(?P<position_ar_finished>.+)", False),
+    ("position_ar_learned", r"تعلمنا\s+عن\s*(?P<position_ar_learned>.+)", False),
+)
+
+_STRIP_CHARS = '.,!?؟،'
+
+
+class TopicScan(NamedTuple):
+    topics: List[str]  # المواضيع المرشحة بترتيب الأولوية (بدون تكرار)
+    position: str  # نقطة التوقف الأعلى أولوية أو نص فارغ
+
+
+class TopicDetector:
+    """مسح واحد لنص المعلم يعيد المواضيع المرشحة ونقطة التوقف"""
+
+    def __init__(self, topic_patterns=TOPIC_PATTERNS, position_patterns=POSITION_PATTERNS):
+        self.topic_names = tuple(name for name, _, _ in topic_patterns)
+        self.position_names = tuple(name for name, _, _ in position_patterns)
+        patterns = topic_patterns + position_patterns
+        word_start = "|".join(pattern for _, pattern, anchored in patterns if anchored)
+        anywhere = "|".join(pattern for _, pattern, anchored in patterns if not anchored)
+        # فحص \b أولاً يتخطى معظم المواضع داخل الكلمات قبل تجربة البدائل الإنجليزية
+        self.pattern = re.compile(rf"(?:\b(?=(?:{word_start}))|(?=(?:{anywhere})))", re.IGNORECASE)
+        self._all = len(self.topic_names) + len(self.position_names)
+
+    def first_matches(self, text: str) -> Dict[str, str]:
+        """أول تطابق لكل نمط: اسم النمط -> القيمة الملتقطة"""
+        found: Dict[str, str] = {}
+        if not text:
+            return found
+        # التشكيل والتطويل والمحارف غير المرئية تكسر الأنماط العربية ("الموضـوع"، "وَصَلْنا")
+        for match in self.pattern.finditer(strip_marks(text)):
+            name = match.lastgroup
+            if name not in found:
+                found[name] = match.group(name)
+                if len(found) == self._all:
+                    break
+        return found
+
+    @staticmethod
+    def _candidates(names, found: Dict[str, str]) -> List[str]:
+        """القيم (أطول من 3 أحرف) بترتيب أولوية الأنماط"""
+        values: List[str] = []
+        for name in names:
+            raw = found.get(name)
+            if raw is None:
+                continue
+            value = raw.strip().rstrip(_STRIP_CHARS)
+            if value and len(value) > 3 and value not in values:
+                values.append(value)
+        return values
+
+    def scan(self, text: str) -> TopicScan:
+        found = self.first_matches(text)
+        positions = self._candidates(self.position_names, found)
+        return TopicScan(self._candidates(self.topic_names, found), positions[0] if positions else "")
+
+
+# مثيل عام يُبنى مرة واحدة عند الاستيراد
+topic_detector = TopicDetector()
@@ -3,9 +3,12 @@
 يحتوي على جميع المواضيع المطلوبة مع تفاصيل كل موضوع
 """
 
-from typing import Dict, List, Any
+import re
+from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 
+from text_normalization import fold_arabic, normalize_text
+
 @dataclass
 class TopicSection:
     """قسم فرعي داخل الموضوع"""
@@ -405,13 +408,13 @@ def get_next_suggested_topic(completed_topics: List[int]) -> EnglishTopic:
 
 # دالة للبحث في المواضيع
 def search_topics(query: str) -> List[EnglishTopic]:
-    """البحث في المواضيع بالاسم أو الوصف"""
-    query = query.lower()
+    """البحث في المواضيع بالاسم أو الوصف (بعد توحيد الحروف العربية: "الاسماء" تطابق "الأسماء")"""
+    query = normalize_text(query)
     results = []
     for topic in ENGLISH_TOPICS.values():
-        if (query in topic.name.lower() or 
-            query in topic.arabic_name.lower() or 
-            query in topic.description.lower()):
+        if (query in normalize_text(topic.name) or 
+            query in normalize_text(topic.arabic_name) or 
+            query in normalize_text(topic.description)):
             results.append(topic)
     return results
 
@@ -443,3 +446,118 @@ TOPIC_NAMES = {
     29: "Conversation: Future events, narration, electronic communication",
     30: "Some Important Contrasts", 31: "Phrasal verbs"
 }
+
+
+# ==================== فهرس الأسماء البديلة (aliases) ====================
+# يحوّل العبارات الحرة التي يلتقطها الوكيل ("Nouns"، "موضوع الأسماء"، "Types Of Nouns")
+# إلى معرفات ثابتة: رقم الموضوع ومعرف القسم ("1.1" = القسم الأول من الموضوع 1)
+
+_ALIAS_SPLIT_RE = re.compile(r"\s+vs\.?\s+|[:;()]", re.IGNORECASE)
+_ALIAS_WORD_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)?")
+# كلمات تسبق اسم الموضوع في كلام المعلم ولا تغير معناه
+_ALIAS_PREFIXES = ("موضوع",)
+_MAX_ALIAS_WORDS = 6
+# أسماء مختصرة يستخدمها المعلم ولا تظهر في تعريف المواضيع
+_EXTRA_ALIASES = {
+    "Pronouns": 4, "الضمائر": 4,
+    "Articles": 2, "أدوات التعريف": 2,
+    "Helping verbs": 7,
+}
+
+
+@dataclass(frozen=True)
+class TopicRef:
+    """موضوع (وقسم اختياري) مطابق لعبارة حرة"""
+    topic_id: int
+    section_id: Optional[str] = None
+
+
+def section_id(topic_id: int, section_index: int) -> str:
+    return f"{topic_id}.{section_index + 1}"
+
+
+def _alias_words(text: str) -> List[str]:
+    words = []
+    for word in _ALIAS_WORD_RE.findall(fold_arabic(text).lower()):
+        # توحيد المفرد والجمع البسيط للكلمات الإنجليزية (nouns -> noun)
+        if word.isascii() and len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    while words and words[0] in _ALIAS_PREFIXES:
+        words = words[1:]
+    return words
+
+
+def normalize_topic_phrase(text: str) -> str:
+    """الصيغة الموحدة لعبارة موضوع (حروف صغيرة، حروف عربية موحدة، بدون ترقيم، مفرد)"""
+    return " ".join(_alias_words(text or ""))
+
+
+def _build_alias_index() -> Dict[str, TopicRef]:
+    index: Dict[str, TopicRef] = {}
+
+    def add(alias: str, ref: TopicRef) -> None:
+        key = normalize_topic_phrase(alias)
+        if key and key not in index:  # الأولوية للأسبق: أسماء المواضيع ثم الأقسام ثم النقاط
+            index[key] = ref
+        # بدون أداة التعريف: "The past progressive tense" و"الأسماء" -> "أسماء"
+        if key.startswith("the ") and key[4:] not in index:
+            index[key[4:]] = ref
+        if key.startswith("ال") and " " not in key and key[2:] not in index:
+            index[key[2:]] = ref
+
+    for topic_id, name in TOPIC_NAMES.items():
+        add(name, TopicRef(topic_id))
+    for topic in ENGLISH_TOPICS.values():
+        add(topic.name, TopicRef(topic.id))
+        add(topic.arabic_name, TopicRef(topic.id))
+    for alias, topic_id in _EXTRA_ALIASES.items():
+        add(alias, TopicRef(topic_id))
+    for topic in ENGLISH_TOPICS.values():
+        for index_in_topic, section in enumerate(topic.sections):
+            ref = TopicRef(topic.id, section_id(topic.id, index_in_topic))
+            add(section.name, ref)
+            add(_ALIAS_SPLIT_RE.split(section.name)[0], ref)  # "Indefinite Articles (a, an)"
+    for topic in ENGLISH_TOPICS.values():
+        for index_in_topic, section in enumerate(topic.sections):
+            ref = TopicRef(topic.id, section_id(topic.id, index_in_topic))
+            for point in section.key_points:
+                parts = _ALIAS_SPLIT_RE.split(point)
+                # "Countable vs Uncountable nouns" -> "Countable nouns" و"Uncountable nouns"
+                if len(parts) == 2 and len(parts[0].split()) == 1 and len(parts[1].split()) > 1:
+                    parts[0] = f"{parts[0]} {parts[1].split()[-1]}"
+                for part in parts:
+                    # النقاط القصيرة جداً ("Complement") عامة أكثر من أن تحدد قسماً
+                    if len(normalize_topic_phrase(part).split()) >= 2:
+                        add(part, ref)
+    return index
+
+
+# يُبنى مرة واحدة عند الاستيراد: العبارة الموحدة -> TopicRef
+TOPIC_ALIASES: Dict[str, TopicRef] = _build_alias_index()
+
+
+def resolve_topic(phrase: str) -> Optional[TopicRef]:
+    """مطابقة عبارة حرة مع موضوع/قسم: تطابق كامل O(1) ثم أطول مقطع معروف داخل العبارة
+    المقاطع من كلمة واحدة ("number"، "plural"، "verb") عامة جداً داخل عبارة أطول - تُقبل فقط كعبارة كاملة"""
+    words = _alias_words(phrase or "")
+    if not words:
+        return None
+    ref = TOPIC_ALIASES.get(" ".join(words))
+    if ref is not None:
+        return ref
+    for size in range(min(len(words) - 1, _MAX_ALIAS_WORDS), 1, -1):
+        for start in range(len(words) - size + 1):
+            ref = TOPIC_ALIASES.get(" ".join(words[start:start + size]))
+            if ref is not None:
+                return ref
+    return None
+
+
+def topic_progress(topic_id: int, sections_covered) -> Optional[int]:
+    """نسبة الأقسام المغطاة من الموضوع، أو None إذا لم تكن للموضوع أقسام معرّفة"""
+    topic = ENGLISH_TOPICS.get(topic_id)
+    if not topic or not topic.sections:
+        return None
+    covered = sum(1 for index in range(len(topic.sections)) if section_id(topic_id, index) in sections_covered)
+    return round(covered * 100 / len(topic.sections))
@@ -0,0 +1,150 @@
+"""
+تتبع مفردات الجلسة
+- مجموعة مرتبة (ترتيب أول ظهور) مع فحص عضوية O(1)
+- تصفية الكلمات الشائعة (stopwords) وتوحيد صيغ الجمع البسيطة كمفتاح للتكرار فقط:
+  الكلمة تُحفظ كما قيلت ("movies" وليس "movy")، و"movie" بعدها تُعتبر مكررة
+- حد أقصى لكل جلسة (الكلمات المتعلمة سابقاً منفصلة ولا تُحسب فيه)
+- "الجديد منذ آخر حفظ" بدون نسخ القائمة كاملة
+"""
+import re
+from typing import Iterable, List, Optional, Set
+
+_WORD_RE = re.compile(r"\b[A-Za-z]{3,}\b")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before being
+below between both but by can can't cannot could did didn't do does doesn't doing don't down during each
+few for from further get got had has have having he her here hers herself him himself his how i if in into
+is isn't it it's its itself just let let's like me more most much must my myself no nor not now of off on
+once only or other our ours ourselves out over own really same say said she should so some such than that
+the their theirs them themselves then there these they this those through to too under until up very was
+wasn't we well were what when where which while who whom why will with would yes yet you your yours
+yourself yourselves okay yeah one two three lot lots thing things way ways good great nice right sure
+try next today time see know think want tell make go going come use word words sentence
+sentences answer question example examples english arabic
+""".split())
+
+# جموع شاذة شائعة
+_IRREGULAR = {
+    "children": "child", "people": "person", "men": "man", "women": "woman",
+    "feet": "foot", "teeth": "tooth", "mice": "mouse", "geese": "goose",
+    "goes": "go", "does": "do",
+}
+# كلمات تنتهي بـ s وليست جمعاً
+_KEEP_S = ("ss", "us", "is", "ous", "ics")
+# كلمات لا تتغير بحذف s (ظروف، مفرد ينتهي بـ s، جمع = مفرد)
+_INVARIANT = frozenset("""
+always perhaps sometimes besides afterwards towards backwards forwards upwards downwards nowadays
+news series species means lens gas bus yes its this thus plus chaos atlas canvas alias bias
+""".split())
+# مفرد ينتهي بـ ie (جمعه ies وليس y -> ies)
+_IE_SINGULAR = frozenset("""
+movie cookie pie tie lie die rookie calorie zombie selfie smoothie prairie hippie brownie genie
+sweetie hoodie auntie goalie
+""".split())
+# مفرد ينتهي بـ o جمعه oes (وما عداه من oes مثل shoes/toes يُحذف منه s فقط)
+_OES_SINGULAR = frozenset("potato tomato hero echo veto torpedo embargo volcano mosquito".split())
+
+
+def lemmatize(word: str) -> str:
+    """توحيد بسيط لصيغ الجمع (بدون مكتبات خارجية) - مفتاح للمقارنة وليس صيغة للعرض"""
+    word = word.lower()
+    if word in _IRREGULAR:
+        return _IRREGULAR[word]
+    if len(word) <= 3 or word in _INVARIANT or word.endswith(_KEEP_S):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-1] if word[:-1] in _IE_SINGULAR else word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2] if word[:-2] in _OES_SINGULAR else word[:-1]
+    if word.endswith(("ches", "shes", "xes", "sses", "zes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_word(word: str, stopwords=STOPWORDS) -> Optional[str]:
+    """مفتاح الكلمة الموحد (للتكرار)، أو None إذا كانت كلمة شائعة أو قصيرة"""
+    word = word.lower()
+    if word in stopwords:
+        return None
+    lemma = lemmatize(word)
+    if len(lemma) < 3 or lemma in stopwords:
+        return None
+    return lemma
+
+
+def candidate_words(text: str, stopwords=STOPWORDS) -> List[str]:
+    """الكلمات المرشحة من نص (بصيغتها كما وردت، بدون تكرار حسب المفتاح، بترتيب الظهور) - بدون حالة"""
+    seen: Set[str] = set()
+    words: List[str] = []
+    for word in _WORD_RE.findall(text or ""):
+        lemma = normalize_word(word, stopwords)
+        if lemma is not None and lemma not in seen:
+            seen.add(lemma)
+            words.append(word.lower())
+    return words
+
+
+class VocabularyTracker:
+    """مفردات الجلسة: مرتبة، مصفاة، محدودة، مع تتبع ما لم يُحفظ بعد"""
+
+    def __init__(self, max_words: int = 300, stopwords: Iterable[str] = STOPWORDS):
+        self.max_words = max_words
+        self.stopwords = frozenset(stopwords)
+        self.words: List[str] = []  # قائمة مشتركة - تُضاف إليها الكلمات فقط (بصيغتها كما قيلت)
+        self._seen: Set[str] = set()  # مفاتيح lemmatize للكلمات في القائمة
+        self._known: Set[str] = set()  # كلمات متعلمة في جلسات سابقة - لا تُضاف ولا تُرسل مجدداً
+        self._saved = 0  # عدد الكلمات المحفوظة من بداية القائمة
+        self.overflow = 0  # كلمات رُفضت بسبب الحد الأقصى
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        lemma = lemmatize(word)
+        return lemma in self._seen or lemma in self._known
+
+    def add(self, word: str) -> bool:
+        """إضافة كلمة واحدة - تعيد True إذا كانت جديدة"""
+        lemma = normalize_word(word or "", self.stopwords)
+        if lemma is None or lemma in self._seen or lemma in self._known:
+            return False
+        if len(self.words) >= self.max_words:
+            self.overflow += 1
+            return False
+        self._seen.add(lemma)
+        self.words.append(word.lower())
+        return True
+
+    def add_many(self, words: Iterable[str]) -> int:
+        return sum(1 for word in words if self.add(word))
+
+    def add_text(self, text: str) -> int:
+        """استخراج الكلمات الإنجليزية (3 أحرف فأكثر) من نص وإضافتها"""
+        return self.add_many(_WORD_RE.findall(text or ""))
+
+    def load(self, words: Iterable[str]) -> None:
+        """تحميل كلمات متعلمة سابقاً: لا تُعتبر جديدة، ولا تدخل قائمة الجلسة أو حدها الأقصى"""
+        for word in words:
+            lemma = normalize_word(word or "", self.stopwords)
+            if lemma is not None and lemma not in self._seen:
+                self._known.add(lemma)
+
+    def known(self) -> List[str]:
+        """الكلمات المتعلمة سابقاً المحملة عبر load()"""
+        return sorted(self._known)
+
+    def restore(self, words: Iterable[str], saved: int) -> None:
+        """استعادة كلمات الجلسة من لقطة: أول saved كلمة محفوظة مسبقاً والباقي جديد"""
+        self.add_many(words)
+        self._saved = min(len(self.words), self._saved + saved)
+
+    def unsaved(self) -> List[str]:
+        """الكلمات الجديدة منذ آخر حفظ"""
+        return self.words[self._saved:]
+
+    def mark_saved(self, count: int) -> None:
+        """تأكيد حفظ أول count كلمة من unsaved() (الكلمات المضافة أثناء الحفظ تبقى جديدة)"""
+        self._saved = min(len(self.words), self._saved + count)
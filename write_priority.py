@@ -0,0 +1,134 @@
+"""
+أولوية كتابات الجلسة في Supabase وتخفيف الحمل عند تدهوره
+- critical: تقدم الجلسة عند نهايتها - يُكتب دائماً
+- deferrable: النقاط، daily_stats، السياق الشخصي، الحفظ التلقائي - تتراكم في الذاكرة
+  ما دام زمن Supabase (p95) أو نسبة أخطائه فوق الحد في النافذة الأخيرة، وتُرسل عند التعافي
+الكتابة المؤجلة تُحفظ بمفتاح: تكرار نفس المفتاح يستبدل السابق، والبيانات نفسها تتراكم
+في مجمّعاتها (DailyStatsAggregator، PersonalContextDebouncer، نقاط الجلسة) فتُرسل كتابة واحدة
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from db_metrics import DBMetrics, db_metrics
+
+logger = logging.getLogger(__name__)
+
+CRITICAL = "critical"
+DEFERRABLE = "deferrable"
+
+Write = Callable[[], Awaitable[Any]]
+
+
+class SupabaseHealth:
+    """حالة Supabase من مقاييس العمليات الأخيرة (مشتركة بين كل جلسات الـ worker)"""
+
+    def __init__(self, metrics: DBMetrics, latency_threshold: float = 1.0, error_rate_threshold: float = 0.2,
+                 window: float = 30.0, min_samples: int = 10, check_interval: float = 1.0):
+        self.metrics = metrics
+        self.latency_threshold = latency_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.window = window
+        self.min_samples = min_samples  # أقل من ذلك لا يكفي للحكم - تُعتبر الحالة سليمة
+        self.check_interval = check_interval
+        self._checked_at = float("-inf")
+        self._degraded = False
+
+    @property
+    def degraded(self) -> bool:
+        """التقييم يُحفظ لمدة check_interval حتى لا تمر كل كتابة على نافذة العمليات"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            count, p95, error_rate = self.metrics.recent(self.window)
+            degraded = count >= self.min_samples and (
+                p95 >= self.latency_threshold or error_rate >= self.error_rate_threshold
+            )
+            if degraded != self._degraded:
+                state = "متدهور - تأجيل الكتابات غير الحرجة" if degraded else "تعافى"
+                logger.warning(f"Supabase {state} (p95={p95 * 1000:.0f}ms، أخطاء={error_rate:.0%}، عمليات={count})")
+            self._degraded = degraded
+        return self._degraded
+
+
+class DeferredWrites:
+    """كتابات جلسة واحدة حسب الأولوية - المؤجلة تُرسل عند تعافي Supabase أو عند إغلاق الجلسة"""
+
+    def __init__(self, health: SupabaseHealth, retry_interval: float = 5.0):
+        self.health = health
+        self.retry_interval = retry_interval
+        self._pending: Dict[str, Write] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.deferred_count = 0
+        self.flushed_count = 0
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    async def submit(self, name: str, write: Write, priority: str = DEFERRABLE) -> bool:
+        """تنفيذ الكتابة الآن أو تأجيلها. يعيد True إذا نُفذت الآن"""
+        if priority == CRITICAL or not self.health.degraded:
+            await write()
+            return True
+        self._pending[name] = write
+        self.deferred_count += 1
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._flush_on_recovery())
+        return False
+
+    def discard(self, name: str) -> bool:
+        """إلغاء كتابة مؤجلة أصبحت بلا حاجة (مثل حفظ تلقائي يغني عنه الحفظ النهائي)"""
+        return self._pending.pop(name, None) is not None
+
+    async def _flush_on_recovery(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.retry_interval)
+            if not self.health.degraded:
+                await self.flush()
+
+    async def flush(self, force: bool = False) -> int:
+        """إرسال الكتابات المؤجلة بترتيب تأجيلها - تتوقف إذا عاد التدهور (إلا مع force)"""
+        async with self._lock:
+            flushed = 0
+            for name in list(self._pending):
+                if not force and self.health.degraded:
+                    break
+                write = self._pending.pop(name, None)
+                if write is None:
+                    continue
+                try:
+                    await write()
+                    flushed += 1
+                except Exception as e:
+                    # تبقى للمحاولة عند التعافي التالي (ما لم تُستبدل بكتابة أحدث بنفس المفتاح)
+                    logger.error(f"فشل إرسال الكتابة المؤجلة {name}: {e}")
+                    self._pending.setdefault(name, write)
+            self.flushed_count += flushed
+            return flushed
+
+    def stop(self) -> None:
+        """إيقاف انتظار التعافي (المؤجل يبقى في الذاكرة)"""
+        if self._watcher is not None and self._watcher is not asyncio.current_task():
+            self._watcher.cancel()
+
+    async def close(self) -> int:
+        """عند نهاية الجلسة: إيقاف انتظار التعافي وإرسال كل المؤجل مرة أخيرة"""
+        self.stop()
+        return await self.flush(force=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {"deferred": self.deferred_count, "flushed": self.flushed_count, "pending": len(self._pending)}
+
+
+# مثيل واحد لكل عملية worker - الحدود من متغيرات البيئة
+supabase_health = SupabaseHealth(
+    db_metrics,
+    latency_threshold=int(os.getenv("SUPABASE_SHED_LATENCY_MS", "1000")) / 1000,
+    error_rate_threshold=float(os.getenv("SUPABASE_SHED_ERROR_RATE", "0.2")),
+    window=float(os.getenv("SUPABASE_SHED_WINDOW_SECONDS", "30")),
+    min_samples=int(os.getenv("SUPABASE_SHED_MIN_SAMPLES", "10")),
+)